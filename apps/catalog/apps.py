@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.catalog'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Registran sus tipos de tarea en apps.core.jobs
+        from . import images, media_uploads, product_io  # noqa: F401
@@ -0,0 +1,40 @@
+"""
+Lecturas independientes en paralelo para las vistas async de la tienda.
+
+El ORM async de Django (aget, alist...) corre todas las consultas de un request en el
+mismo thread, una detrás de otra: un asyncio.gather sobre ellas no gana nada. Acá cada
+lectura corre en su propio thread (sync_to_async con thread_sensitive=False) y por lo
+tanto con su propia conexión, así la latencia es la de la consulta más lenta y no la suma.
+
+Con STOREFRONT_CONCURRENT_READS = False (SQLite, tests) las lecturas corren en serie en
+el thread del request, igual que await de a una.
+"""
+import asyncio
+from typing import Any, Callable, List
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def _concurrent() -> bool:
+    return getattr(settings, "STOREFRONT_CONCURRENT_READS", True)
+
+
+def _in_worker(read: Callable[[], Any]) -> Callable[[], Any]:
+    def run():
+        try:
+            return read()
+        finally:
+            # Threads del executor: cerrar la conexión según CONN_MAX_AGE, como al final de un request
+            close_old_connections()
+    return run
+
+
+async def run_reads(*reads: Callable[[], Any]) -> List[Any]:
+    """Ejecuta callables sync sin argumentos (cada uno una lectura) y devuelve sus resultados en orden."""
+    if not _concurrent():
+        return [await sync_to_async(read)() for read in reads]
+    return list(await asyncio.gather(
+        *(sync_to_async(_in_worker(read), thread_sensitive=False)() for read in reads)
+    ))
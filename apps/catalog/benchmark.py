@@ -0,0 +1,311 @@
+"""
+Benchmark de consultas, tiempo y memoria para todas las URLs de apps/catalog/urls.py.
+
+- seed_store(): tienda de prueba de N productos (con media, links, categorías, sucursales,
+  FAQs y quejas) cargada con bulk_create.
+- url_specs(): un request por cada patrón de urls.py (GET, o POST con datos mínimos en
+  las vistas que solo aceptan POST). Un patrón nuevo sin argumentos conocidos es un error:
+  así ninguna URL queda fuera del benchmark.
+- run_benchmark(): mide cada URL como visitante anónimo y como dueño. Cada request corre
+  en un savepoint que se descarta, así las vistas que modifican datos no afectan a las
+  siguientes. Las consultas salen del perfil del request (apps.core.profiling).
+- compare(): diferencias contra una línea base JSON (ver el comando benchmark_views).
+"""
+from dataclasses import dataclass
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+import json
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from apps.accounts.models import User
+from apps.core.models import Store
+
+from . import search
+from .models import Branch, Category, FAQ, Product, ProductLink, ProductMedia, StoreConfig, StoreFeedback
+
+# Resultados de referencia: python manage.py benchmark_views --output benchmarks/baseline.json
+# Solo los tamaños que verifica BenchmarkSuiteTests, generados con el Django de requirements.txt
+BASELINE_PATH = settings.BASE_DIR / "benchmarks" / "baseline.json"
+
+SESSIONS = ("anonymous", "owner")
+BATCH_SIZE = 1000
+
+# Vistas que solo aceptan POST: datos mínimos para que hagan su trabajo
+POST_ONLY = {
+    "cart_add", "cart_remove", "cart_update",
+    "product_publish", "product_draft", "product_cancel",
+    "product_media_upload", "product_media_reorder", "product_media_delete",
+    "product_media_chunked_init", "product_media_chunked_finalize",
+    "faq_reorder", "complaint_mark_read",
+}
+
+
+@dataclass
+class SeededStore:
+    store: Store
+    owner: User
+    product: Product  # publicado, con media y links
+    draft: Product
+    category: Category
+    media: ProductMedia
+    branch: Branch
+    faq: FAQ
+    feedback: StoreFeedback
+    size: int
+
+
+def seed_store(products: int, slug: Optional[str] = None) -> SeededStore:
+    """Crea una tienda con `products` productos (90% publicados, 3 imágenes y 2 links cada uno)."""
+    slug = slug or f"bench-{products}-{uuid.uuid4().hex[:6]}"
+    owner = User.objects.create_user(f"{slug}-owner", password=uuid.uuid4().hex, is_owner=True)
+    store = Store.objects.create(name=f"Benchmark {products}", slug=slug, owner=owner)
+    StoreConfig.objects.create(
+        store=store,
+        whatsapp_number="5491100000000",
+        instagram_username="benchmark",
+        whatsapp_message_template="Hola! Quiero {{ product }}: {{ url }}",
+    )
+
+    category_count = max(1, min(200, products // 100))
+    categories = Category.objects.bulk_create(
+        Category(store=store, name=f"Categoría {i}", slug=f"categoria-{i}") for i in range(category_count)
+    )
+
+    rows = []
+    for i in range(products):
+        published = i % 10 != 9
+        rows.append(Product(
+            store=store,
+            name=f"Producto {i}",
+            # Mismo esquema que Product.save: slug base y sufijo _N
+            slug=(f"producto_{i}" if i else "producto") if published else f"_draft_{uuid.uuid4().hex[:12]}",
+            category=categories[i % category_count],
+            description="Descripción del producto de prueba. " * 4,
+            price=1000 + i,
+            stock=None if i % 3 else 10,
+            status=Product.Status.PUBLISHED if published else Product.Status.DRAFT,
+        ))
+    created = Product.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+    ProductMedia.objects.bulk_create(
+        (
+            ProductMedia(product=product, image=f"products/images/bench-{product.pk}-{order}.png", order=order)
+            for product in created
+            for order in range(3)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    ProductLink.objects.bulk_create(
+        (
+            ProductLink(product=product, link_type=link_type, button_text=label, order=order)
+            for product in created
+            for order, (link_type, label) in enumerate([("whatsapp", "Whatsapp"), ("instagram", "Instagram")])
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Branch.objects.bulk_create(
+        Branch(store=store, country="Argentina", province="Buenos Aires", city=f"Ciudad {i}", address=f"Calle {i}")
+        for i in range(5)
+    )
+    FAQ.objects.bulk_create(
+        FAQ(store=store, question=f"Pregunta {i}", answer="Respuesta. " * 10, order=i) for i in range(10)
+    )
+    StoreFeedback.objects.bulk_create(
+        StoreFeedback(store=store, message=f"Mensaje {i}", feedback_type=StoreFeedback.FeedbackType.SUGGESTION)
+        for i in range(20)
+    )
+
+    # bulk_create no pasa por save() ni señales: contadores e índice de búsqueda a mano
+    Category.refresh_product_counts(store)
+    engine = search.get_engine()
+    for category in categories:
+        engine.category_changed(category)
+
+    product = Product.objects.filter(store=store, status=Product.Status.PUBLISHED).order_by("pk").first()
+    return SeededStore(
+        store=store,
+        owner=owner,
+        product=product,
+        draft=Product.objects.filter(store=store, status=Product.Status.DRAFT).order_by("pk").first() or product,
+        category=categories[0],
+        media=product.media.order_by("order").first(),
+        branch=store.branches.first(),
+        faq=store.faqs.first(),
+        feedback=store.feedbacks.first(),
+        size=products,
+    )
+
+
+# ---------- URLS ----------
+
+def _url_kwargs(seeded: SeededStore) -> Dict[str, dict]:
+    from .store_snapshot import get_snapshot
+
+    product = seeded.product
+    return {
+        "theme_css": {"store_slug": seeded.store.slug, "version": get_snapshot(seeded.store).theme_hash},
+        "product_detail": {"slug": product.slug},
+        "complaint_mark_read": {"pk": seeded.feedback.pk},
+        "category_update": {"pk": seeded.category.pk},
+        "category_delete": {"pk": seeded.category.pk},
+        "product_update": {"pk": product.pk},
+        "product_delete": {"pk": product.pk},
+        "product_media_upload": {"product_id": product.pk},
+        "product_media_jobs": {"product_id": product.pk},
+        "product_media_chunked_init": {"product_id": product.pk},
+        # Subida inexistente: mide el costo fijo de la vista (404)
+        "product_media_chunk": {"product_id": product.pk, "upload_id": "0" * 32},
+        "product_media_chunked_finalize": {"product_id": product.pk, "upload_id": "0" * 32},
+        "product_media_reorder": {"product_id": product.pk},
+        "product_media_delete": {"product_id": product.pk, "media_id": seeded.media.pk},
+        "product_publish": {"pk": seeded.draft.pk},
+        "product_draft": {"pk": product.pk},
+        "product_cancel": {"pk": seeded.draft.pk},
+        "faq_update": {"pk": seeded.faq.pk},
+        "faq_delete": {"pk": seeded.faq.pk},
+        "branch_update": {"pk": seeded.branch.pk},
+        "branch_delete": {"pk": seeded.branch.pk},
+    }
+
+
+def _post_data(name: str, seeded: SeededStore):
+    product = seeded.product
+    if name.startswith("cart_"):
+        return {"product_id": product.pk, "quantity": 2}
+    if name == "product_media_reorder":
+        media_ids = list(product.media.order_by("-order").values_list("pk", flat=True))
+        return ("application/json", {"order": media_ids})
+    if name == "product_media_chunked_init":
+        return ("application/json", {"file_name": "video.mp4", "size": 1024, "content_type": "video/mp4"})
+    if name == "faq_reorder":
+        faq_ids = list(seeded.store.faqs.order_by("-order").values_list("pk", flat=True))
+        return ("application/json", {"order": faq_ids})
+    return {}
+
+
+def url_specs(seeded: SeededStore) -> List[Tuple[str, str, str, object]]:
+    """(nombre, método, path, datos) para cada patrón de apps.catalog.urls."""
+    from . import urls
+
+    kwargs_by_name = _url_kwargs(seeded)
+    specs = []
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        kwargs = kwargs_by_name.get(pattern.name, {})
+        if set(kwargs) != set(pattern.pattern.regex.groupindex):
+            raise KeyError(f"Sin argumentos de benchmark para la URL '{urls.app_name}:{pattern.name}'")
+        path = reverse(f"{urls.app_name}:{pattern.name}", kwargs=kwargs)
+        if pattern.name in POST_ONLY:
+            specs.append((f"{urls.app_name}:{pattern.name}", "POST", path, _post_data(pattern.name, seeded)))
+        else:
+            specs.append((f"{urls.app_name}:{pattern.name}", "GET", path, None))
+    return specs
+
+
+# ---------- EJECUCIÓN ----------
+
+def _request(client: Client, method: str, path: str, data):
+    if method == "GET":
+        response = client.get(path)
+        if response.streaming:
+            # Exportaciones: se consume de a partes, como lo haría el servidor
+            for _ in response.streaming_content:
+                pass
+        return response
+    if isinstance(data, tuple):
+        content_type, payload = data
+        return client.post(path, json.dumps(payload), content_type=content_type)
+    return client.post(path, data or {})
+
+
+def _measure(client: Client, method: str, path: str, data, trace_memory: bool = False):
+    """Un request dentro de un savepoint descartado. Devuelve (status, consultas, segundos, bytes pico)."""
+    with transaction.atomic():
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            response = _request(client, method, path, data)
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        transaction.set_rollback(True)
+    profile = response.wsgi_request.profile
+    return response.status_code, profile.sql_count, profile.duration, peak
+
+
+def _client(seeded: SeededStore, session: str) -> Client:
+    root = getattr(settings, "ROOT_DOMAIN", "catalogico.shop")
+    client = Client(HTTP_HOST=f"{seeded.store.slug}.{root}")
+    if session == "owner":
+        client.force_login(seeded.owner)
+    # Primer request: renueva la sesión (SessionRefreshMiddleware), no cuenta para ninguna vista
+    client.get(reverse("catalog:privacy"))
+    return client
+
+
+def run_benchmark(seeded: SeededStore, sessions=SESSIONS, repeat: int = 3) -> Dict[str, dict]:
+    """
+    {sesión: {url: {...}}} con:
+    - queries: consultas del primer request (cache frío); queries_warm: las del último
+    - wall_ms: mediana de `repeat` requests; peak_kb: memoria pico de un request extra
+    """
+    results = {}
+    specs = url_specs(seeded)
+    for session in sessions:
+        client = _client(seeded, session)
+        rows = {}
+        for name, method, path, data in specs:
+            runs = [_measure(client, method, path, data) for _ in range(max(1, repeat))]
+            status, _, _, peak = _measure(client, method, path, data, trace_memory=True)
+            rows[name] = {
+                "method": method,
+                "status": status,
+                "queries": runs[0][1],
+                "queries_warm": runs[-1][1],
+                "wall_ms": round(median(run[2] for run in runs) * 1000, 2),
+                "peak_kb": round(peak / 1024, 1),
+            }
+        results[session] = rows
+    return results
+
+
+# ---------- COMPARACIÓN ----------
+
+# Tiempo y memoria varían entre corridas: solo cuenta como regresión si supera la tolerancia
+# relativa y además un mínimo absoluto
+WALL_MS_FLOOR = 5.0
+PEAK_KB_FLOOR = 64.0
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.5, metrics=("queries", "wall_ms", "peak_kb")) -> List[str]:
+    """Regresiones de `results` respecto de `baseline` (mismo formato: {tamaño: {sesión: {url: ...}}})."""
+    regressions = []
+    for size, sessions in results.items():
+        for session, rows in sessions.items():
+            base_rows = baseline.get(size, {}).get(session, {})
+            for name, row in rows.items():
+                base = base_rows.get(name)
+                if base is None:
+                    continue
+                where = f"[{size} productos, {session}] {name}"
+                for metric in ("queries", "queries_warm"):
+                    if "queries" in metrics and metric in base and row[metric] > base[metric]:
+                        regressions.append(f"{where}: {metric} {base[metric]} → {row[metric]}")
+                for metric, floor in (("wall_ms", WALL_MS_FLOOR), ("peak_kb", PEAK_KB_FLOOR)):
+                    if metric not in metrics or metric not in base:
+                        continue
+                    limit = max(base[metric] * (1 + tolerance), base[metric] + floor)
+                    if row[metric] > limit:
+                        regressions.append(f"{where}: {metric} {base[metric]} → {row[metric]}")
+                if row["status"] != base.get("status", row["status"]):
+                    regressions.append(f"{where}: status {base['status']} → {row['status']}")
+    return regressions
@@ -0,0 +1,186 @@
+"""
+Estado de navegación del visitante (carrito y "volver al catálogo") fuera de la sesión de BD.
+
+request.browse_state (ver BrowseStateMiddleware) se comporta como la sesión para los
+helpers de cart.py: get / in / [] / modified. Solo se guarda si su contenido cambió
+(o para renovar el vencimiento, como mucho una vez cada media vida).
+
+Backends (settings.CATALOG_BROWSE_STATE_BACKEND):
+- SignedCookieBrowseStateBackend: todo en una cookie firmada y comprimida (carritos chicos;
+  MAX_ITEMS líneas entran de sobra).
+- CacheBrowseStateBackend: la cookie lleva solo un id aleatorio; los datos van al cache.
+Ninguno escribe en la base de datos.
+"""
+import logging
+import secrets
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _state_age() -> int:
+    return getattr(settings, "BROWSE_STATE_AGE", settings.SESSION_COOKIE_AGE)
+
+
+class BrowseState:
+    def __init__(self, data=None, issued_at=None, key=None):
+        self._data = dict(data or {})
+        self.issued_at = issued_at
+        self.key = key  # id en el backend de cache
+        self.modified = False
+        self.accessed = False
+
+    def get(self, name, default=None):
+        self.accessed = True
+        return self._data.get(name, default)
+
+    def __contains__(self, name):
+        self.accessed = True
+        return name in self._data
+
+    def __getitem__(self, name):
+        self.accessed = True
+        return self._data[name]
+
+    def __setitem__(self, name, value):
+        self.accessed = True
+        if self._data.get(name, _MISSING) != value:
+            self._data[name] = value
+            self.modified = True
+
+    def __delitem__(self, name):
+        self.accessed = True
+        del self._data[name]
+        self.modified = True
+
+    def is_empty(self) -> bool:
+        return not self._data
+
+    def as_dict(self) -> dict:
+        return dict(self._data)
+
+    def needs_refresh(self) -> bool:
+        """Renovar el vencimiento cuando pasó la mitad de su vida (sin cambios de contenido)."""
+        if self.is_empty() or self.issued_at is None:
+            return False
+        return time.time() - self.issued_at > _state_age() / 2
+
+
+class BaseBrowseStateBackend:
+    cookie_name = "catalog_state"
+
+    def load(self, request) -> BrowseState:
+        raise NotImplementedError
+
+    def save(self, request, response, state: BrowseState) -> None:
+        raise NotImplementedError
+
+    def _set_cookie(self, response, value):
+        # Misma política que la cookie de sesión (vence al cerrar el navegador si así está configurado)
+        max_age = None if settings.SESSION_EXPIRE_AT_BROWSER_CLOSE else _state_age()
+        response.set_cookie(
+            self.cookie_name,
+            value,
+            max_age=max_age,
+            domain=settings.SESSION_COOKIE_DOMAIN,
+            secure=settings.SESSION_COOKIE_SECURE or None,
+            httponly=True,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+
+    def _delete_cookie(self, response):
+        response.delete_cookie(
+            self.cookie_name,
+            domain=settings.SESSION_COOKIE_DOMAIN,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+
+
+class SignedCookieBrowseStateBackend(BaseBrowseStateBackend):
+    salt = "apps.catalog.browse_state"
+    # Los navegadores descartan cookies de más de ~4096 bytes
+    max_cookie_size = 4000
+
+    def load(self, request) -> BrowseState:
+        raw = request.COOKIES.get(self.cookie_name)
+        if not raw:
+            return BrowseState()
+        try:
+            payload = signing.loads(raw, salt=self.salt, max_age=_state_age())
+            return BrowseState(payload["d"], issued_at=payload["t"])
+        except (signing.BadSignature, KeyError, TypeError):
+            return BrowseState()
+
+    def _dumps(self, data) -> str:
+        return signing.dumps({"d": data, "t": int(time.time())}, salt=self.salt, compress=True)
+
+    def save(self, request, response, state: BrowseState) -> None:
+        if state.is_empty():
+            self._delete_cookie(response)
+            return
+        data = state.as_dict()
+        value = self._dumps(data)
+        if len(value) > self.max_cookie_size and "catalog_return_url" in data:
+            # El link de "volver" es prescindible; el carrito no
+            data.pop("catalog_return_url")
+            value = self._dumps(data)
+        if len(value) > self.max_cookie_size:
+            logger.warning("Estado de navegación demasiado grande para la cookie (%s bytes)", len(value))
+            return
+        self._set_cookie(response, value)
+
+
+class CacheBrowseStateBackend(BaseBrowseStateBackend):
+    cookie_name = "catalog_state_id"
+    key_prefix = "browse_state:"
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "BROWSE_STATE_CACHE_ALIAS", "default")]
+
+    def load(self, request) -> BrowseState:
+        key = request.COOKIES.get(self.cookie_name)
+        if not key:
+            return BrowseState()
+        payload = self.cache.get(self.key_prefix + key)
+        if not payload:
+            return BrowseState(key=key)
+        return BrowseState(payload["d"], issued_at=payload["t"], key=key)
+
+    def save(self, request, response, state: BrowseState) -> None:
+        if state.is_empty():
+            if state.key:
+                self.cache.delete(self.key_prefix + state.key)
+                self._delete_cookie(response)
+            return
+        new_key = state.key is None
+        key = state.key or secrets.token_urlsafe(24)
+        self.cache.set(
+            self.key_prefix + key,
+            {"d": state.as_dict(), "t": int(time.time())},
+            _state_age(),
+        )
+        if new_key:
+            self._set_cookie(response, key)
+
+
+_backend = None
+
+
+def get_backend() -> BaseBrowseStateBackend:
+    global _backend
+    if _backend is None:
+        path = getattr(
+            settings,
+            "CATALOG_BROWSE_STATE_BACKEND",
+            "apps.catalog.browse_state.SignedCookieBrowseStateBackend",
+        )
+        _backend = import_string(path)()
+    return _backend
@@ -0,0 +1,185 @@
+"""
+Acciones masivas del listado de productos del panel: publicar, archivar, eliminar,
+cambiar categoría, ajustar el precio en un porcentaje y fijar el stock.
+
+apply_action() valida en una sola consulta que todos los ids sean de la tienda y aplica
+el cambio por conjunto (UPDATE/DELETE sobre los ids) en una transacción, sin save() por
+producto:
+- Publicar asigna los slugs en lote con slugs.SlugAllocator (los slugs de la tienda en
+  una consulta) y los escribe con product_io.bulk_update_products. Si otro
+  request publicó el mismo slug en paralelo, se vuelve a leer y se reintenta.
+- Los productos sin nombre o sin precio no se publican (mismas reglas que ProductForm)
+  y los que no tienen precio no se ajustan: quedan como omitidos en el resultado.
+- Eliminar borra con un DELETE por tabla (links, media, productos). Solo ProductLink y
+  ProductMedia apuntan a Product; si se agrega otra relación, _delete usa delete().
+Como los UPDATE/DELETE por conjunto no disparan señales, al final se recalculan los
+contadores de categorías, el índice de búsqueda y se invalida el cache de páginas de la
+tienda (igual que la importación).
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterable, List
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from . import images, page_cache, search, slugs
+from .forms import ProductBulkActionForm
+from .models import Category, Product, ProductLink, ProductMedia
+from .product_io import bulk_update_products
+
+# Tablas que borra _delete. _raw_delete no sigue relaciones: solo es seguro mientras ningún
+# otro modelo apunte a estas (ver _raw_delete_is_safe)
+DELETE_MODELS = (ProductLink, ProductMedia, Product)
+
+# Cambian qué productos publicados cuenta cada categoría
+COUNTED_ACTIONS = {
+    ProductBulkActionForm.PUBLISH,
+    ProductBulkActionForm.DRAFT,
+    ProductBulkActionForm.DELETE,
+    ProductBulkActionForm.SET_CATEGORY,
+}
+
+
+class BulkActionError(Exception):
+    pass
+
+
+@dataclass
+class BulkResult:
+    changed: int = 0
+    skipped: int = 0
+
+
+def parse_ids(values: Iterable[str]) -> List[int]:
+    ids = []
+    for value in values:
+        value = (value or "").strip()
+        if not value.isdigit():
+            raise BulkActionError("La selección de productos no es válida.")
+        ids.append(int(value))
+    return list(dict.fromkeys(ids))
+
+
+def _owned_products(store, ids: List[int]) -> List[Product]:
+    """Los productos seleccionados, en una consulta; si alguno no es de la tienda, error."""
+    products = list(
+        Product.objects
+        .filter(store=store, pk__in=ids)
+        .only("pk", "store_id", "name", "slug", "status", "price", "category_id")
+        .order_by("pk")
+    )
+    if len(products) != len(ids):
+        raise BulkActionError("Algunos productos seleccionados no existen en la tienda.")
+    return products
+
+
+def _publish(store, products: List[Product], now) -> BulkResult:
+    drafts = [product for product in products if product.status == Product.Status.DRAFT]
+    ready = [product for product in drafts if product.name and product.price]
+    result = BulkResult(changed=len(ready), skipped=len(drafts) - len(ready))
+    if not ready:
+        return result
+
+    original = {product.pk: product.slug for product in ready}
+    for attempt in range(slugs.SAVE_ATTEMPTS):
+        # Los slugs del resto de la tienda (como Product.save); los propios no cuentan como tomados
+        allocator = slugs.SlugAllocator(
+            Product.objects.filter(store=store).exclude(pk__in=list(original)), "_", preload=True
+        )
+        for product in ready:
+            product.slug = original[product.pk]
+            product.status = Product.Status.PUBLISHED
+        # Primero los que conservan su slug de una publicación anterior, después los nuevos
+        pending = [product for product in ready if product.needs_slug or not allocator.reserve(product.slug)]
+        for product in pending:
+            product.slug = allocator.allocate(Product._generate_slug(product.name))
+        try:
+            with transaction.atomic():
+                bulk_update_products([product for product in ready if product.slug != original[product.pk]], ["slug"])
+                Product.objects.filter(pk__in=[product.pk for product in ready]).update(
+                    status=Product.Status.PUBLISHED, updated_at=now
+                )
+            return result
+        except IntegrityError as error:
+            if attempt == slugs.SAVE_ATTEMPTS - 1 or not slugs.is_slug_conflict(error):
+                raise
+
+
+def _raw_delete_is_safe() -> bool:
+    """Las únicas relaciones hacia DELETE_MODELS son entre ellos (ProductLink/ProductMedia → Product)."""
+    return all(
+        relation.related_model in DELETE_MODELS
+        for model in DELETE_MODELS
+        for relation in model._meta.related_objects
+    )
+
+
+def _delete(ids: List[int]) -> None:
+    names = [
+        name
+        for derivatives in ProductMedia.objects.filter(product_id__in=ids).values_list("derivatives", flat=True)
+        for name in images.stored_names(derivatives)
+    ]
+    if not _raw_delete_is_safe():
+        # Otro modelo apunta a los productos: delete() resuelve su on_delete (más lento)
+        Product.objects.filter(pk__in=ids).delete()
+    else:
+        # _raw_delete: un DELETE por tabla. delete() cargaría cada fila para mandar las señales
+        # por instancia, y su trabajo (contadores, búsqueda, cache) se hace acá para todo el lote.
+        for queryset in (
+            ProductLink.objects.filter(product_id__in=ids),
+            ProductMedia.objects.filter(product_id__in=ids),
+            Product.objects.filter(pk__in=ids),
+        ):
+            queryset._raw_delete(queryset.db)
+    if names:
+        transaction.on_commit(lambda: images.delete_files(names))
+
+
+def apply_action(store, ids: List[int], action: str, cleaned_data: dict) -> BulkResult:
+    """Aplica la acción del formulario a los productos ids de la tienda en una transacción."""
+    if not ids:
+        raise BulkActionError("Seleccioná al menos un producto.")
+    now = timezone.now()
+    with transaction.atomic():
+        products = _owned_products(store, ids)
+        selected = Product.objects.filter(pk__in=ids)
+
+        if action == ProductBulkActionForm.PUBLISH:
+            result = _publish(store, products, now)
+        elif action == ProductBulkActionForm.DRAFT:
+            result = BulkResult(
+                changed=selected.filter(status=Product.Status.PUBLISHED).update(
+                    status=Product.Status.DRAFT, updated_at=now
+                )
+            )
+        elif action == ProductBulkActionForm.DELETE:
+            _delete(ids)
+            result = BulkResult(changed=len(ids))
+        elif action == ProductBulkActionForm.SET_CATEGORY:
+            category = cleaned_data.get("category")
+            result = BulkResult(
+                changed=selected.exclude(category=category).update(category=category, updated_at=now)
+                if category else
+                selected.filter(category__isnull=False).update(category=None, updated_at=now)
+            )
+        elif action == ProductBulkActionForm.ADJUST_PRICE:
+            factor = 1 + cleaned_data["percent"] / Decimal(100)
+            changed = selected.filter(price__isnull=False).update(price=Round(F("price") * factor, 2), updated_at=now)
+            result = BulkResult(changed=changed, skipped=len(ids) - changed)
+        elif action == ProductBulkActionForm.SET_STOCK:
+            stock = cleaned_data.get("stock")
+            unchanged = Q(stock__isnull=True) if stock is None else Q(stock=stock)
+            result = BulkResult(changed=selected.exclude(unchanged).update(stock=stock, updated_at=now))
+        else:
+            raise BulkActionError("Acción desconocida.")
+
+        if result.changed:
+            if action in COUNTED_ACTIONS:
+                Category.refresh_product_counts(store)
+            search.get_engine().products_changed(store.pk, ids)
+            page_cache.purge_tags([page_cache.store_tag(store.pk)])
+    return result
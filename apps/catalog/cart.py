@@ -1,10 +1,18 @@
 """
-Helpers para el carrito guardado en sesión Django.
-Estructura: session['cart'] = { str(store_id): { str(product_id): quantity } }
-Siempre usamos claves string para coincidir con la serialización JSON de la sesión
+Helpers para el carrito guardado en request.browse_state (ver browse_state.py; misma
+interfaz que la sesión Django, que también se puede pasar).
+Estructura: state['cart'] = { str(store_id): { str(product_id): quantity } }
+Siempre usamos claves string para coincidir con la serialización JSON
 y así no crear dos entradas (int vs str) para la misma tienda.
+
+Al final: motor de precios (price_cart) con Decimal, cantidades ajustadas al stock y
+miniaturas precargadas; format_ars es el mismo formato que usa el filtro |ars.
 """
-from typing import Dict, Any
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Any, Optional, Tuple
+
+from .models import Product
 
 CART_KEY = "cart"
 MAX_QUANTITY = 99
@@ -100,3 +108,125 @@ def set_cart_for_store(session: Any, store_id: int, store_cart: Dict[int, int])
         str(k): int(v) for k, v in store_cart.items() if v > 0
     }
     session.modified = True
+
+
+# ---------- PRECIOS ----------
+
+CENTS = Decimal("0.01")
+
+
+def format_ars(value) -> str:
+    """1234.5 -> "1.234,50" (miles con punto, decimales con coma)."""
+    amount = Decimal(str(value)).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return f"{amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def max_quantity_for(product) -> int:
+    """Tope de unidades en el carrito: MAX_QUANTITY o el stock si el producto lo controla."""
+    if product.stock is None:
+        return MAX_QUANTITY
+    return min(product.stock, MAX_QUANTITY)
+
+
+def clamp_quantity(product, quantity: int) -> int:
+    return max(0, min(quantity, max_quantity_for(product)))
+
+
+def cart_products(store, product_ids, with_thumbnails: bool = False):
+    """Productos publicados de la tienda que pueden estar en el carrito."""
+    qs = Product.objects.filter(store=store, id__in=product_ids, status=Product.Status.PUBLISHED)
+    if with_thumbnails:
+        qs = qs.with_thumbnail()
+    return qs
+
+
+@dataclass(frozen=True)
+class CartLine:
+    product: Any
+    qty: int
+    unit_price: Optional[Decimal]  # None = "Consultar precio"
+
+    @property
+    def subtotal(self) -> Optional[Decimal]:
+        if self.unit_price is None:
+            return None
+        return self.unit_price * self.qty
+
+    @property
+    def subtotal_display(self) -> str:
+        return format_ars(self.subtotal) if self.subtotal is not None else "—"
+
+    @property
+    def max_quantity(self) -> int:
+        return max_quantity_for(self.product)
+
+
+@dataclass(frozen=True)
+class PricedCart:
+    lines: Tuple[CartLine, ...]
+    total: Decimal
+    removed_unavailable: bool  # se quitaron productos que ya no están publicados
+    clamped_to_stock: bool  # se bajaron cantidades por falta de stock
+
+    @property
+    def has_priced_lines(self) -> bool:
+        return any(line.unit_price is not None for line in self.lines)
+
+    @property
+    def total_display(self) -> str:
+        return f"${format_ars(self.total)}" if self.total else "Consultar"
+
+
+def load_cart_products(store, product_ids) -> Dict[int, Product]:
+    """
+    {id: producto} con miniatura: una consulta de productos y una de miniaturas. Solo lee
+    la BD (no la sesión), así se puede correr en otro thread.
+    """
+    if not product_ids:
+        return {}
+    return {p.id: p for p in cart_products(store, list(product_ids), with_thumbnails=True)}
+
+
+def price_cart(session: Any, store, product_by_id: Optional[Dict[int, Product]] = None) -> PricedCart:
+    """
+    Arma las líneas del carrito de la tienda (en el orden de la sesión). Quita de la sesión
+    los productos no disponibles y ajusta las cantidades al stock. product_by_id: resultado
+    de load_cart_products si ya se cargó (si no, se carga acá).
+    """
+    raw_cart = get_cart_for_store(session, store.id)
+    if not raw_cart:
+        return PricedCart(lines=(), total=Decimal("0"), removed_unavailable=False, clamped_to_stock=False)
+
+    if product_by_id is None:
+        product_by_id = load_cart_products(store, raw_cart)
+
+    lines = []
+    cleaned_cart = {}
+    clamped = False
+    total = Decimal("0")
+    for pid, qty in raw_cart.items():
+        product = product_by_id.get(pid)
+        if product is None:
+            continue
+        allowed = clamp_quantity(product, qty)
+        if allowed != qty:
+            clamped = True
+        cleaned_cart[pid] = allowed
+        if allowed <= 0:
+            continue
+        unit_price = product.price if product.price is not None and product.price > 0 else None
+        line = CartLine(product=product, qty=allowed, unit_price=unit_price)
+        if line.subtotal is not None:
+            total += line.subtotal
+        lines.append(line)
+
+    removed = len(cleaned_cart) != len(raw_cart)
+    if removed or clamped:
+        set_cart_for_store(session, store.id, cleaned_cart)
+
+    return PricedCart(
+        lines=tuple(lines),
+        total=total,
+        removed_unavailable=removed,
+        clamped_to_stock=clamped,
+    )
@@ -0,0 +1,136 @@
+"""
+Respuestas condicionales (ETag / Last-Modified → 304) para catálogo y detalle de producto.
+
+Los validadores se calculan antes de cargar media/links o renderizar:
+- Detalle: updated_at del producto, el máximo updated_at de su media y links y la versión
+  del contenido de la tienda (una consulta).
+- Catálogo: la versión del contenido de la tienda (StoreContentVersion), que sube con cada
+  purga del cache de páginas (page_cache.purge_tags). Está en la BD y no en el cache, así
+  ningún worker responde 304 con una versión vieja.
+
+El ETag incluye además lo que cambia según el visitante (usuario, cantidad en el carrito,
+link de "volver") y el tema. Con mensajes pendientes no se responde 304.
+"""
+from functools import wraps
+from typing import Optional
+
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import F, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import cart as cart_helpers
+from .models import Product, StoreContentVersion
+from .page_cache import has_pending_messages
+from .store_snapshot import get_snapshot
+
+
+def _viewer_parts(request):
+    store = request.store
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and user.is_authenticated else 0
+    return [
+        str(user_id),
+        str(cart_helpers.cart_count_for_store(request.browse_state, store.id)),
+        get_snapshot(store).theme_hash,
+    ]
+
+
+def _make_etag(parts) -> str:
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+def _can_validate(request) -> bool:
+    return bool(getattr(request, "store", None)) and not has_pending_messages(request)
+
+
+# ---------- DETALLE DE PRODUCTO ----------
+
+def _product_validators(request, slug):
+    """(etag, last_modified) del producto; se calcula una vez por request."""
+    if hasattr(request, "_product_validators"):
+        return request._product_validators
+
+    validators = (None, None)
+    if _can_validate(request):
+        row = (
+            Product.objects
+            .filter(store=request.store, slug=slug, status=Product.Status.PUBLISHED)
+            .annotate(
+                media_updated=Max("media__updated_at"),
+                links_updated=Max("links__updated_at"),
+                content_version=F("store__content_version__version"),
+            )
+            .values_list("updated_at", "media_updated", "links_updated", "content_version")
+            .first()
+        )
+        if row is not None:
+            *dates, content_version = row
+            last_modified = max(value for value in dates if value is not None)
+            parts = [value.isoformat() if value else "" for value in dates]
+            parts += [str(content_version or 0), *_viewer_parts(request)]
+            parts.append(str(request.browse_state.get("catalog_return_url", "")))
+            validators = (_make_etag(parts), last_modified)
+
+    request._product_validators = validators
+    return validators
+
+
+def product_etag(request, slug) -> Optional[str]:
+    return _product_validators(request, slug)[0]
+
+
+def product_last_modified(request, slug):
+    return _product_validators(request, slug)[1]
+
+
+# ---------- CATÁLOGO ----------
+
+def catalog_etag(request) -> Optional[str]:
+    if hasattr(request, "_catalog_etag"):
+        return request._catalog_etag
+    etag = None
+    if _can_validate(request):
+        version = StoreContentVersion.current(request.store.pk)
+        parts = [request.get_full_path(), str(version), *_viewer_parts(request)]
+        etag = _make_etag(parts)
+    request._catalog_etag = etag
+    return etag
+
+
+# ---------- DECORADOR ----------
+
+def conditional_page(etag_func, last_modified_func=None):
+    """
+    Como django.views.decorators.http.condition, pero obliga al navegador a revalidar
+    (private, no-cache): sin esto usaría Last-Modified para cachear por heurística.
+    En vistas async los validadores (que consultan BD/sesión) se calculan antes en un
+    thread; las funciones guardan el resultado en el request y condition lo reutiliza.
+    """
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        def _finish(response):
+            if response.has_header("ETag"):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        if iscoroutinefunction(view_func):
+            def _precompute(request, *args, **kwargs):
+                if last_modified_func:
+                    last_modified_func(request, *args, **kwargs)
+                etag_func(request, *args, **kwargs)
+
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                await sync_to_async(_precompute)(request, *args, **kwargs)
+                return _finish(await conditional_view(request, *args, **kwargs))
+            return _async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            return _finish(conditional_view(request, *args, **kwargs))
+        return _wrapped_view
+    return decorator
@@ -236,4 +236,52 @@ class ProductForm(forms.ModelForm):
             if errors:
                 raise forms.ValidationError(errors)
 
-        return cleaned
\ No newline at end of file
+        return cleaned
+
+class ProductBulkActionForm(forms.Form):
+    """Acción masiva del listado de productos (los ids van aparte, en "products")."""
+
+    PUBLISH = "publish"
+    DRAFT = "draft"
+    DELETE = "delete"
+    SET_CATEGORY = "set_category"
+    ADJUST_PRICE = "adjust_price"
+    SET_STOCK = "set_stock"
+
+    ACTION_CHOICES = [
+        (PUBLISH, "Publicar"),
+        (DRAFT, "Archivar"),
+        (DELETE, "Eliminar"),
+        (SET_CATEGORY, "Cambiar categoría"),
+        (ADJUST_PRICE, "Ajustar precio (%)"),
+        (SET_STOCK, "Fijar stock"),
+    ]
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES, label="Acción")
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.none(),
+        required=False,
+        empty_label="Sin categoría",
+        label="Categoría",
+    )
+    percent = forms.DecimalField(
+        required=False,
+        max_digits=6,
+        decimal_places=2,
+        min_value=-99,
+        max_value=1000,
+        label="Porcentaje",
+        help_text="Positivo aumenta, negativo descuenta (por ejemplo 10 o -15).",
+    )
+    stock = forms.IntegerField(required=False, min_value=0, label="Stock", help_text="Vacío = sin control.")
+
+    def __init__(self, *args, store=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if store:
+            self.fields["category"].queryset = Category.objects.filter(store=store)
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("action") == self.ADJUST_PRICE and cleaned.get("percent") is None:
+            self.add_error("percent", "Indicá el porcentaje.")
+        return cleaned
@@ -0,0 +1,143 @@
+"""
+Derivados de las imágenes de ProductMedia: anchos fijos (tarjeta del catálogo y detalle)
+en el formato original (JPEG, o PNG si tiene transparencia) y en WebP/AVIF.
+
+Se generan con Pillow en una tarea en segundo plano (apps.core.jobs, encolada por la
+señal post_save cuando la imagen es nueva o cambió) y se guardan con default_storage en
+products/derivatives/<id>/. ProductMedia.derivatives guarda los nombres y de qué archivo
+original salieron; si la imagen cambia, se regeneran. Las plantillas usan los srcset de
+ProductMedia (components/responsive_image.html) y caen al original si todavía no hay
+derivados.
+"""
+from io import BytesIO
+from pathlib import PurePosixPath
+from typing import Dict, List
+
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from apps.core import jobs
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_JOB = "catalog.image_derivatives"
+DERIVATIVES_DIR = "products/derivatives"
+
+CONTENT_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg", "png": "png"}
+
+
+def enabled() -> bool:
+    return getattr(settings, "PRODUCT_IMAGE_DERIVATIVES", True)
+
+
+def target_widths() -> List[int]:
+    return sorted(getattr(settings, "PRODUCT_IMAGE_WIDTHS", (320, 800)))
+
+
+def modern_formats() -> List[str]:
+    """Formatos para <source>, del más liviano al más compatible (AVIF solo si Pillow lo soporta)."""
+    return (["avif"] if features.check("avif") else []) + ["webp"]
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    quality = getattr(settings, "PRODUCT_IMAGE_QUALITY", 80)
+    buffer = BytesIO()
+    if fmt == "jpeg":
+        image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "png":
+        image.save(buffer, "PNG", optimize=True)
+    elif fmt == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, "AVIF", quality=quality - 20)
+    return buffer.getvalue()
+
+
+def build_derivatives(media) -> Dict:
+    """Genera y guarda los archivos; devuelve el dict para ProductMedia.derivatives."""
+    with media.image.open("rb") as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    alpha = _has_alpha(image)
+    image = image.convert("RGBA" if alpha else "RGB")
+    fallback = "png" if alpha else "jpeg"
+    formats = [fallback] + modern_formats()
+    stem = PurePosixPath(media.image.name).stem
+
+    files = {fmt: {} for fmt in formats}
+    # Sin agrandar: una imagen angosta queda con su propio ancho
+    for width in sorted({min(width, image.width) for width in target_widths()}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            name = f"{DERIVATIVES_DIR}/{media.pk}/{stem}-{width}.{EXTENSIONS[fmt]}"
+            files[fmt][str(width)] = default_storage.save(name, ContentFile(_encode(resized, fmt)))
+
+    return {
+        "source": media.image.name,
+        "width": image.width,
+        "height": image.height,
+        "fallback": fallback,
+        "files": files,
+    }
+
+
+def stored_names(derivatives: Dict) -> List[str]:
+    return [name for by_width in (derivatives or {}).get("files", {}).values() for name in by_width.values()]
+
+
+def delete_files(names) -> None:
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception:  # storage remoto caído: quedan huérfanos, no rompe el request
+            logger.warning("No se pudo borrar el derivado %s", name, exc_info=True)
+
+
+def generate_derivatives(media_id: int) -> bool:
+    """Genera los derivados de un ProductMedia si su imagen no los tiene. True si se generaron."""
+    from .models import ProductMedia
+
+    media = ProductMedia.objects.filter(pk=media_id, media_type=ProductMedia.IMAGE).first()
+    if media is None or not media.image or media.has_current_derivatives:
+        return False
+    previous = stored_names(media.derivatives)
+    try:
+        derivatives = build_derivatives(media)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError, ValueError):
+        logger.warning("No se pudieron generar derivados de la media %s (%s)", media.pk, media.image.name, exc_info=True)
+        return False
+
+    media.derivatives = derivatives
+    # save(): updated_at y señales (cache de páginas y ETag del detalle) como cualquier cambio de media
+    media.save(update_fields=["derivatives", "updated_at"])
+    delete_files(set(previous) - set(stored_names(derivatives)))
+    return True
+
+
+@jobs.register(DERIVATIVES_JOB)
+def _derivatives_job(job):
+    return {"generated": generate_derivatives(job.payload["media_id"])}
+
+
+def schedule_derivatives(media) -> None:
+    """Encola la generación de derivados (el worker la toma al confirmarse la transacción)."""
+    if not enabled():
+        return
+    jobs.enqueue(DERIVATIVES_JOB, {"media_id": media.pk}, store_id=media.product.store_id)
@@ -0,0 +1,129 @@
+"""
+Resolución de los links de compra (botones WhatsApp, Instagram, etc.) de un producto.
+
+La URL del producto y el mensaje codificado se arman una sola vez por producto (no por
+link), y los links se cargan en una consulta junto con la configuración de la tienda.
+El resultado son tuplas ResolvedLink, cacheadas por versión del producto: cambia si cambia
+el producto, algún link (updated_at) o la configuración de la tienda (tag store del
+cache de páginas).
+"""
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional, Tuple
+
+import urllib.parse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import ProductLink, StoreConfig
+from .page_cache import store_tag, tag_versions
+
+
+class ResolvedLink(NamedTuple):
+    text: str
+    url: str
+    priority: int
+    link_type: str
+
+
+@dataclass(frozen=True)
+class PurchaseContext:
+    """Lo que comparten todos los links de un producto."""
+    config: Optional[StoreConfig]
+    encoded_message: str
+
+    @classmethod
+    def for_product(cls, product, store, config):
+        if not config:
+            return cls(config=None, encoded_message="")
+        product_url = ""
+        if product.slug:
+            root = getattr(settings, "ROOT_DOMAIN", "catalogico.shop")
+            path = reverse("catalog:product_detail", args=[product.slug])
+            product_url = f"https://{store.slug}.{root}{path}"
+
+        message = config.whatsapp_message_template or ""
+        if message:
+            message = message.replace("{{ product }}", product.name or "")
+            if "{{ url }}" in message:
+                message = message.replace("{{ url }}", product_url or "")
+        if not message:
+            message = product.name or ""
+        return cls(config=config, encoded_message=urllib.parse.quote(message))
+
+
+def resolve_link_url(link, context: PurchaseContext) -> str:
+    config = context.config
+    if not config:
+        return "#"
+    if link.link_type == "whatsapp" and config.whatsapp_number:
+        return f"https://wa.me/{config.whatsapp_number}?text={context.encoded_message}"
+    if link.link_type == "instagram" and config.instagram_username:
+        return f"https://ig.me/m/{config.instagram_username}?text={context.encoded_message}"
+    if link.link_type == "facebook" and config.facebook_page:
+        return f"https://facebook.com/{config.facebook_page}"
+    if link.link_type == "mercadolibre" and config.mercadolibre_store:
+        return f"https://mercadolibre.com.ar/{config.mercadolibre_store}"
+    return link.url
+
+
+def _load_links(product, store) -> Tuple[ResolvedLink, ...]:
+    # Una consulta: links + configuración de la tienda (si no hay links, no hace falta la config)
+    links = list(
+        ProductLink.objects
+        .filter(product=product)
+        .select_related("product__store__config")
+        .order_by("order", "id")
+    )
+    if not links:
+        return ()
+    try:
+        config = links[0].product.store.config
+    except StoreConfig.DoesNotExist:
+        config = None
+    context = PurchaseContext.for_product(product, store, config)
+    return tuple(
+        ResolvedLink(link.button_text, resolve_link_url(link, context), link.priority, link.link_type)
+        for link in links
+    )
+
+
+def _cache_key(product, links_version) -> str:
+    store_version = tag_versions([store_tag(product.store_id)])[0]
+    return f"product_links:{product.pk}:{product.updated_at.timestamp()}:{links_version}:{store_version}"
+
+
+def get_product_links(product, store) -> Tuple[ResolvedLink, ...]:
+    """
+    Links de compra resueltos, en orden. Si el producto viene anotado con `links_updated`
+    (máximo updated_at de sus links, en la misma consulta) se cachea por versión y sin
+    links no hay consulta; si no, se cargan siempre.
+    """
+    if not hasattr(product, "links_updated"):
+        return _load_links(product, store)
+    if product.links_updated is None:
+        return ()
+    ttl = getattr(settings, "PRODUCT_LINKS_CACHE_TTL", 300)
+    if ttl <= 0:
+        return _load_links(product, store)
+    key = _cache_key(product, product.links_updated.timestamp())
+    links = cache.get(key)
+    if links is None:
+        links = _load_links(product, store)
+        cache.set(key, links, ttl)
+    return links
+
+
+def default_link_types(config: Optional[StoreConfig]) -> List[Tuple[int, str]]:
+    """(orden, tipo) de los links que StoreConfig marca por defecto para productos nuevos."""
+    if config is None:
+        return []
+    flags = [
+        ("whatsapp", config.default_link_whatsapp),
+        ("instagram", config.default_link_instagram),
+        ("facebook", config.default_link_facebook),
+        ("mercadolibre", config.default_link_mercadolibre),
+    ]
+    return [(order, link_type) for order, (link_type, enabled) in enumerate(flags) if enabled]
+
@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+import json
+import platform
+import time
+
+import django
+
+from apps.catalog import benchmark
+from apps.core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide consultas, tiempo y memoria de todas las URLs del catálogo (anónimo y dueño) "
+        "sobre tiendas de prueba; compara contra una línea base JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10",
+            help="Productos por tienda, separados por coma (default: 10, el tamaño de la línea base)",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Requests por URL (default: 3)")
+        parser.add_argument("--output", help="Archivo JSON de resultados")
+        parser.add_argument("--baseline", help="Línea base JSON contra la que comparar")
+        parser.add_argument("--tolerance", type=float, default=0.5, help="Margen relativo para tiempo y memoria (default: 0.5)")
+        parser.add_argument("--queries-only", action="store_true", help="Comparar solo cantidad de consultas")
+
+    def handle(self, *args, **options):
+        if not profiling.enabled():
+            raise CommandError("El benchmark usa el perfilado de requests: activá PROFILING_ENABLED")
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes debe ser una lista de enteros (ej: 10,1000,20000)")
+
+        results = {}
+        # Todo en una transacción que se descarta: no quedan tiendas de prueba en la BD.
+        # Sin lecturas en paralelo: los threads usan otras conexiones y no verían los datos.
+        with override_settings(STOREFRONT_CONCURRENT_READS=False, PROFILING_STRICT_BUDGETS=False):
+            with transaction.atomic():
+                for size in sizes:
+                    started = time.perf_counter()
+                    seeded = benchmark.seed_store(size)
+                    self.stdout.write(f"Tienda de {size} productos creada en {time.perf_counter() - started:.1f}s")
+                    results[str(size)] = benchmark.run_benchmark(seeded, repeat=options["repeat"])
+                transaction.set_rollback(True)
+
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "repeat": options["repeat"],
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"Resultados en {options['output']}")
+        else:
+            self._print_table(results)
+
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as fh:
+                baseline_report = json.load(fh)
+            baseline = baseline_report["results"]
+            baseline_django = baseline_report.get("meta", {}).get("django")
+            if baseline_django != django.get_version():
+                # Las consultas de auth, sesiones y el ORM cambian entre versiones de Django
+                self.stdout.write(self.style.WARNING(
+                    f"La línea base es de Django {baseline_django} y esta corrida usa {django.get_version()}"
+                ))
+            metrics = ("queries",) if options["queries_only"] else ("queries", "wall_ms", "peak_kb")
+            regressions = benchmark.compare(results, baseline, options["tolerance"], metrics)
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(line))
+                raise CommandError(f"{len(regressions)} regresiones respecto de {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto de la línea base"))
+
+    def _print_table(self, results):
+        header = f"{'productos':>9} {'sesión':<9} {'url':<36} {'status':>6} {'sql':>5} {'sql tibio':>9} {'ms':>9} {'pico KB':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for size, sessions in results.items():
+            for session, rows in sessions.items():
+                for name, row in rows.items():
+                    self.stdout.write(
+                        f"{size:>9} {session:<9} {name:<36} {row['status']:>6} {row['queries']:>5} "
+                        f"{row['queries_warm']:>9} {row['wall_ms']:>9} {row['peak_kb']:>9}"
+                    )
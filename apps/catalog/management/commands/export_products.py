@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog import product_io
+from apps.core.models import Store
+
+
+class Command(BaseCommand):
+    help = "Exporta los productos de una tienda a CSV o JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("store", help="Slug de la tienda")
+        parser.add_argument("--format", choices=product_io.FORMATS, default="csv", help="Formato (default: csv)")
+        parser.add_argument("--output", help="Archivo de salida (default: salida estándar)")
+
+    def handle(self, *args, **options):
+        store = Store.objects.filter(slug=options["store"]).first()
+        if store is None:
+            raise CommandError(f"No existe la tienda '{options['store']}'")
+        lines = product_io.export_lines(store, options["format"])
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+            fh.writelines(lines)
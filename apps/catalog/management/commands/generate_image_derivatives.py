@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog import images
+from apps.catalog.models import ProductMedia
+
+
+class Command(BaseCommand):
+    help = "Genera los derivados (320/800 px, WebP/AVIF) de las imágenes de productos que no los tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--store", help="Solo la tienda con este slug")
+        parser.add_argument("--force", action="store_true", help="Regenerar aunque ya estén al día")
+
+    def handle(self, *args, **options):
+        queryset = ProductMedia.objects.filter(media_type=ProductMedia.IMAGE).exclude(image="")
+        if options["store"]:
+            queryset = queryset.filter(product__store__slug=options["store"])
+
+        generated = skipped = 0
+        for media in queryset.only("pk", "image", "derivatives").iterator(chunk_size=500):
+            if media.has_current_derivatives and not options["force"]:
+                skipped += 1
+                continue
+            if options["force"] and media.derivatives:
+                # Sin "source" generate_derivatives vuelve a generar (y borra los archivos anteriores)
+                ProductMedia.objects.filter(pk=media.pk).update(derivatives={**media.derivatives, "source": ""})
+            if images.generate_derivatives(media.pk):
+                generated += 1
+            else:
+                skipped += 1
+
+        self.stdout.write(f"Derivados generados: {generated}; sin cambios o con error: {skipped}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import json
+
+from apps.catalog import product_io
+from apps.core.models import Store
+
+
+class Command(BaseCommand):
+    help = "Importa productos desde un CSV o JSONL (crea los que no tienen id, actualiza los que sí)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("store", help="Slug de la tienda")
+        parser.add_argument("path", help="Archivo .csv o .jsonl")
+        parser.add_argument("--format", choices=product_io.FORMATS, help="Formato (default: según la extensión)")
+        parser.add_argument("--batch-size", type=int, default=product_io.BATCH_SIZE, help="Filas por lote")
+
+    def handle(self, *args, **options):
+        store = Store.objects.filter(slug=options["store"]).first()
+        if store is None:
+            raise CommandError(f"No existe la tienda '{options['store']}'")
+        fmt = options["format"] or product_io.format_for(options["path"])
+        try:
+            with open(options["path"], "rb") as fh:
+                report = product_io.import_products(
+                    store, product_io.read_rows(fh, fmt), batch_size=options["batch_size"]
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in report.errors:
+            self.stderr.write(f"Línea {error['line']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(
+            f"Creados: {report.created}; actualizados: {report.updated}; con errores: {report.error_count}"
+        )
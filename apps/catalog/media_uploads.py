@@ -0,0 +1,396 @@
+"""
+Subida de media de productos en segundo plano.
+
+El request solo copia cada archivo a un directorio local (MEDIA_UPLOAD_STAGING_DIR) y
+encola una tarea por archivo (apps.core.jobs); responde enseguida con los ids de tarea.
+El worker (run_jobs) crea el ProductMedia subiendo el archivo a default_storage
+(Cloudinary en producción); la señal post_save encola después los derivados de la imagen.
+media_drop.js consulta el estado con product_media_jobs_view hasta que cada tarea termina.
+
+Archivos grandes (videos) se suben por partes y se pueden retomar:
+    1. init_chunked(product, nombre, tamaño, content_type): valida tipo y tamaño declarados
+       y crea chunks/<producto>/<upload_id>.part (vacío) + .json con los datos.
+    2. write_chunk(upload, offset, stream): agrega la parte al final del .part, leyendo el
+       request de a bloques (nunca el archivo entero en memoria). El offset tiene que ser el
+       tamaño actual del .part; si no, ChunkOffsetMismatch con el offset correcto, así el
+       cliente retoma desde ahí después de un corte. Con los primeros bytes se verifica que
+       el contenido sea realmente una imagen/video del tipo declarado. Mientras escribe tiene
+       un lock sobre el .part: otro PUT de la misma subida recibe 409 y reintenta.
+    3. finalize_chunked(upload): con el archivo completo, encola la misma tarea de subida.
+
+El directorio de staging tiene que ser visible para el worker (mismo host o volumen).
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+import json
+import os
+import re
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows (solo desarrollo): sin lock entre PUT concurrentes
+    fcntl = None
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from apps.core import jobs
+from apps.core.models import Job
+
+from . import reorder
+from .models import Product, ProductMedia
+
+UPLOAD_JOB = "catalog.media_upload"
+
+
+def staging_storage() -> FileSystemStorage:
+    return FileSystemStorage(location=settings.MEDIA_UPLOAD_STAGING_DIR)
+
+
+def media_type_for(content_type: str) -> str:
+    return ProductMedia.VIDEO if (content_type or "").startswith("video") else ProductMedia.IMAGE
+
+
+def _pending_jobs(product):
+    return Job.objects.filter(
+        kind=UPLOAD_JOB,
+        store_id=product.store_id,
+        payload__product_id=product.pk,
+        status__in=[Job.Status.PENDING, Job.Status.RUNNING],
+    )
+
+
+def _next_order(product) -> int:
+    # Después de la última media y de las subidas todavía en cola (claves espaciadas, ver reorder)
+    keys = [key for key in _pending_jobs(product).values_list("payload__order", flat=True) if key is not None]
+    last = product.media.aggregate(m=Max("order"))["m"]
+    if last is not None:
+        keys.append(last)
+    return reorder.next_key(max(keys) if keys else None)
+
+
+def _enqueue_staged(product, staged: str, file_name: str, media_type: str, order: int) -> Job:
+    return jobs.enqueue(
+        UPLOAD_JOB,
+        {
+            "product_id": product.pk,
+            "staged_name": staged,
+            "file_name": file_name,
+            "media_type": media_type,
+            "order": order,
+        },
+        store_id=product.store_id,
+    )
+
+
+def enqueue_uploads(product, files: Iterable) -> List[Job]:
+    """Copia los archivos al staging y encola una tarea por archivo, en el orden recibido."""
+    storage = staging_storage()
+    order_start = _next_order(product)
+    queued = []
+    for index, upload in enumerate(files):
+        file_name = get_valid_filename(upload.name) or "archivo"
+        staged = storage.save(f"{product.pk}/{uuid.uuid4().hex}-{file_name}", upload)
+        queued.append(_enqueue_staged(
+            product, staged, file_name, media_type_for(upload.content_type), order_start + index * reorder.ORDER_STEP
+        ))
+    return queued
+
+
+# ---------- SUBIDAS POR PARTES ----------
+
+CHUNKS_DIR = "chunks"
+READ_BLOCK = 64 * 1024
+# Bytes necesarios para reconocer el formato (firmas de sniff_media_type)
+SNIFF_BYTES = 16
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Marcas "ftyp" (ISO BMFF) que son imágenes; el resto (mp4, mov, 3gp...) se toma como video
+_IMAGE_BRANDS = {b"avif", b"avis", b"heic", b"heix", b"mif1", b"msf1"}
+
+
+class UploadError(Exception):
+    """Error de la subida por partes; `status` es el código HTTP que devuelve la vista."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class ChunkOffsetMismatch(UploadError):
+    def __init__(self, offset: int):
+        super().__init__("El offset no coincide con lo ya recibido", status=409)
+        self.offset = offset
+
+
+def chunk_size() -> int:
+    return getattr(settings, "MEDIA_UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024)
+
+
+def max_bytes(media_type: str) -> int:
+    if media_type == ProductMedia.VIDEO:
+        return getattr(settings, "MEDIA_UPLOAD_MAX_VIDEO_BYTES", 500 * 1024 * 1024)
+    return getattr(settings, "MEDIA_UPLOAD_MAX_IMAGE_BYTES", 20 * 1024 * 1024)
+
+
+def sniff_media_type(head: bytes) -> Optional[str]:
+    """IMAGE/VIDEO según la firma de los primeros bytes; None si no es un formato conocido."""
+    if head.startswith((b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a")):
+        return ProductMedia.IMAGE
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ProductMedia.IMAGE
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return ProductMedia.VIDEO
+    if head[4:8] == b"ftyp":
+        return ProductMedia.IMAGE if head[8:12] in _IMAGE_BRANDS else ProductMedia.VIDEO
+    if head.startswith((b"\x1a\x45\xdf\xa3", b"OggS")):
+        return ProductMedia.VIDEO
+    return None
+
+
+class ChunkedUpload:
+    """Subida por partes en curso: el .part con lo recibido y el .json con los datos declarados."""
+
+    def __init__(self, product_id: int, upload_id: str, meta: dict):
+        self.product_id = product_id
+        self.upload_id = upload_id
+        self.meta = meta
+
+    @property
+    def part_name(self) -> str:
+        return f"{CHUNKS_DIR}/{self.product_id}/{self.upload_id}.part"
+
+    @property
+    def meta_name(self) -> str:
+        return f"{CHUNKS_DIR}/{self.product_id}/{self.upload_id}.json"
+
+    @property
+    def size(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def offset(self) -> int:
+        return staging_storage().size(self.part_name)
+
+    def as_dict(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "file_name": self.meta["file_name"],
+            "size": self.size,
+            "offset": self.offset,
+            "chunk_size": chunk_size(),
+        }
+
+    def save_meta(self) -> None:
+        with open(staging_storage().path(self.meta_name), "w", encoding="utf-8") as fh:
+            json.dump(self.meta, fh)
+
+    def discard(self) -> None:
+        storage = staging_storage()
+        storage.delete(self.part_name)
+        storage.delete(self.meta_name)
+
+
+def discard_stale_uploads(product) -> int:
+    """Borra las subidas por partes del producto abandonadas hace más de MEDIA_UPLOAD_CHUNK_TTL."""
+    storage = staging_storage()
+    directory = f"{CHUNKS_DIR}/{product.pk}"
+    if not storage.exists(directory):
+        return 0
+    ttl = timedelta(seconds=getattr(settings, "MEDIA_UPLOAD_CHUNK_TTL", 24 * 3600))
+    limit = timezone.now() - ttl
+    discarded = 0
+    for name in storage.listdir(directory)[1]:
+        # Solo las que tienen .json: un .part finalizado espera al worker
+        if not name.endswith(".json"):
+            continue
+        upload = ChunkedUpload(product.pk, name[: -len(".json")], {})
+        if not storage.exists(upload.part_name) or storage.get_modified_time(upload.part_name) < limit:
+            upload.discard()
+            discarded += 1
+    return discarded
+
+
+def init_chunked(product, file_name: str, size, content_type: str) -> ChunkedUpload:
+    if not (content_type or "").startswith(("image/", "video/")):
+        raise UploadError("Solo se aceptan imágenes o videos", status=415)
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("Tamaño inválido")
+    media_type = media_type_for(content_type)
+    if size <= 0:
+        raise UploadError("El archivo está vacío")
+    if size > max_bytes(media_type):
+        limit_mb = max_bytes(media_type) // (1024 * 1024)
+        raise UploadError(f"El archivo supera el máximo de {limit_mb} MB", status=413)
+
+    discard_stale_uploads(product)
+    upload = ChunkedUpload(product.pk, uuid.uuid4().hex, {
+        "product_id": product.pk,
+        "store_id": product.store_id,
+        "file_name": get_valid_filename(os.path.basename(file_name or "")) or "archivo",
+        "size": size,
+        "content_type": content_type,
+        "media_type": media_type,
+        "verified": False,
+    })
+    # save() crea el directorio; el nombre es único (uuid), así que no lo renombra
+    staging_storage().save(upload.part_name, ContentFile(b""))
+    upload.save_meta()
+    return upload
+
+
+def get_chunked(product, upload_id: str) -> Optional[ChunkedUpload]:
+    if not _UPLOAD_ID.match(upload_id or ""):
+        return None
+    storage = staging_storage()
+    upload = ChunkedUpload(product.pk, upload_id, {})
+    if not storage.exists(upload.meta_name) or not storage.exists(upload.part_name):
+        return None
+    with storage.open(upload.meta_name, "r") as fh:
+        upload.meta = json.load(fh)
+    if upload.meta.get("store_id") != product.store_id:
+        return None
+    return upload
+
+
+def _verify_head(upload: ChunkedUpload, path: str) -> None:
+    """Con los primeros bytes ya escritos, confirma que el contenido coincide con lo declarado."""
+    with open(path, "rb") as fh:
+        head = fh.read(SNIFF_BYTES)
+    if len(head) < min(SNIFF_BYTES, upload.size):
+        return
+    if sniff_media_type(head) != upload.meta["media_type"]:
+        upload.discard()
+        raise UploadError("El contenido no es una imagen o video válido", status=415)
+    upload.meta["verified"] = True
+    upload.save_meta()
+
+
+@contextmanager
+def _locked_part(path: str):
+    """
+    Abre el .part con un lock exclusivo: dos PUT de la misma subida (reintento del cliente
+    con el anterior todavía escribiendo) no pueden pasar juntos el control del offset.
+    Si el lock está tomado, UploadError 409 y el cliente reintenta.
+    """
+    with open(path, "r+b") as fh:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Otra parte de esta subida se está escribiendo", status=409)
+        # El lock se libera al cerrar el archivo (también si el proceso muere)
+        yield fh
+
+
+def write_chunk(upload: ChunkedUpload, offset, stream) -> int:
+    """Agrega una parte leída de `stream` (el request) de a bloques. Devuelve el nuevo offset."""
+    path = staging_storage().path(upload.part_name)
+    with _locked_part(path) as fh:
+        current = os.fstat(fh.fileno()).st_size
+        try:
+            offset = int(offset)
+        except (TypeError, ValueError):
+            raise ChunkOffsetMismatch(current)
+        if offset != current:
+            raise ChunkOffsetMismatch(current)
+
+        limit = min(chunk_size(), upload.size - offset)
+        written = 0
+        fh.seek(offset)
+        try:
+            while True:
+                block = stream.read(READ_BLOCK)
+                if not block:
+                    break
+                written += len(block)
+                if written > limit:
+                    raise UploadError("La parte supera el tamaño permitido", status=413)
+                fh.write(block)
+            fh.flush()
+        except Exception:
+            # Se descarta la parte incompleta: el cliente reintenta desde `offset`
+            fh.truncate(offset)
+            raise
+        if not upload.meta.get("verified"):
+            _verify_head(upload, path)
+    return offset + written
+
+
+def finalize_chunked(product, upload: ChunkedUpload) -> Job:
+    # Con el lock: una parte que se está escribiendo todavía puede descartarse
+    with _locked_part(staging_storage().path(upload.part_name)):
+        if upload.offset != upload.size:
+            raise ChunkOffsetMismatch(upload.offset)
+        if not upload.meta.get("verified"):
+            raise UploadError("El contenido no es una imagen o video válido", status=415)
+        job = _enqueue_staged(
+            product, upload.part_name, upload.meta["file_name"], upload.meta["media_type"], _next_order(product)
+        )
+        # El .part queda para el worker (process_upload lo borra); sin .json la subida ya no se retoma
+        staging_storage().delete(upload.meta_name)
+    return job
+
+
+@jobs.register(UPLOAD_JOB)
+def process_upload(job):
+    payload = job.payload
+    storage = staging_storage()
+    staged = payload["staged_name"]
+    if job.result:
+        # La media ya se creó y el worker se cayó antes de marcarla terminada: otra vuelta
+        # crearía una segunda ProductMedia
+        storage.delete(staged)
+        return job.result
+    product = Product.objects.filter(pk=payload["product_id"]).first()
+    if product is None:
+        # Producto cancelado o borrado mientras la subida esperaba
+        storage.delete(staged)
+        return {"skipped": True}
+
+    media = ProductMedia(product=product, media_type=payload["media_type"], order=payload["order"])
+    field = media.video if media.media_type == ProductMedia.VIDEO else media.image
+    with storage.open(staged, "rb") as fh:
+        field.save(payload["file_name"], File(fh), save=False)
+    try:
+        with transaction.atomic():
+            # Subir un video puede tardar: renovar el lock (y bloquear la fila de la tarea)
+            # antes de crear la media
+            jobs.heartbeat(job)
+            media.save()
+            result = {"media_id": media.pk, "file_url": field.url}
+            # El resultado, en la misma transacción que la media
+            Job.objects.filter(pk=job.pk).update(result=result)
+    except jobs.LockLost:
+        field.storage.delete(field.name)
+        raise
+    storage.delete(staged)
+    return result
+
+
+def job_status(job: Job) -> dict:
+    return {
+        "id": job.pk,
+        "status": job.status,
+        "file_name": job.payload.get("file_name", ""),
+        "media_type": job.payload.get("media_type", ""),
+        "media_id": job.result.get("media_id"),
+        "file_url": job.result.get("file_url", ""),
+        "error": "No se pudo procesar el archivo" if job.status == Job.Status.FAILED else "",
+    }
+
+
+def pending_uploads(product) -> List[dict]:
+    """Subidas en cola del producto (para mostrarlas al recargar el formulario)."""
+    return [job_status(job) for job in _pending_jobs(product).order_by("id")]
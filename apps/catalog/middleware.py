@@ -0,0 +1,24 @@
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .browse_state import get_backend
+
+
+class BrowseStateMiddleware(MiddlewareMixin):
+    """
+    Carga request.browse_state (carrito, link de "volver") y lo guarda en la respuesta
+    solo si cambió o hay que renovar su vencimiento. No toca la sesión de BD.
+    """
+
+    def process_request(self, request):
+        request.browse_state = get_backend().load(request)
+
+    def process_response(self, request, response):
+        state = getattr(request, "browse_state", None)
+        if state is None:
+            return response
+        if state.accessed:
+            patch_vary_headers(response, ("Cookie",))
+        if state.modified or state.needs_refresh():
+            get_backend().save(request, response, state)
+        return response
@@ -0,0 +1,50 @@
+# Generated by Django 6.0
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+
+# Mismo documento que PostgresSearchEngine.vector() (apps/catalog/search.py)
+BACKFILL_SQL = """
+UPDATE catalog_product p SET search_vector =
+    setweight(to_tsvector('spanish', coalesce(unaccent(p.name), '')), 'A')
+    || setweight(to_tsvector('spanish', coalesce(unaccent(
+        (SELECT c.name FROM catalog_category c WHERE c.id = p.category_id)
+    ), '')), 'B')
+    || setweight(to_tsvector('spanish', coalesce(unaccent(p.description), '')), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # Índice GIN y backfill solo en Postgres (en SQLite se usa InMemorySearchEngine)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS catalog_product_search_gin "
+        "ON catalog_product USING gin (search_vector)"
+    )
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS catalog_product_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0030_tutorial_title_back_200'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0031_product_search_vector'),
+        ('core', '0002_developer_config'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['store', 'name'], name='catalog_cat_store_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['store', 'status', '-created_at'], name='catalog_prod_store_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('store'), models.F('status'), django.db.models.functions.text.Lower('name'), name='catalog_prod_store_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['store', 'status', 'price'], name='catalog_prod_store_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productmedia',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'media_type', 'order', 'id'], name='catalog_media_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storefeedback',
+            index=models.Index(fields=['store', 'is_read', '-created_at'], name='catalog_feedback_store_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0034_media_link_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmedia',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
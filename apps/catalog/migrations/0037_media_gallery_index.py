@@ -0,0 +1,21 @@
+# Generated by Django 6.0
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0036_storecontentversion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productmedia',
+            name='catalog_media_active_order_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productmedia',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'order', 'id'], name='catalog_media_active_order_idx'),
+        ),
+    ]
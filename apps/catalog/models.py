@@ -1,14 +1,18 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Coalesce, Lower
+from django.db import transaction
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
-from django.conf import settings
-from django.urls import reverse
 
 import urllib.parse
 
 import re
 import unicodedata
 
+from .slugs import DRAFT_PREFIX, SlugAllocator, save_with_slug
+
 # Create your models here.
 
 
@@ -36,12 +40,24 @@ class Category(models.Model):
         verbose_name="Activa"
     )
 
+    # Contador de productos publicados (sidebar del catálogo sin búsqueda).
+    # Lo mantienen Product.save / post_delete; refresh_product_counts() lo recalcula.
+    published_product_count = models.PositiveIntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["name"]
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
+        indexes = [
+            # Sidebar del catálogo: activas de la tienda, por nombre
+            models.Index(
+                fields=["store", "name"],
+                condition=models.Q(is_active=True),
+                name="catalog_cat_store_active_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["store", "slug"],
@@ -54,17 +70,48 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = self._generate_slug(self.name)
-            slug = base_slug
-            counter = 1
-            qs = Category.objects.filter(store=self.store)
-            while qs.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            # Primer sufijo libre con una sola consulta; reintenta si otro request lo tomó
+            allocator = SlugAllocator(Category.objects.filter(store_id=self.store_id), "-")
+            save_with_slug(
+                self,
+                allocator,
+                self._generate_slug(self.name),
+                lambda: super(Category, self).save(*args, **kwargs),
+                using=kwargs.get("using"),
+            )
+            return
 
         super().save(*args, **kwargs)
 
+    @classmethod
+    def adjust_product_counts(cls, old_category_id, new_category_id):
+        """Mueve un producto publicado de una categoría a otra (None = ninguna)."""
+        if old_category_id == new_category_id:
+            return
+        if old_category_id:
+            cls.objects.filter(pk=old_category_id, published_product_count__gt=0).update(
+                published_product_count=models.F("published_product_count") - 1
+            )
+        if new_category_id:
+            cls.objects.filter(pk=new_category_id).update(
+                published_product_count=models.F("published_product_count") + 1
+            )
+
+    @classmethod
+    def refresh_product_counts(cls, store):
+        """Recalcula los contadores de la tienda en un solo UPDATE (tras cambios masivos)."""
+        published = (
+            Product.objects
+            .filter(category=models.OuterRef("pk"), status=Product.Status.PUBLISHED)
+            .order_by()
+            .values("category")
+            .annotate(n=models.Count("pk"))
+            .values("n")
+        )
+        cls.objects.filter(store=store).update(
+            published_product_count=Coalesce(models.Subquery(published), 0)
+        )
+
     @staticmethod
     def _generate_slug(text: str) -> str:
         # Normaliza acentos (Electrónica -> Electronica)
@@ -83,6 +130,31 @@ class Category(models.Model):
 
 
 #-- Producto --#
+class ProductQuerySet(models.QuerySet):
+    def with_thumbnail(self):
+        """card_media: primera imagen activa (un solo prefetch con ventana por producto)."""
+        first_image = (
+            ProductMedia.objects
+            .filter(media_type=ProductMedia.IMAGE, is_active=True)
+            .order_by("order", "id")
+        )[:1]
+        return self.prefetch_related(
+            models.Prefetch("media", queryset=first_image, to_attr="card_media")
+        )
+
+    def with_card_data(self):
+        """
+        Datos que usa product_card.html en consultas por conjunto:
+        - card_media: ver with_thumbnail
+        - has_links: si el producto tiene al menos un link de compra
+        """
+        return self.with_thumbnail().annotate(
+            has_links=models.Exists(
+                ProductLink.objects.filter(product=models.OuterRef("pk"))
+            )
+        )
+
+
 class Product(models.Model):
     class Status(models.TextChoices):
         DRAFT = "draft", "Borrador"
@@ -145,7 +217,18 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Documento de búsqueda (nombre, categoría, descripción); lo mantiene apps/catalog/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
+        indexes = [
+            # Catálogo: (tienda, estado) + cada orden de sort_map
+            models.Index(fields=["store", "status", "-created_at"], name="catalog_prod_store_newest_idx"),
+            models.Index(F("store"), F("status"), Lower("name"), name="catalog_prod_store_name_idx"),
+            models.Index(fields=["store", "status", "price"], name="catalog_prod_store_price_idx"),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["store", "slug"],
@@ -162,6 +245,9 @@ class Product(models.Model):
 
     @property
     def thumbnail(self):
+        # Si vino de with_card_data(), usar la imagen ya precargada
+        if hasattr(self, "card_media"):
+            return self.card_media[0] if self.card_media else None
         return (
             self.media
             .filter(media_type="image", is_active=True)
@@ -169,19 +255,80 @@ class Product(models.Model):
             .first()
         )
 
+    # ---------- CONTADOR POR CATEGORÍA ----------
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_counted_category()
+        instance._remember_search_source()
+        return instance
+
+    def _remember_counted_category(self):
+        """Guarda en qué categoría cuenta este producto según lo cargado de la BD."""
+        deferred = self.get_deferred_fields()
+        if "status" in deferred or "category_id" in deferred:
+            self._counted_category_id = self._UNKNOWN
+        else:
+            self._counted_category_id = self.category_id if self.status == self.Status.PUBLISHED else None
+
+    _UNKNOWN = object()
+
+    def _previous_counted_category(self):
+        previous = getattr(self, "_counted_category_id", None)
+        if previous is self._UNKNOWN:
+            row = Product.objects.filter(pk=self.pk).values_list("status", "category_id").first()
+            if not row:
+                return None
+            status, category_id = row
+            return category_id if status == self.Status.PUBLISHED else None
+        return previous
+
+    # ---------- BÚSQUEDA ----------
+
+    # Lo que indexa apps/catalog/search.py (la categoría aporta su nombre)
+    SEARCH_SOURCE_FIELDS = ("name", "description", "category_id")
+
+    def _remember_search_source(self):
+        deferred = self.get_deferred_fields()
+        if any(name in deferred for name in self.SEARCH_SOURCE_FIELDS):
+            self._search_source = self._UNKNOWN
+        else:
+            self._search_source = tuple(getattr(self, name) for name in self.SEARCH_SOURCE_FIELDS)
+
+    @property
+    def search_source_changed(self) -> bool:
+        """True si cambió el texto buscable desde que se cargó o guardó (o no se sabe)."""
+        loaded = getattr(self, "_search_source", self._UNKNOWN)
+        return loaded is self._UNKNOWN or loaded != tuple(getattr(self, name) for name in self.SEARCH_SOURCE_FIELDS)
+
     # ---------- SAVE ----------
 
     def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            previous_category_id = None if self._state.adding else self._previous_counted_category()
+            self._save_with_slug(*args, **kwargs)
+            current_category_id = self.category_id if self.status == self.Status.PUBLISHED else None
+            Category.adjust_product_counts(previous_category_id, current_category_id)
+            self._counted_category_id = current_category_id
+            self._remember_search_source()
+
+    @property
+    def needs_slug(self):
         # Al publicar, generar slug desde el nombre si está vacío o es slug temporal de borrador
-        if self.status == self.Status.PUBLISHED and (not self.slug or (self.slug or "").startswith("_draft_")):
-            base_slug = self._generate_slug(self.name)
-            slug = base_slug
-            counter = 1
-            qs = Product.objects.filter(store=self.store)
-            while qs.filter(slug=slug).exists():
-                slug = f"{base_slug}_{counter}"
-                counter += 1
-            self.slug = slug
+        return self.status == self.Status.PUBLISHED and (not self.slug or self.slug.startswith(DRAFT_PREFIX))
+
+    def _save_with_slug(self, *args, **kwargs):
+        if self.needs_slug:
+            allocator = SlugAllocator(Product.objects.filter(store_id=self.store_id), "_")
+            save_with_slug(
+                self,
+                allocator,
+                self._generate_slug(self.name),
+                lambda: super(Product, self).save(*args, **kwargs),
+                using=kwargs.get("using"),
+            )
+            return
 
         super().save(*args, **kwargs)
 
@@ -193,14 +340,11 @@ class Product(models.Model):
 
         text = text.lower()
 
-        # Elimina números
-        text = re.sub(r"\d+", "", text)
-
         # Espacios → _
         text = re.sub(r"\s+", "_", text.strip())
 
-        # Solo letras y _
-        text = re.sub(r"[^a-z_]", "", text)
+        # Solo letras, números y _ (con los números "Remera 1" y "Remera 2" no chocan)
+        text = re.sub(r"[^a-z0-9_]", "", text)
 
         return text
 
@@ -246,8 +390,22 @@ class ProductMedia(models.Model):
 
     is_active = models.BooleanField(default=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Anchos y formatos precalculados de la imagen (los genera apps/catalog/images.py)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
     class Meta:
         ordering = ["order"]
+        indexes = [
+            # Galería y miniaturas: media activa del producto en orden. Sin media_type en
+            # el medio: la galería no filtra por tipo y la miniatura toma la primera imagen
+            models.Index(
+                fields=["product", "order", "id"],
+                condition=models.Q(is_active=True),
+                name="catalog_media_active_order_idx",
+            ),
+        ]
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -258,6 +416,65 @@ class ProductMedia(models.Model):
         if self.media_type == self.VIDEO and not self.video:
             raise ValidationError("Un video requiere archivo de video.")
 
+    # ---------- DERIVADOS (srcset) ----------
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Para saber al guardar si la imagen cambió (ver signals.schedule_media_derivatives)
+        instance._loaded_image_name = None if "image" in instance.get_deferred_fields() else instance.image.name
+        return instance
+
+    @property
+    def image_changed(self):
+        return self.image.name != getattr(self, "_loaded_image_name", None)
+
+    @property
+    def has_current_derivatives(self):
+        """Los derivados guardados salieron de la imagen actual (si se reemplazó, no sirven)."""
+        return bool(self.image) and self.derivatives.get("source") == self.image.name
+
+    def _derivative_files(self, fmt):
+        if not self.has_current_derivatives:
+            return []
+        files = self.derivatives.get("files", {}).get(fmt, {})
+        return sorted((int(width), name) for width, name in files.items())
+
+    def _srcset(self, fmt):
+        storage = self.image.storage
+        return ", ".join(f"{storage.url(name)} {width}w" for width, name in self._derivative_files(fmt))
+
+    def _url_for_width(self, width):
+        files = self._derivative_files(self.derivatives.get("fallback"))
+        if not files:
+            return self.image.url
+        # El más chico que cubra el ancho pedido (o el más grande que haya)
+        name = next((name for w, name in files if w >= width), files[-1][1])
+        return self.image.storage.url(name)
+
+    @property
+    def card_url(self):
+        from .images import target_widths
+        return self._url_for_width(target_widths()[0])
+
+    @property
+    def detail_url(self):
+        from .images import target_widths
+        return self._url_for_width(target_widths()[-1])
+
+    @property
+    def image_srcset(self):
+        return self._srcset(self.derivatives.get("fallback")) if self.has_current_derivatives else ""
+
+    @property
+    def image_sources(self):
+        """[(content_type, srcset)] de los formatos modernos, para <source> dentro de <picture>."""
+        from .images import CONTENT_TYPES, modern_formats
+        if not self.has_current_derivatives:
+            return []
+        sources = [(CONTENT_TYPES[fmt], self._srcset(fmt)) for fmt in modern_formats()]
+        return [(content_type, srcset) for content_type, srcset in sources if srcset]
+
     def __str__(self):
         return f"{self.product} - {self.media_type}"
     
@@ -308,56 +525,23 @@ class ProductLink(models.Model):
         verbose_name="Orden",
     )
 
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ["order"]
         verbose_name = "Link de producto"
         verbose_name_plural = "Links de producto"
             
     def get_url(self):
+        # Para varios links del mismo producto usar links.get_product_links (arma el mensaje una vez)
+        from .links import PurchaseContext, resolve_link_url
+
+        store = self.product.store
         try:
-            config = self.product.store.config
+            config = store.config
         except (StoreConfig.DoesNotExist, AttributeError):
             return "#"
-        if not config:
-            return "#"
-
-        store = self.product.store
-        product_url = ""
-        if self.product.slug:
-            root = getattr(settings, "ROOT_DOMAIN", "catalogico.shop")
-            path = reverse("catalog:product_detail", args=[self.product.slug])
-            product_url = f"https://{store.slug}.{root}{path}"
-
-        def build_message():
-            template = config.whatsapp_message_template or ""
-            if not template:
-                return ""
-            msg = template.replace("{{ product }}", self.product.name or "")
-            if "{{ url }}" in msg:
-                msg = msg.replace("{{ url }}", product_url or "")
-            return msg
-
-        if self.link_type == "whatsapp" and config.whatsapp_number:
-            message = build_message()
-            if not message:
-                message = self.product.name or ""
-            encoded_message = urllib.parse.quote(message)
-            return f"https://wa.me/{config.whatsapp_number}?text={encoded_message}"
-
-        if self.link_type == "instagram" and config.instagram_username:
-            message = build_message()
-            if not message:
-                message = self.product.name or ""
-            encoded_message = urllib.parse.quote(message)
-            return f"https://ig.me/m/{config.instagram_username}?text={encoded_message}"
-
-        if self.link_type == "facebook" and config.facebook_page:
-            return f"https://facebook.com/{config.facebook_page}"
-
-        if self.link_type == "mercadolibre" and config.mercadolibre_store:
-            return f"https://mercadolibre.com.ar/{config.mercadolibre_store}"
-
-        return self.url
+        return resolve_link_url(self, PurchaseContext.for_product(self.product, store, config))
     
     @property
     def priority(self):
@@ -484,6 +668,9 @@ class StoreFeedback(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["store", "is_read", "-created_at"], name="catalog_feedback_store_idx"),
+        ]
         verbose_name = "Queja / Propuesta"
         verbose_name_plural = "Quejas y propuestas"
 
@@ -720,4 +907,33 @@ class StoreConfig(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return "Configuración de la tienda"
\ No newline at end of file
+        return "Configuración de la tienda"
+
+# -- Versión del contenido público de la tienda --#
+class StoreContentVersion(models.Model):
+    """
+    Contador por tienda que sube cada purga del cache de páginas (page_cache.purge_tags).
+    Es el validador del catálogo en respuestas condicionales (conditional.py): está en la BD,
+    así todos los workers ven el mismo valor.
+    """
+    store = models.OneToOneField(
+        "core.Store",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="content_version",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versión del contenido"
+        verbose_name_plural = "Versiones del contenido"
+
+    @classmethod
+    def bump(cls, store_ids):
+        for store_id in store_ids:
+            if not cls.objects.filter(store_id=store_id).update(version=F("version") + 1):
+                cls.objects.get_or_create(store_id=store_id, defaults={"version": 1})
+
+    @classmethod
+    def current(cls, store_id) -> int:
+        return cls.objects.filter(store_id=store_id).values_list("version", flat=True).first() or 0
@@ -0,0 +1,216 @@
+"""
+Cache de páginas completas para visitantes anónimos de la tienda.
+
+Clave: (tienda, path, querystring normalizado, versión del tema y, si la vista lo pide,
+algunos valores de request.browse_state). Solo se usa si el visitante no está logueado, tiene el
+carrito vacío y no hay mensajes pendientes.
+
+Invalidación por tags: cada entrada guarda la versión de sus tags (store, catalog,
+product, faq) al momento de renderizar; las señales (apps/catalog/signals.py) cambian
+la versión del tag al confirmar la transacción y las entradas viejas dejan de valer.
+Las versiones expiran (TAG_TTL_FACTOR veces el TTL de las páginas): si una expira, la
+siguiente lectura crea otra y las entradas con la anterior simplemente no se usan.
+
+Cada purga sube además StoreContentVersion de la tienda (en la BD), el validador del
+catálogo de conditional.py.
+
+Si el request lee de réplicas (db_routing), la página que se va a guardar se renderiza
+igual con lecturas de la primaria: una réplica atrasada podría devolver datos anteriores a
+la última purga y quedarían guardados con las versiones nuevas de los tags.
+
+Necesita un cache compartido entre procesos (CACHES en settings): las purgas las hacen el
+worker web que guardó el cambio o run_jobs (importaciones, subidas de media).
+
+El token CSRF de los formularios se reemplaza por un marcador al guardar y se completa
+con el token del visitante al servir la página.
+"""
+from functools import wraps
+from typing import Callable, Iterable, List
+from urllib.parse import urlencode
+
+import hashlib
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from apps.core import db_routing
+
+from . import cart as cart_helpers
+from .models import StoreContentVersion
+from .store_snapshot import get_snapshot
+
+KEY_PREFIX = "page:"
+TAG_PREFIX = "page-tag:"
+CSRF_PLACEHOLDER = "__CSRF_TOKEN__"
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+TAG_TTL_FACTOR = 2
+
+
+# ---------- TAGS ----------
+
+def store_tag(store_id) -> str:
+    return f"store:{store_id}"
+
+
+def catalog_tag(store_id) -> str:
+    return f"catalog:{store_id}"
+
+
+def product_tag(store_id, slug) -> str:
+    return f"product:{store_id}:{slug}"
+
+
+def faq_tag(store_id) -> str:
+    return f"faq:{store_id}"
+
+
+def _tag_store_id(tag: str) -> int:
+    # Todos los tags son "<tipo>:<tienda>[:...]"
+    return int(tag.split(":")[1])
+
+
+def tag_versions(tags: List[str]) -> List[int]:
+    keys = [TAG_PREFIX + tag for tag in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # Tag desconocido (o desalojado): versión nueva, así no revive nada viejo
+            version = time.time_ns()
+            cache.add(key, version, _tag_ttl())
+            version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def purge_tags(tags: Iterable[str]) -> None:
+    """Invalida las páginas con esos tags (al confirmar la transacción en curso)."""
+    tags = list(tags)
+    keys = [TAG_PREFIX + tag for tag in tags]
+    store_ids = sorted({_tag_store_id(tag) for tag in tags})
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({key: version for key in keys}, _tag_ttl())
+        StoreContentVersion.bump(store_ids)
+
+    transaction.on_commit(bump)
+
+
+# ---------- CACHE ----------
+
+def _ttl() -> int:
+    return getattr(settings, "STOREFRONT_PAGE_CACHE_TTL", 300)
+
+
+def _tag_ttl() -> int:
+    # Las versiones viven más que las páginas que las guardan
+    return max(_ttl() * TAG_TTL_FACTOR, 60)
+
+
+def has_pending_messages(request) -> bool:
+    return "messages" in request.COOKIES or "_messages" in request.session
+
+
+def _is_cacheable_request(request) -> bool:
+    store = getattr(request, "store", None)
+    if not store or request.method not in ("GET", "HEAD") or _ttl() <= 0:
+        return False
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return False
+    if has_pending_messages(request):
+        return False
+    return cart_helpers.cart_count_for_store(request.browse_state, store.id) == 0
+
+
+def _cache_key(request, vary_on_state) -> str:
+    store = request.store
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    parts = [
+        request.path,
+        query,
+        get_snapshot(store).theme_hash,
+        *[str(request.browse_state.get(name, "")) for name in vary_on_state],
+    ]
+    digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    return f"{KEY_PREFIX}{store.pk}:{digest}"
+
+
+def _serve(request, entry) -> HttpResponse:
+    content = entry["content"].replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+    response = HttpResponse(content, content_type=entry["content_type"])
+    response["X-Page-Cache"] = "hit"
+    return response
+
+
+def _lookup(request, tags, vary_on_state, args, kwargs):
+    """None si el request no se cachea; si no (key, versions, respuesta cacheada o None)."""
+    if not _is_cacheable_request(request):
+        return None
+    store = request.store
+    entry_tags = [store_tag(store.pk), *tags(request, *args, **kwargs)]
+    key = _cache_key(request, vary_on_state)
+    # Versiones leídas antes de renderizar: si algo cambia mientras tanto, la entrada nace vieja
+    versions = tag_versions(entry_tags)
+
+    entry = cache.get(key)
+    if entry is not None and entry["versions"] == versions:
+        return key, versions, _serve(request, entry)
+    return key, versions, None
+
+
+def _remember(key, versions, response) -> None:
+    if response.status_code == 200 and not response.streaming and not response.has_header("Set-Cookie"):
+        content = CSRF_INPUT_RE.sub(rf"\g<1>{CSRF_PLACEHOLDER}\g<2>", response.content.decode())
+        cache.set(key, {
+            "content": content.encode(),
+            "content_type": response["Content-Type"],
+            "versions": versions,
+        }, _ttl())
+        response["X-Page-Cache"] = "miss"
+
+
+def cache_storefront_page(tags: Callable[..., List[str]], vary_on_state=()):
+    """
+    Decorador para vistas públicas de la tienda (sync o async).
+    `tags(request, *args, **kwargs)` devuelve los tags extra (además de store:<id>).
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                plan = await sync_to_async(_lookup)(request, tags, vary_on_state, args, kwargs)
+                if plan is None:
+                    return await view_func(request, *args, **kwargs)
+                key, versions, cached = plan
+                if cached is not None:
+                    return cached
+                # Lo que se guarda no puede venir de una réplica atrasada
+                with db_routing.primary_reads():
+                    response = await view_func(request, *args, **kwargs)
+                await sync_to_async(_remember)(key, versions, response)
+                return response
+            return _async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            plan = _lookup(request, tags, vary_on_state, args, kwargs)
+            if plan is None:
+                return view_func(request, *args, **kwargs)
+            key, versions, cached = plan
+            if cached is not None:
+                return cached
+            with db_routing.primary_reads():
+                response = view_func(request, *args, **kwargs)
+            _remember(key, versions, response)
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,203 @@
+"""
+Paginación por cursor (keyset) para el catálogo.
+
+En vez de COUNT(*) + OFFSET, cada página se pide "después de" (o "antes de") la última
+fila vista: el token `?after=` / `?before=` codifica el valor de orden y el id de esa fila.
+Cualquier página cuesta lo mismo que la primera. Soporta todos los órdenes de sort_map.
+
+estimate_count() da el total sin recorrer todas las filas: exacto hasta un límite y, por
+encima, la estimación del planificador de Postgres (o "más de N" en otras bases).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional
+
+import base64
+import json
+
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+
+
+@dataclass(frozen=True)
+class CursorOrdering:
+    expression: Any
+    descending: bool
+    nullable: bool = False
+    kind: str = "str"  # tipo del valor en el token: str | datetime | decimal
+
+
+# Mismos órdenes que sort_map en views.catalog_view (con id como desempate)
+CURSOR_ORDERINGS = {
+    "newest": CursorOrdering(F("created_at"), descending=True, kind="datetime"),
+    "az": CursorOrdering(Lower("name"), descending=False),
+    "za": CursorOrdering(Lower("name"), descending=True),
+    "price_asc": CursorOrdering(F("price"), descending=False, nullable=True, kind="decimal"),
+    "price_desc": CursorOrdering(F("price"), descending=True, nullable=True, kind="decimal"),
+}
+DEFAULT_ORDERING = "az"
+
+
+def _encode_value(value, kind):
+    if value is None:
+        return None
+    if kind == "datetime":
+        return value.isoformat()
+    return str(value)
+
+
+def _decode_value(raw, kind):
+    if raw is None:
+        return None
+    if kind == "datetime":
+        return datetime.fromisoformat(raw)
+    if kind == "decimal":
+        return Decimal(raw)
+    return str(raw)
+
+
+def encode_cursor(sort: str, value, pk: int) -> str:
+    kind = CURSOR_ORDERINGS[sort].kind
+    payload = json.dumps([sort, _encode_value(value, kind), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str):
+    """Devuelve (valor, id) o None si el token es inválido o de otro orden."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        token_sort, raw, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if token_sort != sort:
+            return None
+        return _decode_value(raw, CURSOR_ORDERINGS[sort].kind), int(pk)
+    except (ValueError, TypeError, InvalidOperation, KeyError):
+        return None
+
+
+def _seek(value, pk, descending, nulls_first, nullable) -> Q:
+    """Filas posteriores a (value, pk) recorriendo en el sentido dado."""
+    key_beyond = Q(cursor_key__lt=value) if descending else Q(cursor_key__gt=value)
+    id_after = Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+
+    if value is None:
+        condition = Q(cursor_key__isnull=True) & id_after
+        if nulls_first:
+            condition |= Q(cursor_key__isnull=False)
+        return condition
+
+    condition = key_beyond | (Q(cursor_key=value) & id_after)
+    if nullable and not nulls_first:
+        condition |= Q(cursor_key__isnull=True)
+    return condition
+
+
+def _order_by(descending, nulls_first):
+    nulls = {"nulls_first": True} if nulls_first else {"nulls_last": True}
+    key = F("cursor_key")
+    if descending:
+        return [key.desc(**nulls), F("pk").desc()]
+    return [key.asc(**nulls), F("pk").asc()]
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, object_list: List, has_next: bool, has_previous: bool,
+                 next_cursor: Optional[str], previous_cursor: Optional[str]):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class CursorPaginator:
+    def __init__(self, queryset, sort: str, per_page: int):
+        self.sort = sort if sort in CURSOR_ORDERINGS else DEFAULT_ORDERING
+        self.ordering = CURSOR_ORDERINGS[self.sort]
+        self.queryset = queryset.annotate(cursor_key=self.ordering.expression)
+        self.per_page = per_page
+
+    def _cursor_for(self, obj) -> str:
+        return encode_cursor(self.sort, obj.cursor_key, obj.pk)
+
+    def get_page(self, after: Optional[str] = None, before: Optional[str] = None) -> CursorPage:
+        ordering = self.ordering
+        backwards = False
+        cursor = None
+        if after:
+            cursor = decode_cursor(after, self.sort)
+        elif before:
+            cursor = decode_cursor(before, self.sort)
+            backwards = cursor is not None
+
+        # Hacia atrás se recorre en sentido inverso (y los NULL quedan primero)
+        descending = ordering.descending != backwards
+        nulls_first = backwards
+
+        qs = self.queryset.order_by(*_order_by(descending, nulls_first))
+        if cursor is not None:
+            value, pk = cursor
+            qs = qs.filter(_seek(value, pk, descending, nulls_first, ordering.nullable))
+
+        rows = list(qs[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        return CursorPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self._cursor_for(rows[-1]) if rows else None,
+            previous_cursor=self._cursor_for(rows[0]) if rows else None,
+        )
+
+
+@dataclass(frozen=True)
+class CountEstimate:
+    value: int
+    exact: bool
+    at_least: bool = False  # sin estimación: value es un piso ("más de")
+
+
+def estimate_count(queryset, exact_limit: int) -> CountEstimate:
+    """
+    Cantidad de filas del queryset. Hasta exact_limit es un COUNT sobre un subquery con
+    LIMIT (no recorre más filas); por encima, en Postgres, las filas que estima EXPLAIN para
+    la misma consulta y, en otras bases, exact_limit como piso ("más de").
+    """
+    queryset = queryset.order_by()
+    counted = queryset[: exact_limit + 1].count()
+    if counted <= exact_limit:
+        return CountEstimate(counted, exact=True)
+    if connections[queryset.db].vendor == "postgresql":
+        try:
+            plan = json.loads(queryset.explain(format="json"))
+            if isinstance(plan, list):
+                plan = plan[0]
+            return CountEstimate(max(int(plan["Plan"]["Plan Rows"]), counted), exact=False)
+        except (ValueError, KeyError, IndexError, TypeError):
+            pass
+    return CountEstimate(exact_limit, exact=False, at_least=True)
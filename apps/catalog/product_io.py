@@ -0,0 +1,415 @@
+"""
+Importación y exportación masiva de productos (CSV o JSONL, una fila por producto).
+
+Columnas: id, name, slug, category, description, price, stock, status.
+
+Importación (import_products): las filas se leen de a una (read_rows) y se procesan en
+lotes de BATCH_SIZE. Cada fila se valida con las reglas de ProductForm (la categoría va
+por nombre y tiene que existir en la tienda); las válidas se guardan con bulk_create /
+bulk_update y las demás quedan en el reporte con su número de línea.
+- Con "id" se actualiza ese producto de la tienda; las columnas que falten conservan el
+  valor actual y solo se escriben los productos que cambiaron. Sin "id" se crea un
+  producto nuevo (publicado si no se indica status).
+- El slug se genera como en Product.save (slugs.SlugAllocator: desde el nombre, con sufijo
+  _N si está tomado);
+  la columna slug de la exportación es solo informativa.
+- Los productos nuevos reciben los links por defecto de StoreConfig.
+Como bulk_create/bulk_update no pasan por save() ni señales, al final se recalculan los
+contadores de categorías, el índice de búsqueda y se invalida el cache de páginas.
+
+Exportación (export_lines): genera el archivo línea por línea leyendo la base de a
+EXPORT_CHUNK filas, para StreamingHttpResponse o un archivo. En CSV las celdas que una
+planilla tomaría como fórmula (=, +, -, @) van con un apóstrofo adelante; la importación
+de CSV lo quita, así el archivo exportado se puede volver a importar tal cual.
+
+Desde el panel la importación corre como tarea (apps.core.jobs); el reporte queda en
+job.result, guardado en la misma transacción que los productos: si la tarea se vuelve a
+ejecutar después de confirmar (worker caído), devuelve ese reporte sin importar de nuevo. Los comandos import_products / export_products hacen lo mismo por consola.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import csv
+import io
+import json
+import uuid
+
+from django import forms
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from apps.core import jobs
+from apps.core.models import Job
+
+from . import page_cache, search, slugs
+from .forms import ProductForm
+from .links import default_link_types
+from .media_uploads import staging_storage
+from .models import Category, Product, ProductLink, StoreConfig
+
+IMPORT_JOB = "catalog.product_import"
+FORMATS = ("csv", "jsonl")
+COLUMNS = ["id", "name", "slug", "category", "description", "price", "stock", "status"]
+FORM_FIELDS = ["name", "category", "description", "price", "stock"]
+# Campos que puede cambiar una importación (updated_at se agrega si cambió alguno)
+UPDATE_FIELDS = ["name", "category", "description", "price", "stock", "status", "slug"]
+STATUS_ALIASES = {
+    "draft": Product.Status.DRAFT,
+    "borrador": Product.Status.DRAFT,
+    "published": Product.Status.PUBLISHED,
+    "publicado": Product.Status.PUBLISHED,
+}
+BATCH_SIZE = 500
+EXPORT_CHUNK = 2000
+# Primer carácter con el que una planilla interpreta la celda como fórmula
+FORMULA_PREFIXES = ("=", "+", "-", "@")
+# El reporte guarda como mucho esta cantidad de errores (error_count tiene el total)
+MAX_REPORTED_ERRORS = 200
+
+
+def format_for(file_name: str, default: str = "csv") -> str:
+    name = (file_name or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+# ---------- VALIDACIÓN ----------
+
+class CategoryNameField(forms.Field):
+    """Categoría por nombre (sin distinguir mayúsculas) contra las categorías ya cargadas."""
+
+    def __init__(self, categories: Dict[str, Category], **kwargs):
+        super().__init__(**kwargs)
+        self.categories = categories
+
+    def to_python(self, value):
+        name = (value or "").strip()
+        if not name:
+            return None
+        category = self.categories.get(name.lower())
+        if category is None:
+            raise forms.ValidationError(f"La categoría «{name}» no existe en la tienda.")
+        return category
+
+
+class ProductImportForm(ProductForm):
+    """ProductForm con la categoría por nombre: una fila no hace consultas para validarse."""
+
+    def __init__(self, *args, categories=None, **kwargs):
+        # Sin ProductForm.__init__: arma el queryset de categorías de la tienda en cada fila
+        forms.ModelForm.__init__(self, *args, **kwargs)
+        self.fields["category"] = CategoryNameField(categories or {}, required=False)
+        self.fields["stock"].required = False
+
+    def _get_validation_exclusions(self):
+        # La categoría ya salió de las de la tienda: sin la consulta de ForeignKey.validate
+        exclude = super()._get_validation_exclusions()
+        exclude.add("category")
+        return exclude
+
+
+# ---------- LECTURA ----------
+
+def read_rows(fh, fmt: str) -> Iterator[Tuple[int, Optional[dict]]]:
+    """(número de línea, fila) de un archivo binario; fila None si la línea no se puede leer."""
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {name: _unescape_formula(value) for name, value in row.items()}
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _looks_like_formula(value: str) -> bool:
+    # También "'=..." y siguientes: así el apóstrofo agregado se distingue de uno del texto
+    return value.startswith(FORMULA_PREFIXES) or (value.startswith("'") and _looks_like_formula(value[1:]))
+
+
+def _unescape_formula(value):
+    """Quita el apóstrofo que export_lines agrega a las celdas que parecen fórmulas."""
+    if isinstance(value, str) and value.startswith("'") and _looks_like_formula(value[1:]):
+        return value[1:]
+    return value
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+# ---------- IMPORTACIÓN ----------
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    error_count: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def add_error(self, line: int, errors: Dict[str, List[str]]) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class _ImportContext:
+    def __init__(self, store):
+        self.store = store
+        self.categories = {c.name.lower(): c for c in Category.objects.filter(store=store)}
+        self.category_names = {c.pk: c.name for c in self.categories.values()}
+        # Todos los slugs de la tienda en una consulta; el lote asigna en memoria
+        self.slugs = slugs.SlugAllocator(Product.objects.filter(store=store), "_", preload=True)
+        config = StoreConfig.objects.filter(store=store).first()
+        self.link_types = default_link_types(config)
+        self.seen_ids = set()
+        self.changed_ids: List[int] = []
+
+
+def _field_values(product) -> Dict[str, object]:
+    return {name: getattr(product, "category_id" if name == "category" else name) for name in UPDATE_FIELDS}
+
+
+def _build_product(row: dict, existing: Dict[int, Product], ctx: _ImportContext):
+    """(producto sin guardar, None) o (None, errores) para una fila."""
+    raw_id = _as_text(row.get("id"))
+    if raw_id:
+        product = existing.get(int(raw_id)) if raw_id.isdigit() else None
+        if product is None:
+            return None, {"id": ["No existe un producto con ese id en la tienda."]}
+        if product.pk in ctx.seen_ids:
+            return None, {"id": ["El producto aparece más de una vez en el archivo."]}
+    else:
+        product = Product(store=ctx.store, status=Product.Status.PUBLISHED)
+
+    raw_status = _as_text(row.get("status")).lower()
+    if raw_status:
+        if raw_status not in STATUS_ALIASES:
+            return None, {"status": ["Usá draft/borrador o published/publicado."]}
+        product.status = STATUS_ALIASES[raw_status]
+
+    # Columnas ausentes: en una actualización conservan el valor actual
+    data = {}
+    for name in FORM_FIELDS:
+        if name in row:
+            data[name] = _as_text(row[name])
+        elif name == "category":
+            data[name] = ctx.category_names.get(product.category_id, "")
+        else:
+            data[name] = _as_text(getattr(product, name))
+
+    form = ProductImportForm(data, instance=product, categories=ctx.categories)
+    if not form.is_valid():
+        return None, {name: [str(message) for message in messages] for name, messages in form.errors.items()}
+    product = form.save(commit=False)
+
+    if product.status == Product.Status.PUBLISHED:
+        if product.needs_slug:
+            product.slug = ctx.slugs.allocate(Product._generate_slug(product.name))
+    elif not product.slug:
+        product.slug = slugs.draft_slug()
+    if product.pk:
+        ctx.seen_ids.add(product.pk)
+    return product, None
+
+
+def _import_batch(batch, ctx: _ImportContext, report: ImportReport) -> None:
+    ids = {int(_as_text(row.get("id"))) for _, row in batch if row and _as_text(row.get("id")).isdigit()}
+    existing = Product.objects.filter(store=ctx.store).in_bulk(ids) if ids else {}
+
+    original = {pk: _field_values(product) for pk, product in existing.items()}
+    to_create, to_update = [], []
+    changed_fields = set()
+    for line, row in batch:
+        if row is None:
+            report.add_error(line, {"__all__": ["La línea no se pudo leer."]})
+            continue
+        product, errors = _build_product(row, existing, ctx)
+        if errors:
+            report.add_error(line, errors)
+        elif not product.pk:
+            to_create.append(product)
+        else:
+            # Solo se escriben los productos y campos que cambiaron (reimportar una
+            # exportación sin tocarla no escribe nada)
+            before, after = original[product.pk], _field_values(product)
+            changed = {name for name in UPDATE_FIELDS if before[name] != after[name]}
+            if changed:
+                changed_fields |= changed
+                to_update.append(product)
+            else:
+                report.unchanged += 1
+
+    if to_create:
+        created = Product.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        ProductLink.objects.bulk_create(
+            (
+                ProductLink(product=product, link_type=link_type, order=order)
+                for product in created
+                for order, link_type in ctx.link_types
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        ctx.changed_ids.extend(product.pk for product in created)
+        report.created += len(created)
+    if to_update:
+        now = timezone.now()
+        for product in to_update:
+            product.updated_at = now
+        fields = [name for name in UPDATE_FIELDS if name in changed_fields] + ["updated_at"]
+        bulk_update_products(to_update, fields)
+        ctx.changed_ids.extend(product.pk for product in to_update)
+        report.updated += len(to_update)
+
+
+def bulk_update_products(products: List[Product], fields: List[str]) -> None:
+    """
+    UPDATE ... FROM (VALUES ...) por lote: una sola sentencia con una fila de valores por
+    producto. bulk_update arma un CASE WHEN por producto y campo, y con miles de filas
+    compilarlo lleva más que ejecutarlo. Postgres y SQLite (3.33+) aceptan UPDATE ... FROM.
+    """
+    qn = connection.ops.quote_name
+    model_fields = [Product._meta.pk] + [Product._meta.get_field(name) for name in fields]
+    columns = [qn(field.column) for field in model_fields]
+    if connection.vendor == "postgresql":
+        # Los parámetros de VALUES no tienen tipo: se castean al de cada columna
+        row_sql = "(" + ", ".join(f"CAST(%s AS {field.db_type(connection)})" for field in model_fields) + ")"
+    else:
+        row_sql = "(" + ", ".join(["%s"] * len(model_fields)) + ")"
+    table = qn(Product._meta.db_table)
+    assignments = ", ".join(f"{column} = v.{column}" for column in columns[1:])
+
+    for start in range(0, len(products), BATCH_SIZE):
+        chunk = products[start:start + BATCH_SIZE]
+        params = [
+            field.get_db_prep_save(getattr(product, field.attname), connection)
+            for product in chunk
+            for field in model_fields
+        ]
+        sql = (
+            f"WITH v ({', '.join(columns)}) AS (VALUES {', '.join([row_sql] * len(chunk))}) "
+            f"UPDATE {table} SET {assignments} FROM v WHERE {table}.{columns[0]} = v.{columns[0]}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def import_products(store, rows: Iterable[Tuple[int, Optional[dict]]], batch_size: int = BATCH_SIZE) -> ImportReport:
+    """Importa las filas de read_rows() en una sola transacción. Devuelve el reporte."""
+    report = ImportReport()
+    with transaction.atomic():
+        ctx = _ImportContext(store)
+        batch = []
+        for line, row in rows:
+            batch.append((line, row))
+            if len(batch) >= batch_size:
+                _import_batch(batch, ctx, report)
+                batch = []
+        if batch:
+            _import_batch(batch, ctx, report)
+
+        if ctx.changed_ids:
+            # bulk_create/bulk_update no pasan por save() ni señales
+            Category.refresh_product_counts(store)
+            search.get_engine().products_changed(store.pk, ctx.changed_ids)
+            page_cache.purge_tags([page_cache.store_tag(store.pk)])
+    return report
+
+
+# ---------- IMPORTACIÓN EN SEGUNDO PLANO ----------
+
+def enqueue_import(store, upload) -> Job:
+    """Copia el archivo subido al staging de media_uploads y encola la importación."""
+    fmt = format_for(upload.name)
+    file_name = get_valid_filename(upload.name) or f"productos.{fmt}"
+    staged = staging_storage().save(f"imports/{store.pk}/{uuid.uuid4().hex}-{file_name}", upload)
+    return jobs.enqueue(
+        IMPORT_JOB,
+        {"staged_name": staged, "file_name": file_name, "format": fmt},
+        store_id=store.pk,
+        # Los errores de datos quedan en el reporte; una excepción (archivo ilegible) no
+        # mejora reintentando. Si el worker se cae, el lock vencido la deja fallida.
+        max_attempts=1,
+    )
+
+
+@jobs.register(IMPORT_JOB)
+def _import_job(job):
+    if job.result:
+        # Ya se importó y el worker se cayó antes de marcarla terminada: las filas sin id
+        # crearían los productos otra vez
+        return job.result
+    storage = staging_storage()
+    staged = job.payload["staged_name"]
+    with transaction.atomic():
+        # Renueva el lock y bloquea la fila de la tarea hasta confirmar: si otro worker la
+        # retomó, LockLost (el archivo queda para ese worker) y no se importa dos veces
+        jobs.heartbeat(job)
+        try:
+            with storage.open(staged, "rb") as fh:
+                report = import_products(job.store, read_rows(fh, job.payload["format"])).as_dict()
+        finally:
+            storage.delete(staged)
+        # El reporte, en la misma transacción que los productos
+        Job.objects.filter(pk=job.pk).update(result=report)
+    return report
+
+
+# ---------- EXPORTACIÓN ----------
+
+class _Echo:
+    """Buffer de csv.writer que devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(store) -> Iterator[dict]:
+    queryset = (
+        Product.objects
+        .filter(store=store)
+        .order_by("id")
+        .values_list("id", "name", "slug", "category__name", "description", "price", "stock", "status")
+    )
+    for values in queryset.iterator(chunk_size=EXPORT_CHUNK):
+        row = dict(zip(COLUMNS, values))
+        if row["slug"].startswith(slugs.DRAFT_PREFIX):
+            row["slug"] = ""
+        row["price"] = str(row["price"]) if row["price"] is not None else None
+        yield row
+
+
+def export_lines(store, fmt: str = "csv") -> Iterator[str]:
+    if fmt == "jsonl":
+        for row in export_rows(store):
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+        return
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in export_rows(store):
+        yield writer.writerow([_escape_formula(row[name]) for name in COLUMNS])
+
+
+def _escape_formula(value):
+    """Celda de CSV que una planilla no ejecuta como fórmula (ver _unescape_formula)."""
+    if value is None:
+        return ""
+    if isinstance(value, str) and _looks_like_formula(value):
+        return "'" + value
+    return value
@@ -0,0 +1,95 @@
+"""
+Reordenamiento por conjunto de listas ordenadas por el campo entero "order" (media de un
+producto, preguntas frecuentes de la tienda).
+
+Las claves van espaciadas ORDER_STEP (1024, 2048, ...) para que mover un ítem no obligue
+a reescribir los demás:
+- set_order(): el orden completo nuevo en un solo UPDATE ... CASE WHEN.
+- move(): mover un ítem antes de otro (o al final) escribe solo esa fila, con una clave
+  entre las de sus vecinos; si no queda hueco (o la lista viene de claves 0, 1, 2...), se
+  renumera toda la lista en un UPDATE.
+Ambas corren en transaction.atomic y bloquean las filas de la lista (select_for_update),
+así dos reordenamientos simultáneos no se pisan.
+"""
+from typing import List, Optional
+
+from django.db import transaction
+from django.db.models import Case, PositiveIntegerField, Value, When
+
+ORDER_STEP = 1024
+
+
+class ReorderError(ValueError):
+    pass
+
+
+def next_key(last: Optional[int]) -> int:
+    """Clave para agregar un ítem al final (last = clave máxima actual o None)."""
+    return ORDER_STEP if last is None else last + ORDER_STEP
+
+
+def parse_ids(values) -> List[int]:
+    if not isinstance(values, list) or any(type(value) is not int for value in values):
+        raise ReorderError("order must be a list of ids")
+    return values
+
+
+def _locked_rows(queryset) -> List[tuple]:
+    return list(queryset.select_for_update().order_by("order", "pk").values_list("pk", "order"))
+
+
+def _renumber(queryset, ids: List[int]) -> None:
+    """Claves ORDER_STEP, 2 * ORDER_STEP... en el orden de ids, en un solo UPDATE."""
+    if not ids:
+        return
+    whens = [When(pk=pk, then=Value((position + 1) * ORDER_STEP)) for position, pk in enumerate(ids)]
+    queryset.filter(pk__in=ids).update(order=Case(*whens, output_field=PositiveIntegerField()))
+
+
+def set_order(queryset, ids: List[int]) -> None:
+    """
+    Aplica el orden ids a la lista (queryset con todos sus ítems). Los ítems que no vienen
+    en ids quedan al final, en su orden actual.
+    """
+    ids = list(dict.fromkeys(parse_ids(ids)))
+    with transaction.atomic(using=queryset.db):
+        current = [pk for pk, _ in _locked_rows(queryset)]
+        if not set(ids) <= set(current):
+            raise ReorderError("Invalid id")
+        listed = set(ids)
+        _renumber(queryset, ids + [pk for pk in current if pk not in listed])
+
+
+def move(queryset, item_id: int, before_id: Optional[int] = None) -> None:
+    """Mueve item_id justo antes de before_id (None = al final)."""
+    parse_ids([item_id] + ([] if before_id is None else [before_id]))
+    with transaction.atomic(using=queryset.db):
+        rows = _locked_rows(queryset)
+        pks = [pk for pk, _ in rows]
+        if item_id not in pks or (before_id is not None and (before_id not in pks or before_id == item_id)):
+            raise ReorderError("Invalid id")
+        rest = [(pk, key) for pk, key in rows if pk != item_id]
+
+        if before_id is None:
+            lower = rest[-1][1] if rest else -1
+            upper = lower + 2 * ORDER_STEP
+            position = len(rest)
+        else:
+            position = next(index for index, (pk, _) in enumerate(rest) if pk == before_id)
+            lower = rest[position - 1][1] if position else -1
+            upper = rest[position][1]
+
+        if upper - lower >= 2:
+            queryset.filter(pk=item_id).update(order=(lower + upper) // 2)
+        else:
+            ordered = [pk for pk, _ in rest]
+            ordered.insert(position, item_id)
+            _renumber(queryset, ordered)
+
+
+def apply(queryset, data: dict) -> None:
+    """Cuerpo JSON de las vistas: {"order": [id, ...]} o {"move": id, "before": id | null}."""
+    if "move" in data:
+        move(queryset, data["move"], data.get("before"))
+    else:
+        set_order(queryset, data.get("order") or [])
@@ -0,0 +1,201 @@
+"""
+Búsqueda de productos para el parámetro `q` (catálogo público y listado del owner).
+
+Motores (settings.CATALOG_SEARCH_ENGINE):
+- PostgresSearchEngine: SearchVector (nombre A, categoría B, descripción C) guardado en
+  Product.search_vector con índice GIN, unaccent y ranking con SearchRank.
+- InMemorySearchEngine: índice invertido por tienda en memoria del proceso, para
+  desarrollo local / tests con SQLite.
+
+En ambos casos la búsqueda ignora acentos y mayúsculas, acepta prefijos ("rem" → "Remera")
+y exige que estén todas las palabras. Devuelve el queryset filtrado y anotado con
+`search_rank` para poder ordenar por relevancia.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Case, F, FloatField, Func, OuterRef, Subquery, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Category, Product
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas y sin acentos (Electrónica -> electronica), igual que _generate_slug."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return text.encode("ascii", "ignore").decode("ascii").lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", normalize_text(text))
+
+
+class Unaccent(Func):
+    function = "unaccent"
+
+
+class BaseSearchEngine:
+    def search(self, queryset, store, q):
+        raise NotImplementedError
+
+    def product_changed(self, product):
+        pass
+
+    def product_deleted(self, product):
+        pass
+
+    def category_changed(self, category):
+        pass
+
+    def products_changed(self, store_id, product_ids):
+        """Cambios masivos (bulk_create/bulk_update no disparan señales)."""
+        pass
+
+    @staticmethod
+    def _fallback(queryset, q):
+        """Sin palabras buscables (solo símbolos): comportamiento anterior."""
+        return queryset.filter(name__icontains=q).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+class PostgresSearchEngine(BaseSearchEngine):
+    config = "spanish"
+    REFRESH_BATCH = 1000
+
+    def vector(self):
+        category_name = Subquery(
+            Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1]
+        )
+        return (
+            SearchVector(Unaccent(F("name")), weight="A", config=self.config)
+            + SearchVector(Unaccent(category_name), weight="B", config=self.config)
+            + SearchVector(Unaccent(F("description")), weight="C", config=self.config)
+        )
+
+    def refresh(self, queryset):
+        """Recalcula search_vector de los productos del queryset en un solo UPDATE."""
+        queryset.update(search_vector=self.vector())
+
+    def search(self, queryset, store, q):
+        tokens = tokenize(q)
+        if not tokens:
+            return self._fallback(queryset, q)
+        # Los tokens solo tienen [a-z0-9], es seguro armar la consulta raw con prefijos
+        query = SearchQuery(
+            " & ".join(f"{token}:*" for token in tokens),
+            search_type="raw",
+            config=self.config,
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+
+    def product_changed(self, product):
+        self.refresh(Product.objects.filter(pk=product.pk))
+
+    def category_changed(self, category):
+        self.refresh(Product.objects.filter(category=category))
+
+    def products_changed(self, store_id, product_ids):
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), self.REFRESH_BATCH):
+            self.refresh(Product.objects.filter(pk__in=product_ids[start:start + self.REFRESH_BATCH]))
+
+
+class InMemorySearchEngine(BaseSearchEngine):
+    # Peso por campo, en el mismo orden que los pesos A/B/C de Postgres
+    WEIGHTS = (("name", 1.0), ("category__name", 0.4), ("description", 0.1))
+
+    def __init__(self):
+        self._indexes: Dict[int, Dict[str, Dict[int, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, store_id):
+        index = defaultdict(lambda: defaultdict(float))
+        fields = [name for name, _ in self.WEIGHTS]
+        for row in Product.objects.filter(store_id=store_id).values_list("id", *fields):
+            product_id = row[0]
+            for (_, weight), text in zip(self.WEIGHTS, row[1:]):
+                for token in tokenize(text):
+                    index[token][product_id] += weight
+        return {token: dict(postings) for token, postings in index.items()}
+
+    def _index_for(self, store_id):
+        with self._lock:
+            index = self._indexes.get(store_id)
+        if index is None:
+            index = self._build(store_id)
+            with self._lock:
+                self._indexes[store_id] = index
+        return index
+
+    def scores(self, store_id, q) -> Dict[int, float]:
+        index = self._index_for(store_id)
+        result = None
+        for token in tokenize(q):
+            matches = defaultdict(float)
+            for term, postings in index.items():
+                if term.startswith(token):
+                    for product_id, score in postings.items():
+                        matches[product_id] += score
+            if result is None:
+                result = dict(matches)
+            else:
+                result = {pid: s + matches[pid] for pid, s in result.items() if pid in matches}
+            if not result:
+                break
+        return result or {}
+
+    def search(self, queryset, store, q):
+        if not tokenize(q):
+            return self._fallback(queryset, q)
+        scores = self.scores(store.pk, q)
+        rank = Case(
+            *[When(pk=pid, then=Value(score)) for pid, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ) if scores else Value(0.0, output_field=FloatField())
+        return queryset.filter(pk__in=list(scores)).annotate(search_rank=rank)
+
+    def invalidate(self, store_id):
+        with self._lock:
+            self._indexes.pop(store_id, None)
+
+    def product_changed(self, product):
+        self.invalidate(product.store_id)
+
+    def product_deleted(self, product):
+        if "store_id" in product.get_deferred_fields():
+            # Cargado con .only(): la fila ya no existe para leer la tienda
+            with self._lock:
+                self._indexes.clear()
+            return
+        self.invalidate(product.store_id)
+
+    def category_changed(self, category):
+        self.invalidate(category.store_id)
+
+    def products_changed(self, store_id, product_ids):
+        self.invalidate(store_id)
+
+
+_engine = None
+
+
+def get_engine() -> BaseSearchEngine:
+    global _engine
+    if _engine is None:
+        path = getattr(settings, "CATALOG_SEARCH_ENGINE", "apps.catalog.search.PostgresSearchEngine")
+        _engine = import_string(path)()
+    return _engine
+
+
+def search_products(queryset, store, q):
+    """Filtra `queryset` por `q` y anota `search_rank` (mayor = más relevante)."""
+    return get_engine().search(queryset, store, q)
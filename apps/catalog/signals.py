@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.models import Store
+
+from . import images, page_cache, search, store_snapshot
+from .models import FAQ, Branch, Category, Product, ProductLink, ProductMedia, StoreConfig
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_store_snapshot(sender, instance, **kwargs):
+    store_snapshot.invalidate_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=StoreConfig)
+@receiver(post_delete, sender=StoreConfig)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_store_snapshot_for_child(sender, instance, **kwargs):
+    store_snapshot.invalidate_snapshot(instance.store_id)
+
+
+@receiver(post_save, sender=Product)
+def update_product_search(sender, instance, raw=False, **kwargs):
+    # Solo si cambió el texto buscable: guardar stock o precio no reindexa (un UPDATE menos)
+    if not raw and instance.search_source_changed:
+        search.get_engine().product_changed(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_search(sender, instance, **kwargs):
+    search.get_engine().product_deleted(instance)
+
+
+@receiver(pre_delete, sender=Product)
+def decrement_category_count(sender, instance, **kwargs):
+    # pre_delete: corre dentro de la transacción del delete y la fila todavía existe
+    Category.adjust_product_counts(instance._previous_counted_category(), None)
+
+
+@receiver(post_save, sender=Category)
+def update_category_search(sender, instance, created=False, raw=False, **kwargs):
+    if not raw and not created:
+        search.get_engine().category_changed(instance)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    # El SET_NULL de Product.category es un UPDATE sin señales: los ids, antes de que corra
+    instance._search_product_ids = list(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def update_deleted_category_search(sender, instance, **kwargs):
+    # Sin esto el índice conserva el nombre de la categoría borrada
+    product_ids = getattr(instance, "_search_product_ids", None)
+    if product_ids:
+        search.get_engine().products_changed(instance.store_id, product_ids)
+
+
+# ---------- CACHE DE PÁGINAS ----------
+
+def _product_page_tags(product_id, store_id=None, slug=None):
+    if store_id is None or slug is None:
+        row = Product.objects.filter(pk=product_id).values_list("store_id", "slug").first()
+        if row is None:
+            return []
+        store_id, slug = row
+    return [page_cache.catalog_tag(store_id), page_cache.product_tag(store_id, slug)]
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def purge_store_pages(sender, instance, **kwargs):
+    page_cache.purge_tags([page_cache.store_tag(instance.pk)])
+
+
+@receiver(post_save, sender=StoreConfig)
+@receiver(post_delete, sender=StoreConfig)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_store_pages_for_child(sender, instance, **kwargs):
+    # Footer, sucursales y nombres de categoría aparecen en todas las páginas de la tienda
+    page_cache.purge_tags([page_cache.store_tag(instance.store_id)])
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def purge_product_pages(sender, instance, **kwargs):
+    deferred = instance.get_deferred_fields()
+    if deferred & {"store_id", "slug"}:
+        tags = _product_page_tags(instance.pk)
+    else:
+        tags = _product_page_tags(instance.pk, instance.store_id, instance.slug)
+    page_cache.purge_tags(tags)
+
+
+@receiver(post_save, sender=ProductMedia)
+@receiver(pre_delete, sender=ProductMedia)
+@receiver(post_save, sender=ProductLink)
+@receiver(pre_delete, sender=ProductLink)
+def purge_product_pages_for_child(sender, instance, **kwargs):
+    # pre_delete: en un delete en cascada el producto todavía existe para leer store/slug
+    page_cache.purge_tags(_product_page_tags(instance.product_id))
+
+
+@receiver(post_save, sender=ProductMedia)
+def schedule_media_derivatives(sender, instance, created, **kwargs):
+    # Imagen nueva o reemplazada: 320/800 px y WebP/AVIF en segundo plano
+    if instance.media_type != ProductMedia.IMAGE or not instance.image or instance.has_current_derivatives:
+        return
+    if created or instance.image_changed:
+        images.schedule_derivatives(instance)
+    instance._loaded_image_name = instance.image.name
+
+
+@receiver(post_delete, sender=ProductMedia)
+def delete_media_derivatives(sender, instance, **kwargs):
+    names = images.stored_names(instance.derivatives)
+    if names:
+        transaction.on_commit(lambda: images.delete_files(names))
+
+
+@receiver(post_delete, sender=ProductMedia)
+@receiver(post_delete, sender=ProductLink)
+def touch_product_on_child_delete(sender, instance, **kwargs):
+    # Un borrado no aparece en el máximo updated_at de media/links: renovar el del producto (ETag)
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def purge_faq_pages(sender, instance, **kwargs):
+    page_cache.purge_tags([page_cache.faq_tag(instance.store_id)])
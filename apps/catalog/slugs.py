@@ -0,0 +1,112 @@
+"""
+Slugs únicos por tienda sin una consulta por colisión.
+
+Product y Category arman el slug desde el nombre (base) y, si ya está tomado, le agregan
+un sufijo numérico: remera, remera_1, remera_2... (categorías: remeras, remeras-1...).
+
+- SlugAllocator trae en una sola consulta los slugs de la tienda que empiezan con la base
+  (slug__startswith) y elige en memoria el primer sufijo libre. En lotes (importación,
+  publicación masiva) recuerda lo ya asignado: cada base se consulta una vez, o ninguna
+  con preload=True (todos los slugs de la tienda en una consulta). reserve() conserva un
+  slug existente si sigue libre (publicación masiva de borradores ya publicados antes).
+- save_with_slug() guarda en un savepoint; si otro request tomó el mismo slug entre la
+  consulta y el INSERT (IntegrityError de la restricción única de slug), vuelve a
+  consultar y prueba con el siguiente. Cualquier otro IntegrityError se propaga.
+"""
+from typing import Callable, Dict, Optional, Set
+
+import re
+import uuid
+
+from django.db import IntegrityError, transaction
+
+SAVE_ATTEMPTS = 3
+DRAFT_PREFIX = "_draft_"
+# Restricciones (store, slug) de Product y Category
+SLUG_CONSTRAINTS = ("catalog_product_store_slug_unique", "catalog_category_store_slug_unique")
+
+
+def draft_slug() -> str:
+    """Slug temporal de un borrador (aleatorio: no hace falta consultar si está libre)."""
+    return DRAFT_PREFIX + uuid.uuid4().hex[:12]
+
+
+class SlugAllocator:
+    def __init__(self, queryset, separator: str, preload: bool = False):
+        self.queryset = queryset
+        self.separator = separator
+        self._all: Optional[Set[str]] = set(queryset.values_list("slug", flat=True)) if preload else None
+        # base → sufijos ocupados (0 = la base sin sufijo)
+        self._taken: Dict[str, Set[int]] = {}
+
+    def _taken_for(self, base: str) -> Set[int]:
+        taken = self._taken.get(base)
+        if taken is None:
+            if self._all is not None:
+                candidates = self._all
+            else:
+                candidates = self.queryset.filter(slug__startswith=base).values_list("slug", flat=True)
+            pattern = re.compile(re.escape(base) + "(?:" + re.escape(self.separator) + r"(\d+))?")
+            taken = set()
+            for slug in candidates:
+                match = pattern.fullmatch(slug)
+                if match:
+                    taken.add(int(match.group(1) or 0))
+            self._taken[base] = taken
+        return taken
+
+    def allocate(self, base: str) -> str:
+        taken = self._taken_for(base)
+        suffix = 0
+        while suffix in taken:
+            suffix += 1
+        taken.add(suffix)
+        slug = f"{base}{self.separator}{suffix}" if suffix else base
+        if self._all is not None:
+            self._all.add(slug)
+        return slug
+
+    def reserve(self, slug: str) -> bool:
+        """Toma un slug ya asignado (al re-publicar se conserva). False si está ocupado."""
+        if self._all is None:
+            self._all = set(self.queryset.values_list("slug", flat=True))
+        if slug in self._all:
+            return False
+        self._all.add(slug)
+        # Las bases calculadas no lo incluyen: se recalculan desde _all
+        self._taken.clear()
+        return True
+
+    def forget(self, base: str) -> None:
+        """Descarta lo sabido de la base: la próxima asignación vuelve a consultar."""
+        self._taken.pop(base, None)
+        self._all = None
+
+
+def is_slug_conflict(error: IntegrityError) -> bool:
+    """El IntegrityError viene de una de SLUG_CONSTRAINTS (y no de otra restricción)."""
+    diag = getattr(error.__cause__, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint:
+        # Postgres informa el nombre de la restricción
+        return constraint in SLUG_CONSTRAINTS
+    # SQLite solo el mensaje: "UNIQUE constraint failed: catalog_product.store_id,
+    # catalog_product.slug" o, con condición, "... failed: index '<nombre>'"
+    message = str(error)
+    return message.startswith("UNIQUE constraint failed") and (
+        message.endswith(".slug") or any(f"'{name}'" in message for name in SLUG_CONSTRAINTS)
+    )
+
+
+def save_with_slug(instance, allocator: SlugAllocator, base: str, save: Callable[[], None], using=None) -> None:
+    """Asigna instance.slug y guarda con save(); reintenta si el slug se tomó en paralelo."""
+    for attempt in range(SAVE_ATTEMPTS):
+        instance.slug = allocator.allocate(base)
+        try:
+            with transaction.atomic(using=using):
+                save()
+            return
+        except IntegrityError as error:
+            if attempt == SAVE_ATTEMPTS - 1 or not is_slug_conflict(error):
+                raise
+            allocator.forget(base)
@@ -0,0 +1,173 @@
+"""
+Snapshot inmutable de los datos de tienda que usa el context processor site_settings.
+
+Se arma una vez por tienda (config + sucursales) y se guarda en el cache de Django
+(SITE_SETTINGS_CACHE_TTL), que tiene que ser compartido entre workers (ver CACHES en
+settings). Se invalida al guardar/borrar Store, StoreConfig o Branch (ver
+apps/catalog/signals.py), así que con el cache caliente no hay consultas a la BD. Las
+sucursales se guardan como dicts, no como instancias de modelo.
+También incluye la hoja de estilos del tema (colores) ya generada y su hash, que
+sirve theme_css_view en /theme/<tienda>-<hash>.css.
+El snapshot se arma siempre leyendo de la primaria (db_routing): de una réplica atrasada
+quedaría cacheado hasta la próxima invalidación.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+from apps.core import db_routing
+
+from .models import Branch, StoreConfig
+
+CACHE_KEY = "site_settings:store:{}"
+# Campos de Branch que usan las plantillas (footer)
+BRANCH_FIELDS = ("id", "country", "province", "city", "address", "hours", "location_url")
+
+# (clave de contexto, campo de StoreConfig, valor por defecto)
+STORE_COLOR_FIELDS = (
+    # Modo claro
+    ("STORE_COLOR_BG", "color_bg", "#ffffff"),
+    ("STORE_COLOR_SURFACE", "color_surface", "#f8f8f8"),
+    ("STORE_COLOR_SURFACE_SECONDARY", "color_surface_secondary", "#f0f0f0"),
+    ("STORE_COLOR_TEXT", "color_text", "#111111"),
+    ("STORE_COLOR_PRIMARY", "color_primary", "#3483fa"),
+    ("STORE_COLOR_PRIMARY_HOVER", "color_primary_hover", "#468cf6"),
+    ("STORE_COLOR_BORDER", "color_border", "#e0e0e0"),
+    ("STORE_COLOR_MUTED", "color_muted", "#6b6b6b"),
+    # Modo oscuro
+    ("STORE_COLOR_BG_DARK", "color_bg_dark", "#121212"),
+    ("STORE_COLOR_SURFACE_DARK", "color_surface_dark", "#1e1e1e"),
+    ("STORE_COLOR_SURFACE_SECONDARY_DARK", "color_surface_secondary_dark", "#2a2a2a"),
+    ("STORE_COLOR_TEXT_DARK", "color_text_dark", "#f5f5f5"),
+    ("STORE_COLOR_PRIMARY_DARK", "color_primary_dark", "#3483fa"),
+    ("STORE_COLOR_PRIMARY_HOVER_DARK", "color_primary_hover_dark", "#468cf6"),
+    ("STORE_COLOR_BORDER_DARK", "color_border_dark", "#333333"),
+    ("STORE_COLOR_MUTED_DARK", "color_muted_dark", "#aaaaaa"),
+)
+
+
+THEME_HASH_LENGTH = 12
+
+
+def _css_var(field_name: str) -> str:
+    """color_surface_secondary_dark -> --color-surface-secondary"""
+    return "--" + field_name.removesuffix("_dark").replace("_", "-")
+
+
+def build_theme_css(colors) -> str:
+    """Hoja de estilos con las variables --color-* de la tienda (modo claro y oscuro)."""
+    light, dark = [], []
+    for (key, value), (_, field_name, _default) in zip(colors, STORE_COLOR_FIELDS):
+        target = dark if field_name.endswith("_dark") else light
+        target.append(f"  {_css_var(field_name)}: {value};")
+    return (
+        '[data-theme="light"] {\n' + "\n".join(light) + "\n}\n"
+        '[data-theme="dark"] {\n' + "\n".join(dark) + "\n}\n"
+    )
+
+
+@dataclass(frozen=True)
+class StoreSnapshot:
+    site_name: str
+    has_config: bool = False
+    address: Optional[str] = None
+    hours: Optional[str] = None
+    country: Optional[str] = None
+    province: Optional[str] = None
+    city: Optional[str] = None
+    location_url: Optional[str] = None
+    whatsapp: Optional[str] = None
+    instagram_url: Optional[str] = None
+    logo_url: Optional[str] = None
+    branches: Tuple[dict, ...] = ()  # BRANCH_FIELDS de cada sucursal
+    colors: Tuple[Tuple[str, str], ...] = ()  # (clave de contexto, color)
+    store_slug: str = ""
+    theme_css: str = ""
+    theme_hash: str = ""
+
+    @property
+    def theme_url(self) -> str:
+        return reverse("catalog:theme_css", args=[self.store_slug, self.theme_hash])
+
+    def as_context(self) -> dict:
+        context = {
+            "SITE_NAME": self.site_name,
+            "STORE_ADDRESS": self.address,
+            "STORE_HOURS": self.hours,
+            "STORE_COUNTRY": self.country,
+            "STORE_PROVINCE": self.province,
+            "STORE_CITY": self.city,
+            "STORE_BRANCHES": [dict(branch) for branch in self.branches],
+            "STORE_LOCATION_URL": self.location_url,
+            "STORE_WHATSAPP": self.whatsapp,
+            "STORE_INSTAGRAM": self.instagram_url,
+            "STORE_LOGO_URL": self.logo_url,
+            "STORE_THEME_URL": self.theme_url,
+        }
+        context.update(self.colors)
+        return context
+
+
+def _with_theme(**kwargs) -> StoreSnapshot:
+    """El hash depende solo de los colores: cambia únicamente si se edita algún color."""
+    css = build_theme_css(kwargs["colors"])
+    kwargs["theme_css"] = css
+    kwargs["theme_hash"] = hashlib.sha256(css.encode()).hexdigest()[:THEME_HASH_LENGTH]
+    return StoreSnapshot(**kwargs)
+
+
+def build_snapshot(store) -> StoreSnapshot:
+    """Arma el snapshot desde la BD (config y sucursales)."""
+    config = StoreConfig.objects.filter(store=store).first()
+    if not config:
+        return _with_theme(
+            site_name=store.name,
+            store_slug=store.slug,
+            colors=tuple((key, default) for key, _, default in STORE_COLOR_FIELDS),
+        )
+    return _with_theme(
+        store_slug=store.slug,
+        site_name=store.name,
+        has_config=True,
+        address=config.address,
+        hours=config.hours,
+        country=config.country,
+        province=config.province,
+        city=config.city,
+        location_url=config.location_url,
+        whatsapp=config.whatsapp_number,
+        instagram_url=f"https://instagram.com/{config.instagram_username}" if config.instagram_username else None,
+        logo_url=config.logo.url if config.logo else None,
+        branches=tuple(Branch.objects.filter(store=store).order_by("id").values(*BRANCH_FIELDS)),
+        colors=tuple(
+            (key, getattr(config, field_name) or default)
+            for key, field_name, default in STORE_COLOR_FIELDS
+        ),
+    )
+
+
+def get_snapshot(store) -> StoreSnapshot:
+    key = CACHE_KEY.format(store.pk)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+    with db_routing.primary_reads():
+        snapshot = build_snapshot(store)
+    cache.set(key, snapshot, getattr(settings, "SITE_SETTINGS_CACHE_TTL", 300))
+    return snapshot
+
+
+def invalidate_snapshot(store_id) -> None:
+    """
+    Borra el snapshot ya y otra vez al confirmar la transacción: un request que lo rearme
+    entre medio lee los datos anteriores al cambio.
+    """
+    key = CACHE_KEY.format(store_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
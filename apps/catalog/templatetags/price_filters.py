@@ -1,11 +1,14 @@
+from decimal import InvalidOperation
+
 from django import template
 
+from ..cart import format_ars
+
 register = template.Library()
 
 @register.filter
 def ars(value):
     try:
-        value = int(value)
-        return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception:
+        return format_ars(value)
+    except (InvalidOperation, TypeError, ValueError):
         return value
\ No newline at end of file
@@ -1,3 +1,1670 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.db import models
+from django.db.models import Max
+from django.db.models.functions import Lower
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.client import FakePayload
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+import csv
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from urllib.parse import unquote, urlencode
+
+from apps.accounts.models import User
+from apps.core import db_routing, jobs, store_cache
+from apps.core.models import DEVELOPER_CONFIG_CACHE_KEY, DeveloperConfig, Job, Store
+
+from . import (
+    benchmark, bulk_actions, images, links, media_uploads, page_cache, pagination, product_io, reorder, search,
+    slugs, store_snapshot,
+)
+from . import cart as cart_helpers
+from .browse_state import BrowseState
+from .models import (
+    FAQ, Branch, Category, Product, ProductLink, ProductMedia, StoreConfig, StoreContentVersion, StoreFeedback,
+)
+from .urls import urlpatterns as catalog_urlpatterns
+from PIL import Image
+from .templatetags.price_filters import ars
+
+
+@override_settings(ALLOWED_HOSTS=["*"], STOREFRONT_PAGE_CACHE_TTL=0, STOREFRONT_CONCURRENT_READS=False)
+class StorefrontIndexTests(TestCase):
+    """Los planes de las consultas que corren las vistas de la tienda usan los índices compuestos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        category = Category.objects.create(store=cls.store, name="Remeras")
+        for i in range(30):
+            cls.product = Product.objects.create(
+                store=cls.store,
+                name=f"Remera {i}",
+                category=category,
+                price=100 + i,
+                status=Product.Status.PUBLISHED,
+            )
+            ProductMedia.objects.create(product=cls.product, image=f"products/images/{i}.png", order=0)
+
+    def setUp(self):
+        cache.clear()
+        if connection.vendor == "postgresql":
+            # Con tablas chicas Postgres prefiere seq scan; forzamos que evalúe los índices
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def view_query(self, url, prefix):
+        """SQL de la primera consulta de la vista que empieza con prefix."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_HOST="tienda.localhost")
+        self.assertEqual(response.status_code, 200)
+        sqls = [query["sql"] for query in ctx.captured_queries if query["sql"].startswith(prefix)]
+        self.assertTrue(sqls, f"{url} no hizo una consulta {prefix}")
+        return sqls[0]
+
+    def assertUsesIndex(self, sql, index_name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+            plan = "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+        self.assertIn(index_name, plan)
+
+    def test_catalog_sorts_use_indexes(self):
+        indexes = {
+            "newest": "catalog_prod_store_newest_idx",
+            "az": "catalog_prod_store_name_idx",
+            "za": "catalog_prod_store_name_idx",
+            "price_asc": "catalog_prod_store_price_idx",
+            "price_desc": "catalog_prod_store_price_idx",
+        }
+        for sort, index_name in indexes.items():
+            with self.subTest(sort=sort):
+                sql = self.view_query(f"{reverse('catalog:catalog')}?sort={sort}", 'SELECT "catalog_product"."id"')
+                self.assertUsesIndex(sql, index_name)
+
+    def test_category_sidebar_uses_index(self):
+        sql = self.view_query(reverse("catalog:catalog"), 'SELECT "catalog_category"')
+        self.assertUsesIndex(sql, "catalog_cat_store_active_idx")
+
+    def test_product_detail_uses_indexes(self):
+        url = reverse("catalog:product_detail", args=[self.product.slug])
+        # En SQLite la restricción (tienda, slug) queda como UNIQUE de la tabla (sin condición)
+        slug_index = (
+            "catalog_product_store_slug_unique" if connection.vendor == "postgresql" else "sqlite_autoindex_catalog_product"
+        )
+        self.assertUsesIndex(self.view_query(url, 'SELECT "catalog_product"'), slug_index)
+        self.assertUsesIndex(self.view_query(url, 'SELECT "catalog_productmedia"'), "catalog_media_active_order_idx")
+
+    def test_cart_thumbnails_use_media_index(self):
+        self.client.post(reverse("catalog:cart_add"), {"product_id": self.product.pk}, HTTP_HOST="tienda.localhost")
+        sql = self.view_query(reverse("catalog:cart_detail"), 'SELECT "col1"')
+        self.assertIn('"catalog_productmedia"', sql)
+        self.assertUsesIndex(sql, "catalog_media_active_order_idx")
+
+    # SQLite no usa índices compuestos para filtros booleanos ("is_read" sin "= 1")
+    @unittest.skipUnless(connection.vendor == "postgresql", "Solo Postgres")
+    def test_feedback_list_uses_index(self):
+        self.assertUsesIndex(
+            str(StoreFeedback.objects.filter(store=self.store, is_read=False).order_by("-created_at").query),
+            "catalog_feedback_store_idx",
+        )
+
+
+class CartPricingTests(TestCase):
+    """Motor de precios del carrito: Decimal, stock y carrito lleno (MAX_ITEMS líneas)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.products = []
+        for i in range(cart_helpers.MAX_ITEMS):
+            product = Product.objects.create(
+                store=cls.store,
+                name=f"Producto {i}",
+                price=Decimal("0.10") if i % 2 else Decimal("1234.55"),
+                stock=2 if i == 0 else None,
+                status=Product.Status.PUBLISHED,
+            )
+            for order in range(3):
+                ProductMedia.objects.create(product=product, image=f"products/images/{i}-{order}.png", order=order)
+            cls.products.append(product)
+
+    def session_with_all_products(self, quantity=3):
+        session = BrowseState()
+        for product in self.products:
+            cart_helpers.add_to_cart(session, self.store.id, product.id, quantity)
+        return session
+
+    def test_format_is_shared_with_ars_filter(self):
+        self.assertEqual(cart_helpers.format_ars(Decimal("1234567.5")), "1.234.567,50")
+        self.assertEqual(ars(Decimal("1234.55")), "1.234,55")
+        self.assertEqual(ars("no es precio"), "no es precio")
+
+    def test_totals_use_decimal_and_clamp_stock(self):
+        session = self.session_with_all_products()
+        priced = cart_helpers.price_cart(session, self.store)
+
+        self.assertEqual(priced.lines[0].qty, 2)
+        self.assertTrue(priced.clamped_to_stock)
+        self.assertEqual(cart_helpers.get_cart_for_store(session, self.store.id)[self.products[0].id], 2)
+        # 0.10 * 3 sumado 25 veces da exacto con Decimal (con float no)
+        expected = Decimal("1234.55") * 2 + Decimal("1234.55") * 3 * 24 + Decimal("0.10") * 3 * 25
+        self.assertEqual(priced.total, expected)
+        self.assertEqual(priced.total_display, f"${cart_helpers.format_ars(expected)}")
+
+    def test_unavailable_products_are_removed(self):
+        session = self.session_with_all_products(quantity=1)
+        Product.objects.filter(pk=self.products[1].pk).update(status=Product.Status.DRAFT)
+        priced = cart_helpers.price_cart(session, self.store)
+        self.assertTrue(priced.removed_unavailable)
+        self.assertEqual(len(priced.lines), cart_helpers.MAX_ITEMS - 1)
+        self.assertNotIn(self.products[1].id, cart_helpers.get_cart_for_store(session, self.store.id))
+
+    def test_benchmark_full_cart(self):
+        session = self.session_with_all_products()
+        # Productos + miniaturas: dos consultas sin importar la cantidad de líneas
+        with self.assertNumQueries(2):
+            priced = cart_helpers.price_cart(session, self.store)
+            thumbnails = [line.product.thumbnail for line in priced.lines]
+        self.assertEqual(len(priced.lines), cart_helpers.MAX_ITEMS)
+        self.assertTrue(all(thumb.order == 0 for thumb in thumbnails))
+
+        runs = 20
+        started = time.perf_counter()
+        for _ in range(runs):
+            cart_helpers.price_cart(session, self.store)
+        per_run_ms = (time.perf_counter() - started) * 1000 / runs
+        # Margen amplio: detecta regresiones groseras (N+1), no micro-variaciones
+        self.assertLess(per_run_ms, 250)
+
+
+@override_settings(ALLOWED_HOSTS=["*"], PROFILING_ENABLED=True, PROFILING_STRICT_BUDGETS=True)
+class QueryBudgetTests(TestCase):
+    """Cada URL de settings.QUERY_BUDGETS respeta su presupuesto de consultas (cache frío)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        cls.staff = User.objects.create_user("staff", password="x", is_staff=True)
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=cls.owner)
+        category = Category.objects.create(store=cls.store, name="Remeras")
+        for i in range(15):
+            cls.product = Product.objects.create(
+                store=cls.store,
+                name=f"Remera {i}",
+                category=category,
+                price=100 + i,
+                stock=5,
+                status=Product.Status.PUBLISHED,
+            )
+            ProductMedia.objects.create(product=cls.product, image=f"products/images/{i}.png", order=0)
+            ProductLink.objects.create(product=cls.product, link_type="whatsapp", button_text="Comprar")
+
+    def setUp(self):
+        cache.clear()
+        store_cache.clear()
+
+    def budgeted_paths(self):
+        args = {
+            "catalog:product_detail": [self.product.slug],
+            "catalog:product_update": [self.product.pk],
+        }
+        for name, budget in settings.QUERY_BUDGETS.items():
+            yield name, reverse(name, args=args.get(name)), budget
+
+    def assertWithinBudgets(self):
+        for name, path, budget in self.budgeted_paths():
+            with self.subTest(view=name):
+                cache.clear()
+                response = self.client.get(path, HTTP_HOST="tienda.localhost")
+                profile = response.wsgi_request.profile
+                self.assertEqual(profile.view_name, name)
+                self.assertLessEqual(profile.view_sql_count, budget)
+                # Sesión, usuario y middlewares quedan fuera del presupuesto
+                self.assertLessEqual(profile.view_sql_count, profile.sql_count)
+
+    def test_anonymous_within_budget(self):
+        self.assertWithinBudgets()
+
+    def test_owner_within_budget(self):
+        self.client.force_login(self.owner)
+        self.assertWithinBudgets()
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get(reverse("catalog:catalog"), HTTP_HOST="tienda.localhost")
+        response = self.client.get(reverse("profiling_stats"))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.staff)
+        rows = self.client.get(reverse("profiling_stats")).json()["views"]
+        self.assertIn(("catalog:catalog", "tienda"), {(row["view"], row["store"]) for row in rows})
+
+
+@override_settings(ALLOWED_HOSTS=["*"], PROFILING_ENABLED=True, PROFILING_STRICT_BUDGETS=True)
+class BenchmarkSuiteTests(TestCase):
+    """Consultas de todas las URLs del catálogo contra benchmarks/baseline.json (ver benchmark.py)."""
+
+    def setUp(self):
+        cache.clear()
+        store_cache.clear()
+
+    def test_every_catalog_url_is_benchmarked(self):
+        seeded = benchmark.seed_store(10)
+        names = {name for name, _, _, _ in benchmark.url_specs(seeded)}
+        self.assertEqual(names, {f"catalog:{pattern.name}" for pattern in catalog_urlpatterns})
+
+    def test_query_counts_match_baseline(self):
+        with open(benchmark.BASELINE_PATH, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        # La línea base solo guarda lo que se verifica acá
+        self.assertEqual(set(baseline), {"10"})
+        results = {"10": benchmark.run_benchmark(benchmark.seed_store(10), repeat=2)}
+        self.assertEqual(benchmark.compare(results, baseline, metrics=("queries",)), [])
+
+    def test_query_counts_do_not_grow_with_store_size(self):
+        small = benchmark.run_benchmark(benchmark.seed_store(10), repeat=1)
+        cache.clear()
+        large = benchmark.run_benchmark(benchmark.seed_store(150), repeat=1)
+        for session, rows in small.items():
+            for name, row in rows.items():
+                with self.subTest(session=session, url=name):
+                    self.assertEqual(large[session][name]["queries"], row["queries"])
+
+
+class ImageDerivativeTests(TestCase):
+    """Derivados de ProductMedia: anchos sin agrandar, formatos modernos y srcset en las plantillas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root, ALLOWED_HOSTS=["*"])
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user("owner", password="x")
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        self.product = Product.objects.create(
+            store=self.store, name="Remera", price=100, status=Product.Status.PUBLISHED
+        )
+
+    def upload(self, size=(1200, 900), mode="RGB", fmt="JPEG", name="foto.jpg"):
+        buffer = BytesIO()
+        Image.new(mode, size, "red").save(buffer, fmt)
+        with self.captureOnCommitCallbacks(execute=True):
+            media = ProductMedia.objects.create(
+                product=self.product, image=SimpleUploadedFile(name, buffer.getvalue()), order=0
+            )
+        media.refresh_from_db()
+        return media
+
+    def test_derivatives_generated_after_upload(self):
+        media = self.upload()
+        self.assertTrue(media.has_current_derivatives)
+        self.assertEqual(media.derivatives["fallback"], "jpeg")
+        for fmt in ["jpeg", *images.modern_formats()]:
+            self.assertEqual(sorted(media.derivatives["files"][fmt]), ["320", "800"])
+        with Image.open(media.image.storage.open(media.derivatives["files"]["webp"]["320"])) as card:
+            self.assertEqual(card.size, (320, 240))
+        self.assertIn(" 320w, ", media.image_srcset)
+        self.assertTrue(media.card_url.endswith("-320.jpg"))
+        self.assertTrue(media.detail_url.endswith("-800.jpg"))
+
+    def test_small_transparent_image_is_not_upscaled(self):
+        media = self.upload(size=(200, 100), mode="RGBA", fmt="PNG", name="logo.png")
+        self.assertEqual(media.derivatives["fallback"], "png")
+        self.assertEqual(list(media.derivatives["files"]["png"]), ["200"])
+        self.assertEqual(media.card_url, media.detail_url)
+
+    def test_replaced_image_falls_back_to_original(self):
+        media = self.upload()
+        media.image.name = "products/images/otra.jpg"
+        self.assertFalse(media.has_current_derivatives)
+        self.assertEqual(media.image_srcset, "")
+        self.assertEqual(media.card_url, media.image.url)
+
+    def test_templates_render_picture_sources(self):
+        media = self.upload()
+        response = self.client.get(reverse("catalog:catalog"), HTTP_HOST="tienda.localhost")
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, media.card_url)
+        response = self.client.get(
+            reverse("catalog:product_detail", args=[self.product.slug]), HTTP_HOST="tienda.localhost"
+        )
+        self.assertContains(response, media.detail_url)
+        self.assertContains(response, 'class="slide"')
+
+
+class MediaUploadQueueTests(TestCase):
+    """La subida responde con ids de tarea; el worker crea el ProductMedia y sus derivados."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=f"{cls.tmp_root}/media",
+            MEDIA_UPLOAD_STAGING_DIR=f"{cls.tmp_root}/staging",
+            ALLOWED_HOSTS=["*"],
+            JOBS_RUN_INLINE=False,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.tmp_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+        self.product = Product.objects.create(
+            store=self.store, name="Remera", price=100, status=Product.Status.PUBLISHED
+        )
+        self.client.force_login(self.owner)
+
+    def post_files(self, *names):
+        files = []
+        for name in names:
+            buffer = BytesIO()
+            Image.new("RGB", (1000, 500), "blue").save(buffer, "JPEG")
+            files.append(SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg"))
+        response = self.client.post(
+            reverse("catalog:product_media_upload", args=[self.product.pk]),
+            {"files": files},
+            HTTP_HOST="tienda.localhost",
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()["jobs"]
+
+    def job_statuses(self, ids, product=None):
+        response = self.client.get(
+            reverse("catalog:product_media_jobs", args=[(product or self.product).pk]),
+            {"ids": ",".join(map(str, ids))},
+            HTTP_HOST="tienda.localhost",
+        )
+        self.assertEqual(response.status_code, 200)
+        return {job["id"]: job for job in response.json()["jobs"]}
+
+    def test_upload_is_queued_and_processed_by_worker(self):
+        ids = self.post_files("a.jpg", "b.jpg")
+        self.assertEqual(len(ids), 2)
+        self.assertFalse(self.product.media.exists())
+        self.assertEqual({job["status"] for job in self.job_statuses(ids).values()}, {"pending"})
+
+        while jobs.run_next("test"):
+            pass
+
+        statuses = self.job_statuses(ids)
+        self.assertEqual({job["status"] for job in statuses.values()}, {"done"})
+        media = list(self.product.media.order_by("order"))
+        self.assertEqual([m.pk for m in media], [statuses[job_id]["media_id"] for job_id in ids])
+        self.assertEqual([m.order for m in media], [reorder.ORDER_STEP, 2 * reorder.ORDER_STEP])
+        # La señal post_save encoló los derivados y el mismo worker los generó
+        self.assertTrue(all(m.has_current_derivatives for m in media))
+        self.assertFalse(Job.objects.exclude(status=Job.Status.DONE).exists())
+
+    def test_status_is_scoped_to_store_product(self):
+        ids = self.post_files("a.jpg")
+        other_owner = User.objects.create_user("other", password="x", is_owner=True)
+        other_store = Store.objects.create(name="Otra", slug="otra", owner=other_owner)
+        foreign = Job.objects.create(kind="catalog.media_upload", store=other_store, payload={"product_id": self.product.pk})
+        other_product = Product.objects.create(
+            store=self.store, name="Buzo", price=100, status=Product.Status.PUBLISHED
+        )
+        self.assertEqual(list(self.job_statuses(ids + [foreign.pk])), ids)
+        self.assertEqual(self.job_statuses(ids, product=other_product), {})
+
+    def test_inline_mode_runs_on_commit(self):
+        with override_settings(JOBS_RUN_INLINE=True), self.captureOnCommitCallbacks(execute=True):
+            ids = self.post_files("a.jpg")
+        status = self.job_statuses(ids)[ids[0]]
+        self.assertEqual(status["status"], "done")
+        self.assertTrue(ProductMedia.objects.get(pk=status["media_id"]).image.name.endswith("a.jpg"))
+
+    def test_inline_failure_ends_failed(self):
+        def broken(job):
+            raise OSError("storage caído")
+
+        with mock.patch.dict(jobs._handlers, {media_uploads.UPLOAD_JOB: broken}), \
+                override_settings(JOBS_RUN_INLINE=True), self.assertLogs("apps.core.jobs", "WARNING"), \
+                self.captureOnCommitCallbacks(execute=True):
+            ids = self.post_files("a.jpg")
+        # Sin worker los reintentos son en el momento: la tarea no queda pendiente para siempre
+        self.assertEqual(self.job_statuses(ids)[ids[0]]["status"], "failed")
+        self.assertEqual(Job.objects.get(pk=ids[0]).attempts, 3)
+
+    def test_stale_lock_is_reclaimed_until_attempts_run_out(self):
+        stale = timezone.now() - timedelta(hours=1)
+        retry, exhausted = (
+            Job.objects.create(
+                kind=media_uploads.UPLOAD_JOB, status=Job.Status.RUNNING, locked_at=stale,
+                locked_by="caido", attempts=attempts, max_attempts=3,
+            )
+            for attempts in (1, 3)
+        )
+        claimed = jobs.claim("test")
+        self.assertEqual((claimed.pk, claimed.attempts, claimed.locked_by), (retry.pk, 2, "test"))
+        self.assertIsNone(jobs.claim("test"))
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Job.Status.FAILED)
+
+    def test_result_is_dropped_when_another_worker_took_the_lock(self):
+        ids = self.post_files("a.jpg")
+        job = jobs.claim("lento")
+        # El lock venció mientras subía y otro worker la retomó
+        Job.objects.filter(pk=job.pk).update(locked_by="otro")
+        with self.assertLogs("apps.core.jobs", "WARNING"):
+            jobs.execute(job)
+        job.refresh_from_db()
+        self.assertEqual((job.pk, job.status, job.locked_by), (ids[0], Job.Status.RUNNING, "otro"))
+        self.assertFalse(self.product.media.exists())
+
+    def test_reclaimed_upload_does_not_create_media_twice(self):
+        ids = self.post_files("a.jpg")
+        job = jobs.claim("caido")
+        # El worker creó la media y se cayó antes de marcar la tarea terminada
+        result = media_uploads.process_upload(job)
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        jobs.execute(jobs.claim("test"))
+        status = self.job_statuses(ids)[ids[0]]
+        self.assertEqual((status["status"], status["media_id"]), ("done", result["media_id"]))
+        self.assertEqual(list(self.product.media.values_list("pk", flat=True)), [result["media_id"]])
+
+    def jpeg_bytes(self):
+        buffer = BytesIO()
+        Image.new("RGB", (1000, 500), "blue").save(buffer, "JPEG")
+        return buffer.getvalue()
+
+    def init_chunked(self, content, content_type="image/jpeg", name="grande.jpg"):
+        response = self.client.post(
+            reverse("catalog:product_media_chunked_init", args=[self.product.pk]),
+            json.dumps({"file_name": name, "size": len(content), "content_type": content_type}),
+            content_type="application/json",
+            HTTP_HOST="tienda.localhost",
+        )
+        return response
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            reverse("catalog:product_media_chunk", args=[self.product.pk, upload_id]),
+            data,
+            content_type="application/octet-stream",
+            HTTP_HOST="tienda.localhost",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    @override_settings(MEDIA_UPLOAD_CHUNK_SIZE=1024)
+    def test_chunked_upload_resumes_and_finalizes(self):
+        content = self.jpeg_bytes()
+        response = self.init_chunked(content)
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()["upload_id"]
+        self.assertEqual(response.json()["chunk_size"], 1024)
+
+        self.assertEqual(self.put_chunk(upload_id, 0, content[:1024]).json()["offset"], 1024)
+        # Parte repetida tras un corte: 409 con el offset que tiene el servidor
+        response = self.put_chunk(upload_id, 0, content[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 1024)
+        # Parte más grande que MEDIA_UPLOAD_CHUNK_SIZE: se rechaza sin tocar lo recibido
+        self.assertEqual(self.put_chunk(upload_id, 1024, content[1024:3000]).status_code, 413)
+        status = self.client.get(
+            reverse("catalog:product_media_chunk", args=[self.product.pk, upload_id]), HTTP_HOST="tienda.localhost"
+        )
+        offset = status.json()["offset"]
+        self.assertEqual(offset, 1024)
+
+        finalize_url = reverse("catalog:product_media_chunked_finalize", args=[self.product.pk, upload_id])
+        self.assertEqual(self.client.post(finalize_url, HTTP_HOST="tienda.localhost").status_code, 409)
+        while offset < len(content):
+            offset = self.put_chunk(upload_id, offset, content[offset:offset + 1024]).json()["offset"]
+        response = self.client.post(finalize_url, HTTP_HOST="tienda.localhost")
+        self.assertEqual(response.status_code, 202)
+
+        while jobs.run_next("test"):
+            pass
+        media = self.product.media.get()
+        self.assertTrue(media.image.name.endswith("grande.jpg"))
+        self.assertEqual(media.image.read(), content)
+
+    @unittest.skipIf(media_uploads.fcntl is None, "sin fcntl no hay lock del .part")
+    def test_concurrent_chunk_is_rejected_while_another_is_written(self):
+        content = self.jpeg_bytes()
+        upload_id = self.init_chunked(content).json()["upload_id"]
+        upload = media_uploads.get_chunked(self.product, upload_id)
+        # Otro PUT de la misma subida está escribiendo
+        with media_uploads._locked_part(media_uploads.staging_storage().path(upload.part_name)):
+            response = self.put_chunk(upload_id, 0, content)
+            # 409 sin offset: no es un offset equivocado, es reintentar más tarde
+            self.assertEqual((response.status_code, response.json().get("offset")), (409, None))
+            finalize_url = reverse("catalog:product_media_chunked_finalize", args=[self.product.pk, upload_id])
+            response = self.client.post(finalize_url, HTTP_HOST="tienda.localhost")
+            self.assertEqual((response.status_code, response.json().get("offset")), (409, None))
+        self.assertEqual(upload.offset, 0)
+        self.assertEqual(self.put_chunk(upload_id, 0, content).json()["offset"], len(content))
+
+    def test_chunked_upload_validates_type_and_content(self):
+        self.assertEqual(self.init_chunked(b"%PDF-1.4", content_type="application/pdf").status_code, 415)
+        with override_settings(MEDIA_UPLOAD_MAX_IMAGE_BYTES=10):
+            self.assertEqual(self.init_chunked(self.jpeg_bytes()).status_code, 413)
+
+        # Declarado como imagen pero el contenido no lo es: se descarta con la primera parte
+        fake = b"<html>" + b"x" * 100
+        upload_id = self.init_chunked(fake).json()["upload_id"]
+        self.assertEqual(self.put_chunk(upload_id, 0, fake).status_code, 415)
+        status = self.client.get(
+            reverse("catalog:product_media_chunk", args=[self.product.pk, upload_id]), HTTP_HOST="tienda.localhost"
+        )
+        self.assertEqual(status.status_code, 404)
+
+
+class ProductImportExportTests(TestCase):
+    """Importación masiva con las reglas de ProductForm y exportación en streaming."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_UPLOAD_STAGING_DIR=cls.tmp_root, ALLOWED_HOSTS=["*"])
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.tmp_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+        StoreConfig.objects.create(store=self.store, default_link_whatsapp=True, default_link_instagram=False)
+        self.category = Category.objects.create(store=self.store, name="Remeras")
+        self.existing = Product.objects.create(
+            store=self.store, name="Remera", price=100, category=self.category, status=Product.Status.PUBLISHED
+        )
+
+    def import_csv(self, text):
+        return product_io.import_products(self.store, product_io.read_rows(BytesIO(text.encode()), "csv"))
+
+    def test_import_creates_updates_and_reports_errors(self):
+        report = self.import_csv(
+            "id,name,category,price,stock,status\n"
+            ",Remera,remeras,150,3,\n"
+            ",Buzo,,2000.50,,borrador\n"
+            f"{self.existing.pk},Remera básica,Remeras,120,,\n"
+            ",Gorra,Sombreros,10,,\n"
+            ",Sin precio,,,,published\n"
+            "999999,Ajeno,,10,,\n"
+        )
+        self.assertEqual((report.created, report.updated, report.error_count), (2, 1, 3))
+        self.assertEqual([error["line"] for error in report.errors], [5, 6, 7])
+        self.assertIn("category", report.errors[0]["errors"])
+        self.assertIn("price", report.errors[1]["errors"])
+        self.assertIn("id", report.errors[2]["errors"])
+
+        new = Product.objects.get(store=self.store, name="Remera", price=150)
+        # Mismo nombre que un producto existente: slug con sufijo, como Product.save
+        self.assertEqual(new.slug, "remera_1")
+        self.assertEqual(new.stock, 3)
+        self.assertEqual(list(new.links.values_list("link_type", flat=True)), ["whatsapp"])
+        draft = Product.objects.get(store=self.store, name="Buzo")
+        self.assertTrue(draft.is_draft)
+        self.assertTrue(draft.slug.startswith("_draft_"))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.price), ("Remera básica", Decimal("120")))
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.published_product_count, 2)
+
+    def test_jsonl_update_keeps_missing_columns(self):
+        lines = BytesIO(
+            (json.dumps({"id": self.existing.pk, "stock": 7}) + "\nno es json\n").encode()
+        )
+        report = product_io.import_products(self.store, product_io.read_rows(lines, "jsonl"))
+        self.assertEqual((report.updated, report.error_count), (1, 1))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.price, self.existing.stock), ("Remera", Decimal("100"), 7))
+        self.assertEqual(self.existing.category, self.category)
+
+    def test_export_round_trip_and_views(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse("catalog:product_export"), HTTP_HOST="tienda.localhost")
+        self.assertTrue(response.streaming)
+        exported = b"".join(response.streaming_content).decode()
+        self.assertEqual(exported.splitlines()[0], ",".join(product_io.COLUMNS))
+        self.assertIn(f"{self.existing.pk},Remera,remera,Remeras,,100.00,,published", exported)
+
+        upload = SimpleUploadedFile("productos.csv", exported.replace("Remera,remera", "Remera XL,remera").encode())
+        with override_settings(JOBS_RUN_INLINE=True), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("catalog:product_import"), {"file": upload}, HTTP_HOST="tienda.localhost"
+            )
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(response["Location"], HTTP_HOST="tienda.localhost")
+        self.assertContains(response, "Actualizados: <strong>1</strong>")
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Remera XL")
+
+    def test_csv_export_escapes_formulas_and_round_trips(self):
+        Product.objects.filter(pk=self.existing.pk).update(name="=HYPERLINK(\"http://x\")", description="-5 cm")
+        other = Product.objects.create(
+            store=self.store, name="@Remera", description="'=ya escapado", price=1, status=Product.Status.PUBLISHED
+        )
+        exported = "".join(product_io.export_lines(self.store))
+        rows = {row["id"]: row for row in csv.DictReader(exported.splitlines())}
+        self.assertEqual(rows[str(self.existing.pk)]["name"], "'=HYPERLINK(\"http://x\")")
+        self.assertEqual(rows[str(self.existing.pk)]["description"], "'-5 cm")
+        other_row = rows[str(other.pk)]
+        self.assertEqual((other_row["name"], other_row["description"]), ("'@Remera", "''=ya escapado"))
+
+        report = self.import_csv(exported)
+        self.assertEqual((report.unchanged, report.error_count), (2, 0))
+
+    def test_import_job_is_not_repeated_after_commit(self):
+        upload = SimpleUploadedFile("productos.csv", b"name,price\nBuzo,10\n")
+        with override_settings(JOBS_RUN_INLINE=False), self.captureOnCommitCallbacks(execute=True):
+            job = product_io.enqueue_import(self.store, upload)
+        jobs.execute(jobs.claim("test"))
+        # El worker se cayó después de confirmar y otro la vuelve a ejecutar
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.RUNNING, locked_by="otro")
+        job.refresh_from_db()
+        jobs.execute(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result["created"]), (Job.Status.DONE, 1))
+        self.assertEqual(Product.objects.filter(store=self.store, name="Buzo").count(), 1)
+
+
+
+class SlugAllocationTests(TestCase):
+    """Slugs únicos con una consulta por base (no una por colisión) y reintento ante carreras."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+
+    def publish(self, name):
+        return Product.objects.create(store=self.store, name=name, price=1, status=Product.Status.PUBLISHED)
+
+    def save_queries(self, name):
+        with CaptureQueriesContext(connection) as ctx:
+            product = self.publish(name)
+        return product, len(ctx.captured_queries)
+
+    def test_collisions_get_next_suffix_with_constant_queries(self):
+        _, baseline = self.save_queries("Buzo")
+        slugs_found = [self.publish("Remera").slug for _ in range(12)]
+        self.assertEqual(slugs_found, ["remera"] + [f"remera_{i}" for i in range(1, 12)])
+        product, queries = self.save_queries("Remera")
+        self.assertEqual(product.slug, "remera_12")
+        self.assertEqual(queries, baseline)
+
+        # Los números del nombre se conservan: "Remera 2" no choca con "Remera"
+        self.assertEqual(self.publish("Remera 2").slug, "remera_2_1")
+        self.assertEqual(self.publish("Remera 24").slug, "remera_24")
+
+    def test_category_collisions(self):
+        first = Category.objects.create(store=self.store, name="Remeras")
+        second = Category.objects.create(store=self.store, name="Remeras")
+        self.assertEqual((first.slug, second.slug), ("remeras", "remeras-1"))
+
+    def test_draft_publish_and_race_retry(self):
+        self.publish("Remera")
+        draft = Product.objects.create(store=self.store, name="Remera", price=1, slug=slugs.draft_slug())
+        draft.status = Product.Status.PUBLISHED
+
+        # Otro request tomó el slug entre la consulta y el INSERT: el primer intento choca
+        taken_for = slugs.SlugAllocator._taken_for
+        with mock.patch.object(slugs.SlugAllocator, "_taken_for", autospec=True) as patched:
+            patched.side_effect = lambda allocator, base: (
+                set() if patched.call_count == 1 else taken_for(allocator, base)
+            )
+            draft.save()
+        self.assertEqual(patched.call_count, 2)
+        draft.refresh_from_db()
+        self.assertEqual(draft.slug, "remera_1")
+
+    def test_only_slug_conflicts_are_retried(self):
+        Category.objects.create(store=self.store, name="Remeras")
+        with self.assertRaises(IntegrityError) as slug_error, transaction.atomic():
+            Category.objects.bulk_create([Category(store=self.store, name="Otra", slug="remeras")])
+        self.assertTrue(slugs.is_slug_conflict(slug_error.exception))
+        with self.assertRaises(IntegrityError) as other_error, transaction.atomic():
+            Store.objects.create(name="Otra", slug="otra", owner=self.owner)
+        self.assertFalse(slugs.is_slug_conflict(other_error.exception))
+
+        save = mock.Mock(side_effect=other_error.exception)
+        product = Product(store=self.store, name="Remera")
+        allocator = slugs.SlugAllocator(Product.objects.filter(store=self.store), "_")
+        with self.assertRaises(IntegrityError):
+            slugs.save_with_slug(product, allocator, "remera", save)
+        self.assertEqual(save.call_count, 1)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ProductBulkActionTests(TestCase):
+    """Acciones masivas del listado: una transacción y consultas por conjunto, no por producto."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+        self.category = Category.objects.create(store=self.store, name="Remeras")
+        self.published = Product.objects.create(
+            store=self.store, name="Remera", price=100, category=self.category, status=Product.Status.PUBLISHED
+        )
+
+    def drafts(self, count, **kwargs):
+        return [
+            Product.objects.create(
+                store=self.store, name=kwargs.get("name", "Remera"), price=kwargs.get("price", 10),
+                category=self.category, slug=slugs.draft_slug(),
+            )
+            for _ in range(count)
+        ]
+
+    def post(self, action, products, **data):
+        self.client.force_login(self.owner)
+        return self.client.post(
+            reverse("catalog:product_list") + "?sort=az",
+            {"action": action, "products": [product.pk for product in products], **data},
+            HTTP_HOST="tienda.localhost",
+        )
+
+    def publish_queries(self, products):
+        with CaptureQueriesContext(connection) as ctx:
+            bulk_actions.apply_action(self.store, [product.pk for product in products], "publish", {})
+        return len(ctx.captured_queries)
+
+    def test_publish_allocates_slugs_in_batch(self):
+        few = self.publish_queries(self.drafts(2))
+        many = self.publish_queries(self.drafts(20))
+        self.assertEqual(few, many)
+
+        slugs_found = set(Product.objects.filter(store=self.store).values_list("slug", flat=True))
+        self.assertEqual(slugs_found, {"remera"} | {f"remera_{i}" for i in range(1, 23)})
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.published_product_count, 23)
+
+    def test_republish_keeps_own_slug_and_skips_incomplete(self):
+        self.published.status = Product.Status.DRAFT
+        self.published.save()
+        newer = Product.objects.create(store=self.store, name="Remera", price=5, status=Product.Status.PUBLISHED)
+        incomplete = self.drafts(1, price=None)
+
+        result = bulk_actions.apply_action(self.store, [self.published.pk, incomplete[0].pk], "publish", {})
+        self.assertEqual((result.changed, result.skipped), (1, 1))
+        self.published.refresh_from_db()
+        self.assertEqual((self.published.status, self.published.slug, newer.slug), ("published", "remera", "remera_1"))
+        self.assertEqual(Product.objects.get(pk=incomplete[0].pk).status, Product.Status.DRAFT)
+
+    def test_view_actions_and_ownership(self):
+        products = [self.published] + self.drafts(2, price=None)
+        other_owner = User.objects.create_user("other", password="x", is_owner=True)
+        other_store = Store.objects.create(name="Otra", slug="otra", owner=other_owner)
+        foreign = Product.objects.create(store=other_store, name="Ajeno", price=1, status=Product.Status.PUBLISHED)
+
+        response = self.post("set_stock", products + [foreign], stock=3)
+        self.assertRedirects(response, reverse("catalog:product_list") + "?sort=az", fetch_redirect_response=False)
+        self.assertFalse(Product.objects.filter(stock=3).exists())
+
+        self.post("adjust_price", products, percent="-10")
+        self.published.refresh_from_db()
+        self.assertEqual(self.published.price, Decimal("90.00"))
+
+        self.post("set_category", products)
+        self.post("draft", products)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.published_product_count, 0)
+        self.assertFalse(Product.objects.filter(store=self.store, category__isnull=False).exists())
+
+        ProductLink.objects.create(product=self.published, link_type="whatsapp", order=0)
+        self.post("delete", products)
+        self.assertFalse(Product.objects.filter(store=self.store).exists())
+        self.assertFalse(ProductLink.objects.exists())
+        self.assertTrue(Product.objects.filter(pk=foreign.pk).exists())
+
+    def test_select_all_matching_filters_past_the_field_limit(self):
+        other = Category.objects.create(store=self.store, name="Buzos")
+        Product.objects.bulk_create([
+            Product(store=self.store, name=f"Remera {i}", price=10, category=self.category, slug=f"r{i}")
+            for i in range(settings.DATA_UPLOAD_MAX_NUMBER_FIELDS + 200)
+        ])
+        outside = Product.objects.create(store=self.store, name="Buzo", price=10, category=other, slug="b")
+        self.client.force_login(self.owner)
+        response = self.client.post(
+            reverse("catalog:product_list") + f"?category={self.category.slug}",
+            {"action": "set_stock", "stock": 4, "select": "all"},
+            HTTP_HOST="tienda.localhost",
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Product.objects.filter(category=self.category).exclude(stock=4).exists())
+        outside.refresh_from_db()
+        self.assertIsNone(outside.stock)
+
+    def test_raw_delete_covers_every_relation(self):
+        # Un modelo nuevo con FK a Product haría que _delete caiga en delete() (ver DELETE_MODELS)
+        self.assertTrue(bulk_actions._raw_delete_is_safe())
+
+
+@override_settings(ALLOWED_HOSTS=["*"], OWNER_PRODUCTS_PER_PAGE=3, OWNER_PRODUCTS_EXACT_COUNT_LIMIT=5)
+class OwnerProductListTests(TestCase):
+    """Listado del panel paginado por cursor, con conteo acotado y solo las columnas de la tabla."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+        self.category = Category.objects.create(store=self.store, name="Remeras")
+        for i in range(7):
+            Product.objects.create(
+                store=self.store, name=f"Producto {i}", price=10 + i, category=self.category,
+                status=Product.Status.PUBLISHED, description="x" * 1000,
+            )
+        self.client.force_login(self.owner)
+
+    def get(self, query=""):
+        return self.client.get(reverse("catalog:product_list") + query, HTTP_HOST="tienda.localhost")
+
+    def test_cursor_pages_and_count_estimate(self):
+        response = self.get("?sort=az")
+        page = response.context["page_obj"]
+        self.assertEqual([p.name for p in page], ["Producto 0", "Producto 1", "Producto 2"])
+        self.assertIn("description", page.object_list[0].get_deferred_fields())
+        self.assertEqual(response.context["total"], pagination.CountEstimate(5, exact=False, at_least=True))
+        self.assertContains(response, "Más de 5 productos")
+
+        # Una página cualquiera cuesta lo mismo que la primera
+        with CaptureQueriesContext(connection) as first:
+            self.get("?sort=az")
+        with CaptureQueriesContext(connection) as later:
+            response = self.get(f"?sort=az&after={page.next_cursor}")
+        self.assertEqual([p.name for p in response.context["page_obj"]], ["Producto 3", "Producto 4", "Producto 5"])
+        self.assertEqual(len(first.captured_queries), len(later.captured_queries))
+
+    def test_exact_count_with_filters(self):
+        response = self.get("?q=Producto+3")
+        self.assertEqual(response.context["total"].value, 1)
+        self.assertContains(response, "1 producto con estos filtros")
+
+
+@override_settings(ALLOWED_HOSTS=["*"], CATALOG_CURSOR_PAGINATION=True, STOREFRONT_PAGE_CACHE_TTL=0)
+class StorefrontCursorPaginationTests(TestCase):
+    """Catálogo público con ?after= / ?before=: tokens, precios NULL y tokens inválidos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        for i in range(26):
+            Product.objects.create(
+                store=cls.store, name=f"Producto {i:02d}", status=Product.Status.PUBLISHED,
+                # Precios repetidos (desempate por id) y algunos sin precio
+                price=None if i % 5 == 0 else 10 + i % 3,
+            )
+
+    def get(self, query):
+        response = self.client.get(reverse("catalog:catalog") + query, HTTP_HOST="tienda.localhost")
+        return response.context["page_obj"]
+
+    def names(self, page):
+        return [product.name for product in page]
+
+    def walk(self, sort):
+        """Todas las páginas hacia adelante; después vuelve una con ?before=."""
+        pages = [self.get(f"?sort={sort}")]
+        while pages[-1].has_next():
+            pages.append(self.get(f"?sort={sort}&after={pages[-1].next_cursor}"))
+        back = self.get(f"?sort={sort}&before={pages[-1].previous_cursor}")
+        self.assertEqual(self.names(back), self.names(pages[-2]))
+        return [product for page in pages for product in page]
+
+    def test_next_and_previous_tokens(self):
+        first = self.get("?sort=az")
+        self.assertEqual(self.names(first), [f"Producto {i:02d}" for i in range(12)])
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+
+        second = self.get(f"?sort=az&after={first.next_cursor}")
+        self.assertEqual(self.names(second), [f"Producto {i:02d}" for i in range(12, 24)])
+        self.assertTrue(second.has_previous())
+
+        back = self.get(f"?sort=az&before={second.previous_cursor}")
+        self.assertEqual(self.names(back), self.names(first))
+        self.assertFalse(back.has_previous())
+
+        last = self.get(f"?sort=az&after={second.next_cursor}")
+        self.assertEqual(self.names(last), ["Producto 24", "Producto 25"])
+        self.assertFalse(last.has_next())
+
+    def test_null_prices_go_last_in_both_directions(self):
+        for sort, descending in (("price_asc", False), ("price_desc", True)):
+            with self.subTest(sort=sort):
+                products = self.walk(sort)
+                self.assertEqual(len({product.pk for product in products}), 26)
+                prices = [product.price for product in products]
+                self.assertEqual(prices[-6:], [None] * 6)
+                self.assertEqual(prices[:-6], sorted(prices[:-6], reverse=descending))
+
+    def test_invalid_token_falls_back_to_first_page(self):
+        first = self.names(self.get("?sort=az"))
+        self.assertEqual(self.names(self.get("?sort=az&after=no-es-un-token")), first)
+        # Token de otro orden
+        other = self.get("?sort=newest").next_cursor
+        self.assertEqual(self.names(self.get(f"?sort=az&before={other}")), first)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ReorderTests(TestCase):
+    """Reordenamiento en un UPDATE y movimientos que escriben una sola fila (claves espaciadas)."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+        # Claves 0, 1, 2... como las dejaba el reordenamiento anterior
+        self.faqs = [
+            FAQ.objects.create(store=self.store, question=f"Pregunta {i}", answer="R", order=i) for i in range(5)
+        ]
+        self.client.force_login(self.owner)
+
+    def post(self, url, body):
+        return self.client.post(url, json.dumps(body), content_type="application/json", HTTP_HOST="tienda.localhost")
+
+    def faq_order(self):
+        return list(FAQ.objects.filter(store=self.store).order_by("order", "pk").values_list("pk", flat=True))
+
+    def test_full_order_and_moves(self):
+        url = reverse("catalog:faq_reorder")
+        ids = [faq.pk for faq in self.faqs]
+        new_order = [ids[3], ids[0], ids[4]]
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.post(url, {"order": new_order}).status_code, 204)
+        updates = [query["sql"] for query in ctx.captured_queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(sum(FAQ._meta.db_table in sql for sql in updates), 1)
+        # Los que no vinieron quedan al final en su orden
+        self.assertEqual(self.faq_order(), new_order + [ids[1], ids[2]])
+
+        # Con huecos, mover un ítem escribe solo esa fila
+        self.assertEqual(self.post(url, {"move": ids[2], "before": ids[0]}).status_code, 204)
+        self.assertEqual(self.faq_order(), [ids[3], ids[2], ids[0], ids[4], ids[1]])
+        untouched = FAQ.objects.get(pk=ids[0]).order
+        self.assertEqual(untouched, 2 * reorder.ORDER_STEP)
+        self.assertEqual(self.post(url, {"move": ids[3], "before": None}).status_code, 204)
+        self.assertEqual(self.faq_order(), [ids[2], ids[0], ids[4], ids[1], ids[3]])
+
+        other = Store.objects.create(name="Otra", slug="otra", owner=User.objects.create_user("o", password="x"))
+        foreign = FAQ.objects.create(store=other, question="Ajena", answer="R")
+        self.assertEqual(self.post(url, {"move": foreign.pk}).status_code, 400)
+        self.assertEqual(self.post(url, {"order": [ids[0], "x"]}).status_code, 400)
+
+    def test_move_without_gap_renumbers(self):
+        ids = [faq.pk for faq in self.faqs]
+        reorder.move(FAQ.objects.filter(store=self.store), ids[4], ids[1])
+        self.assertEqual(self.faq_order(), [ids[0], ids[4], ids[1], ids[2], ids[3]])
+        self.assertEqual(
+            list(FAQ.objects.filter(store=self.store).order_by("order").values_list("order", flat=True)),
+            [reorder.ORDER_STEP * i for i in range(1, 6)],
+        )
+
+    def test_media_move(self):
+        product = Product.objects.create(store=self.store, name="Remera", price=1, status=Product.Status.PUBLISHED)
+        media = [
+            ProductMedia.objects.create(product=product, image=f"products/images/{i}.png", order=reorder.ORDER_STEP * (i + 1))
+            for i in range(3)
+        ]
+        response = self.post(
+            reverse("catalog:product_media_reorder", args=[product.pk]), {"move": media[2].pk, "before": media[0].pk}
+        )
+        self.assertEqual(response.status_code, 204)
+        ordered = list(product.media.order_by("order").values_list("pk", flat=True))
+        self.assertEqual(ordered, [media[2].pk, media[0].pk, media[1].pk])
+
+
+@override_settings(ALLOWED_HOSTS=["*"], STOREFRONT_PAGE_CACHE_TTL=0)
+class ReadReplicaRoutingTests(TransactionTestCase):
+    """Lecturas anónimas a réplicas; dueños, escrituras y read-your-writes a la primaria."""
+
+    def setUp(self):
+        cache.clear()
+        store_cache.clear()
+        self.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=self.owner)
+        self.product = Product.objects.create(store=self.store, name="Remera", price=10, status=Product.Status.PUBLISHED)
+
+    def routed(self, method, url, data=None):
+        """(response, alias elegido por el router para cada lectura). Todas corren en default."""
+        decisions = []
+        route = db_routing.ReadReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            decisions.append((model._meta.app_label, route(router, model, **hints)))
+            return "default"
+
+        with mock.patch.object(db_routing, "replicas", return_value=["replica_1"]), \
+                mock.patch.object(db_routing.ReadReplicaRouter, "db_for_read", record):
+            response = getattr(self.client, method)(url, data or {}, HTTP_HOST="tienda.localhost")
+        return response, decisions
+
+    def test_anonymous_reads_go_to_replica_until_a_write(self):
+        response, decisions = self.routed("get", reverse("catalog:catalog"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(("catalog", "replica_1"), decisions)
+        self.assertNotIn(("sessions", "replica_1"), decisions)
+
+        # Agregar al carrito solo toca la sesión: sigue leyendo de réplicas
+        response, _ = self.routed("post", reverse("catalog:cart_add"), {"product_id": self.product.pk})
+        self.assertNotIn(db_routing.STICKY_COOKIE, response.cookies)
+
+        response, _ = self.routed(
+            "post", reverse("catalog:complaint_form"), {"feedback_type": "queja", "message": "Llegó roto"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies[db_routing.STICKY_COOKIE]["max-age"], 5)
+
+        _, decisions = self.routed("get", reverse("catalog:catalog"))
+        self.assertTrue(decisions)
+        self.assertEqual({alias for _, alias in decisions}, {"default"})
+
+    @override_settings(STOREFRONT_PAGE_CACHE_TTL=300)
+    def test_shared_caches_are_filled_from_the_primary(self):
+        snapshot_key = store_snapshot.CACHE_KEY.format(self.store.pk)
+        # El dueño cambió el producto; la réplica puede no tenerlo todavía
+        self.product.name = "Remera nueva"
+        self.product.save()
+
+        # El render que se va a guardar (y el snapshot) lee de la primaria
+        response, decisions = self.routed("get", reverse("catalog:catalog"))
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        # De la réplica solo el ETag (StoreContentVersion), que no se guarda en ningún cache
+        self.assertEqual(decisions.count(("catalog", "replica_1")), 1)
+        self.assertGreater(decisions.count(("catalog", "default")), 1)
+        self.assertIsNotNone(cache.get(snapshot_key))
+
+        response, decisions = self.routed("get", reverse("catalog:catalog"))
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertEqual([d for d in decisions if d[0] == "catalog"], [("catalog", "replica_1")])
+        self.assertContains(response, "Remera nueva")
+
+    def test_owner_session_reads_primary(self):
+        self.client.force_login(self.owner)
+        response, decisions = self.routed("get", reverse("catalog:product_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({alias for _, alias in decisions}, {"default"})
+
+    def test_without_replicas_nothing_changes(self):
+        response = self.client.post(reverse("catalog:cart_add"), {"product_id": self.product.pk}, HTTP_HOST="tienda.localhost")
+        self.assertNotIn(db_routing.STICKY_COOKIE, response.cookies)
+        self.assertEqual(db_routing.ReadReplicaRouter().db_for_read(Product), "default")
+
+
+class StoreCacheTests(TestCase):
+    """Resolución de tiendas por subdominio: invalidación y subdominios inexistentes cacheados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+        store_cache.clear()
+
+    def assertInvalidates(self):
+        self.assertEqual(store_cache.get_store("tienda").name, "Tienda")
+        self.store.name = "Renombrada"
+        self.store.save()
+        self.assertEqual(store_cache.get_store("tienda").name, "Renombrada")
+
+        self.store.slug = "nueva"
+        self.store.save()
+        self.assertIsNone(store_cache.get_store("tienda"))
+        self.assertEqual(store_cache.get_store("nueva").pk, self.store.pk)
+
+    def assertCachesMissing(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(store_cache.get_store("inexistente"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(store_cache.get_store("inexistente"))
+        other = User.objects.create_user("other", password="x")
+        Store.objects.create(name="Otra", slug="inexistente", owner=other)
+        self.assertEqual(store_cache.get_store("inexistente").name, "Otra")
+
+    def test_local_cache(self):
+        self.assertInvalidates()
+        self.assertCachesMissing()
+
+    @override_settings(TENANT_CACHE_ALIAS="default")
+    def test_shared_cache_skips_process_lru(self):
+        self.assertInvalidates()
+        self.assertCachesMissing()
+        self.assertEqual(store_cache.get_local_store("nueva"), (False, None))
+        # Otro proceso invalida: este no tiene copia local que quede vieja
+        cache.delete(store_cache.KEY_PREFIX + "nueva")
+        Store.objects.filter(pk=self.store.pk).update(name="Desde otro worker")
+        self.assertEqual(store_cache.get_store("nueva").name, "Desde otro worker")
+
+
+class StoreSnapshotTests(TestCase):
+    """Snapshot de la tienda (config, sucursales, tema) y DeveloperConfig en el cache compartido."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.config = StoreConfig.objects.create(store=cls.store, address="Calle 1")
+        cls.branch = Branch.objects.create(store=cls.store, city="Rosario")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_snapshot_is_cached_with_plain_branches(self):
+        snapshot = store_snapshot.get_snapshot(self.store)
+        self.assertEqual(snapshot.address, "Calle 1")
+        self.assertEqual(snapshot.branches[0]["city"], "Rosario")
+        self.assertIsInstance(snapshot.branches[0], dict)
+        with self.assertNumQueries(0):
+            self.assertEqual(store_snapshot.get_snapshot(self.store), snapshot)
+
+    def test_config_and_branch_changes_invalidate(self):
+        store_snapshot.get_snapshot(self.store)
+        self.config.address = "Calle 2"
+        self.config.save()
+        self.assertEqual(store_snapshot.get_snapshot(self.store).address, "Calle 2")
+
+        self.branch.city = "Córdoba"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.branch.save()
+        self.assertEqual(store_snapshot.get_snapshot(self.store).branches[0]["city"], "Córdoba")
+
+        self.branch.delete()
+        self.assertEqual(store_snapshot.get_snapshot(self.store).branches, ())
+
+    def test_developer_config_uses_shared_cache(self):
+        self.assertIsNone(DeveloperConfig.get_cached())
+        with self.assertNumQueries(0):
+            self.assertIsNone(DeveloperConfig.get_cached())
+        config = DeveloperConfig.objects.create(instagram_message_template="Hola")
+        self.assertEqual(DeveloperConfig.get_cached().pk, config.pk)
+        # Otro worker lo guardó: la copia está en el cache compartido, no en este proceso
+        cache.delete(DEVELOPER_CONFIG_CACHE_KEY)
+        DeveloperConfig.objects.filter(pk=config.pk).update(instagram_message_template="Chau")
+        self.assertEqual(DeveloperConfig.get_cached().instagram_message_template, "Chau")
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ThemeCssTests(TestCase):
+    """Hoja de estilos del tema en /theme/<tienda>-<hash>.css: inmutable solo en el hash actual."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.config = StoreConfig.objects.create(store=cls.store, color_primary="#ff0000")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        return self.client.get(url, HTTP_HOST="tienda.localhost")
+
+    def test_pages_link_the_versioned_url(self):
+        url = store_snapshot.get_snapshot(self.store).theme_url
+        self.assertRegex(url, r"/theme/tienda-[0-9a-f]{12}\.css$")
+        self.assertContains(self.get(reverse("catalog:privacy")), f'href="{url}"')
+
+    def test_current_hash_is_immutable(self):
+        response = self.get(store_snapshot.get_snapshot(self.store).theme_url)
+        self.assertEqual(response["Content-Type"], "text/css; charset=utf-8")
+        self.assertContains(response, "--color-primary: #ff0000;")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_outdated_hash_is_not_cached(self):
+        old_url = store_snapshot.get_snapshot(self.store).theme_url
+        self.config.color_primary = "#00ff00"
+        self.config.save()
+        new_url = store_snapshot.get_snapshot(self.store).theme_url
+        self.assertNotEqual(new_url, old_url)
+
+        response = self.get(old_url)
+        self.assertContains(response, "--color-primary: #00ff00;")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    def test_other_store_slug_is_not_found(self):
+        theme_hash = store_snapshot.get_snapshot(self.store).theme_hash
+        response = self.get(reverse("catalog:theme_css", args=["otra", theme_hash]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductSearchTests(TestCase):
+    """Búsqueda de productos (search.py): acentos, prefijos, ranking e índice al día con las señales."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.category = Category.objects.create(store=cls.store, name="Electrónica")
+        published = {"store": cls.store, "status": Product.Status.PUBLISHED}
+        cls.by_name = Product.objects.create(name="Cargador rápido", price=10, **published)
+        cls.by_description = Product.objects.create(
+            name="Cable", description="Ideal para el cargador", price=5, **published
+        )
+
+    def setUp(self):
+        self.engine = search.get_engine()
+        if isinstance(self.engine, search.InMemorySearchEngine):
+            self.engine._indexes.clear()
+
+    def found(self, q):
+        queryset = search.search_products(Product.objects.filter(store=self.store), self.store, q)
+        return list(queryset.order_by("-search_rank", "pk").values_list("name", flat=True))
+
+    def test_accents_case_and_prefixes(self):
+        self.assertEqual(self.found("RAPIDO"), ["Cargador rápido"])
+        self.assertEqual(self.found("ráp carg"), ["Cargador rápido"])
+        self.assertEqual(search.tokenize("Electrónica Ñandú"), ["electronica", "nandu"])
+
+    def test_name_outranks_description(self):
+        self.assertEqual(self.found("cargador"), ["Cargador rápido", "Cable"])
+
+    def test_symbols_only_fall_back_to_name_contains(self):
+        Product.objects.create(store=self.store, name="Combo 2x1 ++", price=1, status=Product.Status.PUBLISHED)
+        self.assertEqual(self.found("++"), ["Combo 2x1 ++"])
+
+    def test_signals_keep_the_index_current(self):
+        self.assertEqual(self.found("electronica"), [])
+        self.by_description.category = self.category
+        self.by_description.save()
+        self.assertEqual(self.found("electronica"), ["Cable"])
+
+        self.category.name = "Accesorios"
+        self.category.save()
+        self.assertEqual(self.found("accesorios"), ["Cable"])
+
+        self.by_name.name = "Auriculares"
+        self.by_name.save()
+        self.assertEqual(self.found("auric"), ["Auriculares"])
+
+        Product.objects.only("pk").get(pk=self.by_name.pk).delete()
+        self.assertEqual(self.found("auric"), [])
+
+    def test_deleting_a_category_reindexes_its_products(self):
+        self.by_description.category = self.category
+        self.by_description.save()
+        self.assertEqual(self.found("electronica"), ["Cable"])
+
+        # El delete suelta los productos con un UPDATE sin señales (SET_NULL)
+        field = Product._meta.get_field("category")
+        with mock.patch.object(field.remote_field, "on_delete", models.SET_NULL):
+            Category.objects.get(pk=self.category.pk).delete()
+        self.assertIsNone(Product.objects.get(pk=self.by_description.pk).category_id)
+        self.assertEqual(self.found("electronica"), [])
+
+    def test_reindexes_only_when_searchable_text_changes(self):
+        product = Product.objects.get(pk=self.by_name.pk)
+        with mock.patch.object(self.engine, "product_changed") as changed:
+            product.stock = 3
+            product.save()
+            changed.assert_not_called()
+            product.description = "Carga en 30 minutos"
+            product.save()
+            changed.assert_called_once_with(product)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Solo Postgres")
+    def test_postgres_engine(self):
+        engine = search.PostgresSearchEngine()
+        engine.products_changed(self.store.pk, [self.by_name.pk, self.by_description.pk])
+        queryset = engine.search(Product.objects.filter(store=self.store), self.store, "RAPIDO")
+        self.assertEqual(list(queryset.values_list("name", flat=True)), ["Cargador rápido"])
+        ranked = engine.search(Product.objects.filter(store=self.store), self.store, "cargador")
+        self.assertEqual(
+            list(ranked.order_by("-search_rank").values_list("name", flat=True)), ["Cargador rápido", "Cable"]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'catalog_product_search_gin'")
+            self.assertIsNotNone(cursor.fetchone())
+
+
+class CategoryCounterTests(TestCase):
+    """Category.published_product_count acompaña publicar, pasar a borrador, cambiar de categoría y borrar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.remeras = Category.objects.create(store=cls.store, name="Remeras")
+        cls.buzos = Category.objects.create(store=cls.store, name="Buzos")
+
+    def assertCounts(self, remeras, buzos):
+        counts = dict(Category.objects.filter(store=self.store).values_list("name", "published_product_count"))
+        self.assertEqual((counts["Remeras"], counts["Buzos"]), (remeras, buzos))
+
+    def publish(self, name, category):
+        return Product.objects.create(
+            store=self.store, name=name, price=10, category=category, status=Product.Status.PUBLISHED
+        )
+
+    def test_publish_and_draft(self):
+        product = self.publish("Remera", self.remeras)
+        Product.objects.create(store=self.store, name="Borrador", category=self.remeras, slug="_draft_1")
+        self.assertCounts(1, 0)
+
+        product.status = Product.Status.DRAFT
+        product.save()
+        self.assertCounts(0, 0)
+        product.status = Product.Status.PUBLISHED
+        product.save()
+        self.assertCounts(1, 0)
+
+    def test_category_change(self):
+        product = self.publish("Remera", self.remeras)
+        product.category = self.buzos
+        product.save()
+        self.assertCounts(0, 1)
+
+        # Instancia sin status/category cargados: el save consulta los valores anteriores
+        product = Product.objects.only("pk", "store_id", "name", "slug").get(pk=product.pk)
+        product.category = None
+        product.save()
+        self.assertCounts(0, 0)
+
+    def test_delete(self):
+        first = self.publish("Remera 1", self.remeras)
+        second = self.publish("Remera 2", self.remeras)
+        first.delete()
+        self.assertCounts(1, 0)
+        Product.objects.only("pk").get(pk=second.pk).delete()
+        self.assertCounts(0, 0)
+
+    def test_refresh_fixes_drift(self):
+        self.publish("Remera", self.remeras)
+        Category.objects.filter(pk=self.remeras.pk).update(published_product_count=9)
+        Category.refresh_product_counts(self.store)
+        self.assertCounts(1, 0)
+
+
+@override_settings(ALLOWED_HOSTS=["*"], STOREFRONT_PAGE_CACHE_TTL=300)
+class PageCacheTests(TestCase):
+    """Cache de páginas para anónimos: hits, purgas por tags y requests que no se cachean."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="x", is_owner=True)
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=cls.owner)
+        cls.product = Product.objects.create(
+            store=cls.store, name="Remera", price=10, status=Product.Status.PUBLISHED
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url=None):
+        return self.client.get(url or reverse("catalog:catalog"), HTTP_HOST="tienda.localhost")
+
+    def test_second_request_is_a_hit(self):
+        first = self.get()
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        second = self.get()
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        self.assertContains(second, "Remera")
+
+    def test_product_edit_purges_catalog_and_detail(self):
+        detail = reverse("catalog:product_detail", args=[self.product.slug])
+        self.get()
+        self.get(detail)
+        self.product.name = "Remera nueva"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+        for url in (reverse("catalog:catalog"), detail):
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response["X-Page-Cache"], "miss")
+                self.assertContains(response, "Remera nueva")
+
+    def test_import_purges_store_pages(self):
+        self.get()
+        rows = product_io.read_rows(BytesIO(b"name,price,status\nBuzo,20,published\n"), "csv")
+        with self.captureOnCommitCallbacks(execute=True):
+            product_io.import_products(self.store, rows)
+        response = self.get()
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Buzo")
+
+    def test_tag_versions_expire(self):
+        with mock.patch.object(page_cache.cache, "add", wraps=page_cache.cache.add) as add:
+            page_cache.tag_versions([page_cache.store_tag(self.store.pk)])
+        self.assertEqual(add.call_args.args[2], 600)
+
+    def test_owner_is_not_cached(self):
+        self.client.force_login(self.owner)
+        self.get()
+        self.assertNotIn("X-Page-Cache", self.get())
+
+    def test_cart_is_not_cached(self):
+        self.client.post(reverse("catalog:cart_add"), {"product_id": self.product.pk}, HTTP_HOST="tienda.localhost")
+        self.get()  # muestra y consume el mensaje de "agregado"
+        self.assertNotIn("X-Page-Cache", self.get())
+
+    def test_pending_messages_are_not_cached(self):
+        self.get()
+        self.client.cookies["messages"] = "pendiente"
+        self.assertNotIn("X-Page-Cache", self.get())
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ConditionalResponseTests(TestCase):
+    """ETag del catálogo y del detalle: 304 sin cambios, ETag nuevo al editar (validadores en la BD)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.category = Category.objects.create(store=cls.store, name="Remeras")
+        cls.product = Product.objects.create(
+            store=cls.store, name="Remera", price=10, category=cls.category, status=Product.Status.PUBLISHED
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, HTTP_HOST="tienda.localhost", **headers)
+
+    def assertRevalidates(self, url):
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        return etag
+
+    def test_catalog_etag(self):
+        url = reverse("catalog:catalog")
+        etag = self.assertRevalidates(url)
+        # Otro worker con el cache vacío calcula el mismo ETag
+        cache.clear()
+        self.assertEqual(self.get(url, etag).status_code, 304)
+
+        self.product.name = "Remera nueva"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "Remera nueva")
+
+    def test_catalog_etag_changes_after_a_purge_in_another_process(self):
+        url = reverse("catalog:catalog")
+        etag = self.assertRevalidates(url)
+        # run_jobs (importación) purgó en otro proceso: su cache no es este, la BD sí
+        StoreContentVersion.bump([self.store.pk])
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_product_etag(self):
+        url = reverse("catalog:product_detail", args=[self.product.slug])
+        etag = self.assertRevalidates(url)
+
+        self.product.price = 12
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        # Cambio de la tienda (nombre de categoría) que no toca la fila del producto
+        self.category.name = "Remeras lisas"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+
+class ProductLinksTests(TestCase):
+    """Links de compra resueltos (links.py): cache por versión y "#" sin configuración de la tienda."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", password="x")
+        cls.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        cls.product = Product.objects.create(
+            store=cls.store, name="Remera", price=10, status=Product.Status.PUBLISHED
+        )
+        cls.link = ProductLink.objects.create(product=cls.product, link_type="whatsapp")
+
+    def setUp(self):
+        cache.clear()
+
+    def annotated(self):
+        return Product.objects.annotate(links_updated=Max("links__updated_at")).get(pk=self.product.pk)
+
+    def test_without_config_links_point_nowhere(self):
+        (link,) = links.get_product_links(self.annotated(), self.store)
+        self.assertEqual((link.link_type, link.url), ("whatsapp", "#"))
+
+    def test_urls_use_store_config(self):
+        StoreConfig.objects.create(store=self.store, whatsapp_number="5491100000000")
+        (link,) = links.get_product_links(self.annotated(), self.store)
+        self.assertTrue(link.url.startswith("https://wa.me/5491100000000?text="))
+        self.assertIn("Remera", unquote(link.url))
+        self.assertIn(f"https://tienda.{settings.ROOT_DOMAIN}/producto/{self.product.slug}/", unquote(link.url))
+
+    def test_cached_per_product_version(self):
+        product = self.annotated()
+        with self.assertNumQueries(1):
+            first = links.get_product_links(product, self.store)
+        with self.assertNumQueries(0):
+            self.assertEqual(links.get_product_links(product, self.store), first)
+
+        # Cambia la configuración de la tienda: la purga del tag store cambia la clave
+        with self.captureOnCommitCallbacks(execute=True):
+            StoreConfig.objects.create(store=self.store, whatsapp_number="5491100000000")
+        self.assertNotEqual(links.get_product_links(product, self.store), first)
+
+    def test_products_without_links_skip_the_query(self):
+        self.link.delete()
+        product = self.annotated()
+        self.assertIsNone(product.links_updated)
+        with self.assertNumQueries(0):
+            self.assertEqual(links.get_product_links(product, self.store), ())
+
+
+@override_settings(ALLOWED_HOSTS=["*"], STOREFRONT_CONCURRENT_READS=True, STOREFRONT_PAGE_CACHE_TTL=0)
+class AsyncStorefrontTests(TransactionTestCase):
+    """Vistas async de la tienda por ASGI: TenantMiddleware.__acall__ y lecturas en paralelo."""
+
+    def setUp(self):
+        cache.clear()
+        store_cache.clear()
+        owner = User.objects.create_user("owner", password="x")
+        self.store = Store.objects.create(name="Tienda", slug="tienda", owner=owner)
+        self.product = Product.objects.create(
+            store=self.store, name="Remera", price=10, stock=5, status=Product.Status.PUBLISHED
+        )
+
+    async def request(self, method, url, data=None, host="tienda.localhost"):
+        # AsyncClient siempre manda "host: testserver"; el scope se arma a mano para el subdominio
+        body = urlencode(data or {}).encode()
+        headers = [(b"host", host.encode())]
+        if data:
+            headers += [
+                (b"content-type", b"application/x-www-form-urlencoded"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+        return await self.async_client.request(
+            method=method, path=url, query_string="", headers=headers, _body_file=FakePayload(body)
+        )
+
+    async def get(self, url, host="tienda.localhost"):
+        return await self.request("GET", url, host=host)
+
+    async def test_tenant_middleware_resolves_store_async(self):
+        response = await self.get(reverse("catalog:catalog"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Remera")
+        self.assertEqual(response.asgi_request.store.pk, self.store.pk)
+
+        response = await self.get(reverse("catalog:catalog"), host="inexistente.localhost")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_tenant_middleware_uses_process_lru_without_thread_hop(self):
+        await self.get(reverse("catalog:catalog"))
+        with mock.patch.object(store_cache, "get_store", wraps=store_cache.get_store) as get_store:
+            response = await self.get(reverse("catalog:catalog"))
+        self.assertEqual(response.status_code, 200)
+        get_store.assert_not_called()
+
+    async def test_async_product_detail(self):
+        response = await self.get(reverse("catalog:product_detail", args=[self.product.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Remera")
+        response = await self.get(reverse("catalog:product_detail", args=["no-existe"]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_cart_is_priced_on_the_request_thread(self):
+        await self.request("POST", reverse("catalog:cart_add"), {"product_id": self.product.pk, "quantity": 3})
+        await Product.objects.filter(pk=self.product.pk).aupdate(stock=1)
+
+        threads = {}
+
+        def recorder(name, func):
+            def run(*args, **kwargs):
+                threads[name] = threading.get_ident()
+                return func(*args, **kwargs)
+            return run
+
+        with mock.patch.object(cart_helpers, "price_cart", recorder("price", cart_helpers.price_cart)), \
+                mock.patch.object(cart_helpers, "load_cart_products", recorder("load", cart_helpers.load_cart_products)):
+            response = await self.get(reverse("catalog:cart_detail"))
+        self.assertContains(response, "se actualizó la cantidad")
+        # Las lecturas corren en threads propios; los precios (que corrigen el carrito) no
+        self.assertNotEqual(threads["price"], threads["load"])
+
+        # La corrección al stock quedó guardada en el carrito del visitante
+        response = await self.get(reverse("catalog:cart_detail"))
+        self.assertEqual([line.qty for line in response.context["cart_items"]], [1])
+        self.assertNotContains(response, "se actualizó la cantidad")
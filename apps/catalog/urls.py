@@ -1,10 +1,11 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import *
 
 app_name = "catalog"
 
 urlpatterns = [
     path("", catalog_view, name="catalog"),
+    re_path(r"^theme/(?P<store_slug>[-\w]+)-(?P<version>[0-9a-f]+)\.css$", theme_css_view, name="theme_css"),
     path("producto/<slug:slug>/", product_detail_view, name="product_detail"),
     path("sucursales/", branches_public_view, name="branches_public"),
     path("carrito/", cart_detail_view, name="cart_detail"),
@@ -40,9 +41,19 @@ urlpatterns = [
 
     path("productos/", product_list_view, name="product_list"),
     path("productos/crear/", product_create_view, name="product_create"),
+    path("productos/importar/", product_import_view, name="product_import"),
+    path("productos/exportar/", product_export_view, name="product_export"),
     path("productos/<int:pk>/editar/", product_update_view, name="product_update"),
     path("productos/<int:pk>/eliminar/", product_delete_view, name="product_delete"),
     path("productos/<int:product_id>/media/upload/", product_media_upload_view, name="product_media_upload"),
+    path("productos/<int:product_id>/media/subidas/", product_media_chunked_init_view, name="product_media_chunked_init"),
+    path("productos/<int:product_id>/media/subidas/<str:upload_id>/", product_media_chunk_view, name="product_media_chunk"),
+    path(
+        "productos/<int:product_id>/media/subidas/<str:upload_id>/finalizar/",
+        product_media_chunked_finalize_view,
+        name="product_media_chunked_finalize",
+    ),
+    path("productos/<int:product_id>/media/tareas/", product_media_jobs_view, name="product_media_jobs"),
     path("productos/<int:product_id>/media/reorder/", product_media_reorder_view, name="product_media_reorder"),
     path("productos/<int:product_id>/media/<int:media_id>/eliminar/", product_media_delete_view, name="product_media_delete"),
     path("productos/<int:pk>/publicar/", product_publish_view, name="product_publish"),
@@ -3,23 +3,36 @@ from django.templatetags.static import static
 from django.contrib import messages
 from django.conf import settings
 from django.urls import reverse
-from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from apps.accounts.decorators import owner_required
+from apps.core.models import Job
 from django.db import IntegrityError
-from django.db.models import Count, Max, Q
+from django.db.models import Count, F, Max, Q
 from django.db.models.functions import Lower
 from django.core.paginator import Paginator
-from django.core.files.storage import default_storage
+from django.utils.cache import patch_cache_control
 from urllib.parse import urlencode, quote
 from .models import Product, Category, ProductMedia, ProductLink, StoreConfig, Branch, FAQ, Tutorial, StoreFeedback
-from .forms import CategoryForm, ProductForm, StoreConfigForm, StoreInfoContactForm, StoreCustomMessagesForm, BranchForm, StoreFeedbackForm, FAQForm
+from .forms import CategoryForm, ProductForm, StoreConfigForm, StoreInfoContactForm, StoreCustomMessagesForm, BranchForm, StoreFeedbackForm, FAQForm, ProductBulkActionForm
 from .constants import SORT_LABELS
 from . import cart as cart_helpers
-
+from . import bulk_actions, media_uploads, page_cache, product_io, reorder
+from .conditional import catalog_etag, conditional_page, product_etag, product_last_modified
+from .page_cache import cache_storefront_page, catalog_tag, faq_tag, product_tag
+from .async_reads import run_reads
+from .links import default_link_types, get_product_links
+from .pagination import CountEstimate, CursorPaginator, estimate_count
+from .search import search_products
+from .slugs import draft_slug
+from .store_snapshot import get_snapshot
+
+from asgiref.sync import sync_to_async
+from functools import wraps
 import json
-import sys
-import uuid
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -38,32 +51,38 @@ def _landing_context(request):
     return {"stores": stores}
 
 
-def catalog_view(request):
-    if not getattr(request, "store", None):
-        return render(request, "catalog/landing.html", _landing_context(request))
+def _remember_catalog_url(view_func):
+    """Guarda la URL del catálogo (con filtros) para el "volver" del detalle, también en cache hits."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        if getattr(request, "store", None):
+            request.browse_state["catalog_return_url"] = request.get_full_path()
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def _render_landing(request):
+    return render(request, "catalog/landing.html", _landing_context(request))
+
 
-    request.session["catalog_return_url"] = request.get_full_path()
+def _catalog_reads(request):
+    """
+    Arma (sin evaluar) las consultas del catálogo. Devuelve (paginator, load_page,
+    load_categories): las dos funciones son lecturas independientes entre sí.
+    """
     store = request.store
 
     q = request.GET.get("q")
     sort = request.GET.get("sort", "newest")
     selected_categories = request.GET.getlist("category")
 
-    has_filters = bool(
-        selected_categories
-        or sort not in ("newest", None)
-    )
-
-    products = Product.objects.filter(store=store, status=Product.Status.PUBLISHED)
+    products = Product.objects.filter(store=store, status=Product.Status.PUBLISHED).with_card_data()
 
     if selected_categories:
         products = products.filter(category__slug__in=selected_categories)
 
     if q:
-        products = products.filter(name__icontains=q)
-
-    if sort == "newest":
-        products = products.order_by("-created_at")
+        products = search_products(products, store, q)
 
     sort_map = {
         "newest" : "-created_at",
@@ -73,29 +92,67 @@ def catalog_view(request):
         "price_desc": "-price",
     }
 
-    products = products.order_by(sort_map.get(sort, Lower("name")))
+    # Con búsqueda y sin orden elegido: por relevancia
+    by_relevance = bool(q) and "sort" not in request.GET
+    if by_relevance:
+        products = products.order_by("-search_rank", "-created_at")
+    else:
+        products = products.order_by(sort_map.get(sort, Lower("name")))
 
     # --- PAGINACIÓN ---
-    paginator = Paginator(products, 12)  # 10 productos por página
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    if getattr(settings, "CATALOG_CURSOR_PAGINATION", False) and not by_relevance:
+        # Keyset: sin COUNT(*) ni OFFSET (?after= / ?before=)
+        paginator = None
+
+        def load_page():
+            return CursorPaginator(products, sort, 12).get_page(
+                after=request.GET.get("after"),
+                before=request.GET.get("before"),
+            )
+    else:
+        paginator = Paginator(products, 12)  # 10 productos por página
+        page_number = request.GET.get("page")
+
+        def load_page():
+            page_obj = paginator.get_page(page_number)
+            page_obj.object_list = list(page_obj.object_list)
+            return page_obj
 
-    category_base_qs = Product.objects.filter(store=store, status=Product.Status.PUBLISHED)
-    
+    categories = Category.objects.filter(store=store, is_active=True)
     if q:
-        category_base_qs = category_base_qs.filter(name__icontains=q)
-    
-    categories = Category.objects.filter(store=store, is_active=True).annotate(
-        product_count=Count(
-            "products",
-            filter=Q(products__in=category_base_qs)
+        # Con búsqueda: conteo en vivo sobre los resultados
+        category_base_qs = search_products(
+            Product.objects.filter(store=store, status=Product.Status.PUBLISHED), store, q
         )
+        categories = categories.annotate(
+            product_count=Count(
+                "products",
+                filter=Q(products__in=category_base_qs)
+            )
+        )
+    else:
+        # Sin búsqueda: contador mantenido en Category
+        categories = categories.annotate(product_count=F("published_product_count"))
+
+    return paginator, load_page, lambda: list(categories)
+
+
+def _render_catalog(request, paginator, page_obj, categories):
+    q = request.GET.get("q")
+    sort = request.GET.get("sort", "newest")
+    selected_categories = request.GET.getlist("category")
+
+    has_filters = bool(
+        selected_categories
+        or sort not in ("newest", None)
     )
 
     active_filters = []
 
-    # base params actuales
+    # base params actuales (sin cursor: al cambiar filtros se vuelve al inicio)
     base_params = request.GET.copy()
+    base_params.pop("after", None)
+    base_params.pop("before", None)
 
     # --- categorías ---
     for slug in selected_categories:
@@ -129,7 +186,7 @@ def catalog_view(request):
     category_links = []
 
     for category in categories:
-        params = request.GET.copy()
+        params = base_params.copy()
         cats = params.getlist("category")
 
         if category.slug in cats:
@@ -176,22 +233,24 @@ def catalog_view(request):
     })
 
 
-def product_detail_view(request, slug):
+@_remember_catalog_url
+@conditional_page(etag_func=catalog_etag)
+@cache_storefront_page(tags=lambda request: [catalog_tag(request.store.pk)])
+async def catalog_view(request):
     store = getattr(request, "store", None)
     if not store:
-        return render(request, "catalog/landing.html", _landing_context(request))
+        return await sync_to_async(_render_landing)(request)
 
-    product = get_object_or_404(
-        Product,
-        store=store,
-        slug=slug,
-        status=Product.Status.PUBLISHED,
-    )
+    paginator, load_page, load_categories = await sync_to_async(_catalog_reads)(request)
+    # Página de productos, categorías y snapshot de la tienda (context processor) en paralelo
+    page_obj, categories, _ = await run_reads(load_page, load_categories, lambda: get_snapshot(store))
+    return await sync_to_async(_render_catalog)(request, paginator, page_obj, categories)
 
+
+def _render_product_detail(request, product, media_items, links):
     max_cart_quantity = 99
     if product.stock is not None and product.stock > 0:
         max_cart_quantity = min(99, product.stock)
-    media_items = product.media.filter(is_active=True).order_by("order", "id")
     media_items_json = [
         {
             "url": m.image.url if m.media_type == ProductMedia.IMAGE else (m.video.url if m.media_type == ProductMedia.VIDEO else ""),
@@ -203,24 +262,70 @@ def product_detail_view(request, slug):
         "product": product,
         "media_items": media_items,
         "media_items_json": media_items_json,
-        "links": product.links.all().order_by("order", "id"),
-        "has_links": product.links.exists(),
+        "links": links,
+        "has_links": bool(links),
         "catalog_url": reverse("catalog:catalog"),
+        "catalog_return_url": request.browse_state.get("catalog_return_url"),
         "max_cart_quantity": max_cart_quantity,
     }
     return render(request, "catalog/product_detail.html", context)
 
+
+@conditional_page(etag_func=product_etag, last_modified_func=product_last_modified)
+@cache_storefront_page(
+    tags=lambda request, slug: [product_tag(request.store.pk, slug)],
+    vary_on_state=("catalog_return_url",),
+)
+async def product_detail_view(request, slug):
+    store = getattr(request, "store", None)
+    if not store:
+        return await sync_to_async(_render_landing)(request)
+
+    product = await sync_to_async(get_object_or_404)(
+        Product.objects.annotate(links_updated=Max("links__updated_at")),
+        store=store,
+        slug=slug,
+        status=Product.Status.PUBLISHED,
+    )
+    # Media, links de compra y snapshot de la tienda no dependen entre sí
+    media_items, links, _ = await run_reads(
+        lambda: list(product.media.filter(is_active=True).order_by("order", "id")),
+        lambda: get_product_links(product, store),
+        lambda: get_snapshot(store),
+    )
+    return await sync_to_async(_render_product_detail)(request, product, media_items, links)
+
+
+def theme_css_view(request, store_slug, version):
+    """Variables de color de la tienda. El hash en la URL cambia solo si cambian los colores."""
+    store = getattr(request, "store", None)
+    if not store or store.slug != store_slug:
+        raise Http404("Tema no encontrado")
+    snapshot = get_snapshot(store)
+    response = HttpResponse(snapshot.theme_css, content_type="text/css; charset=utf-8")
+    if version == snapshot.theme_hash:
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        # URL vieja (HTML cacheado): servir el tema actual sin cachearlo
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
 def privacy_view(request):
     return render(request, "extra/privacy.html")
 
 
-def faq_public_view(request):
+@cache_storefront_page(tags=lambda request: [faq_tag(request.store.pk)])
+async def faq_public_view(request):
     """Página pública de preguntas frecuentes de la tienda."""
     store = getattr(request, "store", None)
     if not store:
         return redirect("catalog:catalog")
-    faqs = FAQ.objects.filter(store=store, is_active=True).order_by("order")
-    return render(request, "catalog/faq.html", {"faqs": faqs})
+    faqs, _ = await run_reads(
+        lambda: list(FAQ.objects.filter(store=store, is_active=True).order_by("order")),
+        lambda: get_snapshot(store),
+    )
+    return await sync_to_async(render)(request, "catalog/faq.html", {"faqs": faqs})
 
 
 def complaint_form_view(request):
@@ -263,32 +368,27 @@ def _safe_redirect_url(request, next_url):
 DEFAULT_ORDER_MESSAGE_TEMPLATE = "Hola! Mi pedido:\n{{ items }}\nTotal: {{ total }}"
 
 
-def _build_order_message(config, cart_items_with_quantity, total_display):
+def _build_order_message(config, cart_lines, total_display):
     """Construye el mensaje del pedido reemplazando {{ items }} y {{ total }}."""
     template = (getattr(config, "order_message_template", None) or "").strip()
     if not template:
         template = DEFAULT_ORDER_MESSAGE_TEMPLATE
     lines = []
-    for product, qty in cart_items_with_quantity:
-        name = product.name or "Producto"
-        if product.price is not None and product.price > 0:
-            lines.append(f"- {name} x {qty}")
+    for line in cart_lines:
+        name = line.product.name or "Producto"
+        if line.unit_price is not None:
+            lines.append(f"- {name} x {line.qty}")
         else:
-            lines.append(f"- {name} x {qty} (consultar precio)")
+            lines.append(f"- {name} x {line.qty} (consultar precio)")
     items_text = "\n".join(lines) if lines else "-"
     msg = template.replace("{{ items }}", items_text).replace("{{ total }}", total_display)
     return msg
 
 
-def cart_detail_view(request):
-    """Página del carrito: ítems, total, botones WhatsApp e Instagram (mismo mensaje)."""
-    store = getattr(request, "store", None)
-    if not store:
-        return render(request, "catalog/landing.html", _landing_context(request))
-
-    raw_cart = cart_helpers.get_cart_for_store(request.session, store.id)
-    product_ids = list(raw_cart.keys())
-    if not product_ids:
+def _render_cart(request, product_by_id, config):
+    # En el thread del request: price_cart puede corregir el carrito de request.browse_state
+    priced = cart_helpers.price_cart(request.browse_state, request.store, product_by_id)
+    if not priced.lines and not priced.removed_unavailable and not priced.clamped_to_stock:
         return render(request, "catalog/cart.html", {
             "cart_items": [],
             "cart_total": None,
@@ -297,61 +397,13 @@ def cart_detail_view(request):
             "instagram_url": None,
         })
 
-    products = list(
-        Product.objects.filter(
-            store=store,
-            id__in=product_ids,
-            status=Product.Status.PUBLISHED,
-        ).select_related("store").prefetch_related("media")
-    )
-    valid_ids = {p.id for p in products}
-    # Limpiar sesión de ítems que ya no existen o no están publicados
-    cleaned_cart = {pid: raw_cart[pid] for pid in valid_ids if pid in raw_cart}
-    if len(cleaned_cart) != len(raw_cart):
-        cart_helpers.set_cart_for_store(request.session, store.id, cleaned_cart)
+    if priced.removed_unavailable:
         messages.info(request, "Un producto ya no está disponible y fue quitado del carrito.")
-
-    # Ajustar cantidades al stock disponible (si el producto controla stock)
-    product_by_id = {p.id: p for p in products}
-    cart_modified = False
-    for pid, qty in list(cleaned_cart.items()):
-        product = product_by_id.get(pid)
-        if product and product.stock is not None and qty > product.stock:
-            cleaned_cart[pid] = product.stock
-            cart_modified = True
-    if cart_modified:
-        cart_helpers.set_cart_for_store(request.session, store.id, cleaned_cart)
+    if priced.clamped_to_stock:
         messages.info(request, "El stock de algún producto bajó; se actualizó la cantidad en tu carrito.")
 
-    # Construir lista de dicts (product, qty, subtotal_display) en orden de product_ids
-    cart_items_with_quantity = []
-    total = 0
-    for pid in product_ids:
-        if pid not in valid_ids:
-            continue
-        qty = cleaned_cart.get(pid, 0)
-        if qty <= 0:
-            continue
-        product = product_by_id.get(pid)
-        if not product:
-            continue
-        if product.price is not None and product.price > 0:
-            subtotal = float(product.price) * qty
-            total += subtotal
-            subtotal_display = f"{subtotal:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        else:
-            subtotal_display = "—"
-        cart_items_with_quantity.append({
-            "product": product,
-            "qty": qty,
-            "subtotal_display": subtotal_display,
-        })
-    total_display = f"${total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if total else "Consultar"
-    try:
-        config = store.config
-    except Exception:
-        config = None
-    order_message = _build_order_message(config, [(item["product"], item["qty"]) for item in cart_items_with_quantity], total_display) if config else ""
+    total_display = priced.total_display
+    order_message = _build_order_message(config, priced.lines, total_display) if config else ""
     whatsapp_url = None
     instagram_url = None
     if config and order_message:
@@ -362,14 +414,33 @@ def cart_detail_view(request):
             instagram_url = f"https://ig.me/m/{config.instagram_username}?text={encoded}"
 
     return render(request, "catalog/cart.html", {
-        "cart_items": cart_items_with_quantity,
-        "cart_total": total,
+        "cart_items": priced.lines,
+        "cart_total": priced.total,
         "cart_total_display": total_display,
         "whatsapp_url": whatsapp_url,
         "instagram_url": instagram_url,
     })
 
 
+async def cart_detail_view(request):
+    """Página del carrito: ítems, total, botones WhatsApp e Instagram (mismo mensaje)."""
+    store = getattr(request, "store", None)
+    if not store:
+        return await sync_to_async(_render_landing)(request)
+
+    product_ids = await sync_to_async(
+        lambda: list(cart_helpers.get_cart_for_store(request.browse_state, store.id))
+    )()
+    # Productos del carrito, config de la tienda (mensaje del pedido) y snapshot en paralelo;
+    # los precios se arman después, sin tocar browse_state desde otros threads
+    product_by_id, config, _ = await run_reads(
+        lambda: cart_helpers.load_cart_products(store, product_ids),
+        lambda: StoreConfig.objects.filter(store=store).first(),
+        lambda: get_snapshot(store),
+    )
+    return await sync_to_async(_render_cart)(request, product_by_id, config)
+
+
 def cart_add_view(request):
     """POST: product_id, quantity (opcional), next (opcional). Añade al carrito."""
     store = getattr(request, "store", None)
@@ -389,19 +460,15 @@ def cart_add_view(request):
     except (ValueError, TypeError):
         pass
 
-    product = Product.objects.filter(
-        store=store,
-        pk=product_id,
-        status=Product.Status.PUBLISHED,
-    ).first()
+    product = cart_helpers.cart_products(store, [product_id]).first()
     if not product:
         messages.error(request, "El producto no está disponible.")
         return redirect("catalog:catalog")
 
     if product.stock is not None:
-        cart_now = cart_helpers.get_cart_for_store(request.session, store.id)
+        cart_now = cart_helpers.get_cart_for_store(request.browse_state, store.id)
         in_cart = cart_now.get(product_id, 0)
-        available = max(0, product.stock - in_cart)
+        available = max(0, cart_helpers.max_quantity_for(product) - in_cart)
         if available <= 0:
             messages.error(request, "No hay stock disponible para este producto.")
             next_url = _safe_redirect_url(request, request.POST.get("next") or "")
@@ -416,7 +483,7 @@ def cart_add_view(request):
     else:
         messages.success(request, "Producto añadido al carrito.")
 
-    cart_helpers.add_to_cart(request.session, store.id, product_id, quantity)
+    cart_helpers.add_to_cart(request.browse_state, store.id, product_id, quantity)
 
     next_url = _safe_redirect_url(request, request.POST.get("next") or "")
     if next_url:
@@ -438,7 +505,7 @@ def cart_remove_view(request):
         return redirect("catalog:cart_detail")
     product = Product.objects.filter(store=store, pk=product_id).first()
     if product:
-        cart_helpers.remove_from_cart(request.session, store.id, product_id)
+        cart_helpers.remove_from_cart(request.browse_state, store.id, product_id)
     next_url = _safe_redirect_url(request, request.POST.get("next") or "")
     if next_url:
         return redirect(next_url)
@@ -461,15 +528,10 @@ def cart_update_view(request):
         quantity = int(request.POST.get("quantity") or 0)
     except (ValueError, TypeError):
         quantity = 0
-    product = Product.objects.filter(
-        store=store,
-        pk=product_id,
-        status=Product.Status.PUBLISHED,
-    ).first()
+    product = cart_helpers.cart_products(store, [product_id]).first()
     if product:
-        if product.stock is not None and quantity > product.stock:
-            quantity = product.stock
-        cart_helpers.update_cart(request.session, store.id, product_id, quantity)
+        quantity = cart_helpers.clamp_quantity(product, quantity)
+        cart_helpers.update_cart(request.browse_state, store.id, product_id, quantity)
     next_url = _safe_redirect_url(request, request.POST.get("next") or "")
     if next_url:
         return redirect(next_url)
@@ -540,74 +602,118 @@ def category_delete_view(request, pk):
 @login_required
 @owner_required
 def product_list_view(request):
+    """
+    GET: listado con búsqueda, orden y filtro por categoría.
+    POST: acción masiva (bulk_actions) sobre los productos marcados ("products") o, con
+    select=all, sobre todos los que coinciden con los filtros; vuelve al listado con los
+    mismos filtros.
+    """
     store = request.store
+    if request.method == "POST":
+        return _product_bulk_action(request)
+
     q = request.GET.get("q")
     sort = request.GET.get("sort", "newest")
     selected_categories = request.GET.getlist("category")
+    if sort not in SORT_LABELS:
+        sort = "newest"
+
+    # Solo las columnas de la tabla
+    products = (
+        _filtered_owner_products(request, store)
+        .select_related("category")
+        .only("name", "status", "price", "category__name")
+    )
 
-    sort_map = {
-        "newest": "-created_at",
-        "az": Lower("name"),
-        "za": Lower("name").desc(),
-        "price_asc": "price",
-        "price_desc": "-price",
-    }
-
-    products = Product.objects.filter(store=store).select_related("category")
-
-    # Filtrado por categoría: ignorar valores vacíos (\"todas\")
-    category_slugs = [slug for slug in selected_categories if slug]
-    if category_slugs:
-        products = products.filter(category__slug__in=category_slugs)
-
-    if q:
-        products = products.filter(name__icontains=q)
-
-    products = products.order_by(sort_map.get(sort, "-created_at"))
+    per_page = getattr(settings, "OWNER_PRODUCTS_PER_PAGE", 50)
+    if q and "sort" not in request.GET:
+        # Por relevancia: páginas numeradas (los resultados de una búsqueda son acotados)
+        page_obj = Paginator(products.order_by("-search_rank", "-created_at"), per_page).get_page(
+            request.GET.get("page")
+        )
+        total = CountEstimate(page_obj.paginator.count, exact=True)
+    else:
+        # Keyset: cualquier página cuesta lo mismo, sin COUNT(*) ni OFFSET sobre toda la tienda
+        page_obj = CursorPaginator(products, sort, per_page).get_page(
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+        total = estimate_count(products, getattr(settings, "OWNER_PRODUCTS_EXACT_COUNT_LIMIT", 1000))
 
-    category_base_qs = Product.objects.filter(store=store)
+    # Conteo por categoría en un GROUP BY; con búsqueda, solo sobre los resultados
+    category_counts = Count("products")
     if q:
-        category_base_qs = category_base_qs.filter(name__icontains=q)
-    categories = Category.objects.filter(store=store, is_active=True).annotate(
-        product_count=Count("products", filter=Q(products__in=category_base_qs))
-    )
+        results = search_products(Product.objects.filter(store=store), store, q)
+        category_counts = Count("products", filter=Q(products__in=results))
+    categories = Category.objects.filter(store=store, is_active=True).annotate(product_count=category_counts)
 
     return render(request, "owner/product/product_list.html", {
-        "products": products,
+        "products": page_obj,
+        "page_obj": page_obj,
+        "total": total,
         "categories": categories,
+        "bulk_form": ProductBulkActionForm(store=store),
         "sort": sort,
         "sort_labels": SORT_LABELS,
         "q": q,
         "selected_categories": selected_categories,
     })
 
+def _filtered_owner_products(request, store):
+    """Productos de la tienda con los filtros del listado (búsqueda y categorías del GET)."""
+    products = Product.objects.filter(store=store)
+    # Filtrado por categoría: ignorar valores vacíos (\"todas\")
+    category_slugs = [slug for slug in request.GET.getlist("category") if slug]
+    if category_slugs:
+        products = products.filter(category__slug__in=category_slugs)
+    q = request.GET.get("q")
+    if q:
+        products = search_products(products, store, q)
+    return products
+
+
+def _product_bulk_action(request):
+    form = ProductBulkActionForm(request.POST, store=request.store)
+    next_url = reverse("catalog:product_list")
+    if request.GET:
+        next_url += "?" + request.GET.urlencode()
+    if not form.is_valid():
+        for errors in form.errors.values():
+            messages.error(request, " ".join(errors))
+        return redirect(next_url)
+
+    try:
+        if request.POST.get("select") == "all":
+            # Todos los que coinciden con los filtros: los ids no viajan en el POST (que
+            # DATA_UPLOAD_MAX_NUMBER_FIELDS limita a 1000 campos)
+            ids = list(_filtered_owner_products(request, request.store).order_by("pk").values_list("pk", flat=True))
+        else:
+            ids = bulk_actions.parse_ids(request.POST.getlist("products"))
+        result = bulk_actions.apply_action(request.store, ids, form.cleaned_data["action"], form.cleaned_data)
+    except bulk_actions.BulkActionError as exc:
+        messages.error(request, str(exc))
+        return redirect(next_url)
+
+    label = dict(ProductBulkActionForm.ACTION_CHOICES)[form.cleaned_data["action"]]
+    text = f"{label}: {result.changed} producto(s)."
+    if result.skipped:
+        text += f" {result.skipped} omitido(s) por no tener nombre o precio."
+    messages.success(request, text)
+    return redirect(next_url)
+
+
 def _create_default_product_links(product):
     """Crea ProductLinks según los defaults de StoreConfig."""
     try:
         config = product.store.config
     except Exception:
         return
-    types_and_flags = [
-        ("whatsapp", config.default_link_whatsapp),
-        ("instagram", config.default_link_instagram),
-        ("facebook", config.default_link_facebook),
-        ("mercadolibre", config.default_link_mercadolibre),
-    ]
-    for i, (link_type, enabled) in enumerate(types_and_flags):
-        if enabled:
-            ProductLink.objects.get_or_create(
-                product=product,
-                link_type=link_type,
-                defaults={"order": i},
-            )
-
-
-def _unique_draft_slug(store):
-    """Genera un slug único para un borrador (evita UNIQUE en store+slug cuando la BD no es condicional)."""
-    while True:
-        slug = "_draft_" + uuid.uuid4().hex[:12]
-        if not Product.objects.filter(store=store, slug=slug).exists():
-            return slug
+    for i, link_type in default_link_types(config):
+        ProductLink.objects.get_or_create(
+            product=product,
+            link_type=link_type,
+            defaults={"order": i},
+        )
 
 
 @login_required
@@ -617,11 +723,50 @@ def product_create_view(request):
     product = Product.objects.create(
         store=request.store,
         status=Product.Status.DRAFT,
-        slug=_unique_draft_slug(request.store),
+        slug=draft_slug(),
     )
     _create_default_product_links(product)
     return redirect("catalog:product_update", pk=product.pk)
 
+@login_required
+@owner_required
+def product_import_view(request):
+    """
+    GET: formulario de importación (CSV o JSONL) y, con ?tarea=<id>, el reporte de esa importación.
+    POST: encola la importación del archivo (product_io) y redirige al reporte.
+    """
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if not upload:
+            messages.error(request, "Elegí un archivo CSV o JSONL.")
+            return redirect("catalog:product_import")
+        job = product_io.enqueue_import(request.store, upload)
+        return redirect(f"{reverse('catalog:product_import')}?{urlencode({'tarea': job.pk})}")
+
+    job = None
+    job_id = request.GET.get("tarea", "")
+    if job_id.isdigit():
+        job = Job.objects.filter(pk=job_id, kind=product_io.IMPORT_JOB, store=request.store).first()
+    return render(request, "owner/product/product_import.html", {
+        "job": job,
+        "report": job.result if job and job.status == Job.Status.DONE else None,
+        "columns": product_io.COLUMNS,
+    })
+
+
+@login_required
+@owner_required
+def product_export_view(request):
+    """Descarga todos los productos de la tienda (?formato=csv|jsonl), generada de a partes."""
+    fmt = request.GET.get("formato", "csv")
+    if fmt not in product_io.FORMATS:
+        fmt = "csv"
+    content_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson; charset=utf-8"
+    response = StreamingHttpResponse(product_io.export_lines(request.store, fmt), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{request.store.slug}-productos.{fmt}"'
+    return response
+
+
 def _sync_product_links(product, link_types):
     """Sincroniza ProductLinks: crea los marcados, elimina los no marcados."""
     existing = {l.link_type: l for l in product.links.filter(link_type__in=["whatsapp", "instagram", "facebook", "mercadolibre"])}
@@ -668,7 +813,8 @@ def product_update_view(request, pk):
                 "file_url": media.image.url if media.media_type == ProductMedia.IMAGE and media.image else (media.video.url if media.media_type == ProductMedia.VIDEO and media.video else ""),
                 "file_name": media.image.name if media.media_type == ProductMedia.IMAGE and media.image else (media.video.name if media.media_type == ProductMedia.VIDEO and media.video else ""),
                 "media_type": media.media_type,
-            } for media in product.media.filter(is_active=True).order_by('order', 'id')]
+            } for media in product.media.filter(is_active=True).order_by('order', 'id')],
+        "pending_uploads": media_uploads.pending_uploads(product),
     })
 
 @login_required
@@ -723,78 +869,138 @@ def product_delete_view(request, pk):
 @login_required
 @owner_required
 def product_media_upload_view(request, product_id):
-
-    print("=== MEDIA UPLOAD VIEW HIT ===", file=sys.stderr)
-    print("METHOD:", request.method, file=sys.stderr)
-    print("PATH:", request.path, file=sys.stderr)
-    print("FILES:", request.FILES, file=sys.stderr)
-    print("STORAGE CLASS:", default_storage.__class__, file=sys.stderr)
-    print("MEDIA ROOT:", settings.MEDIA_ROOT, file=sys.stderr)
+    """
+    POST multipart "files": copia cada archivo al staging local y encola su subida
+    (media_uploads). Responde enseguida {"jobs": [id, ...]}; el estado se consulta en
+    product_media_jobs_view. media_drop.js usa la subida por partes (product_media_chunked_*).
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
 
     # Permitimos subir media tanto en borrador como en publicado.
     # Antes filtraba por DRAFT y eso provocaba 404 al editar productos ya existentes/publicados.
     product = get_object_or_404(Product, pk=product_id, store=request.store)
 
-    order_start = product.media.count()
-    created_ids = []
-
-    for index, file in enumerate(request.FILES.getlist("files")):
-        print("FILE NAME:", file.name, file=sys.stderr)
-        print("FILE SIZE:", file.size, file=sys.stderr)
-        print("CONTENT TYPE:", file.content_type, file=sys.stderr)
-        media_type = (
-            ProductMedia.VIDEO
-            if file.content_type.startswith("video")
-            else ProductMedia.IMAGE
-        )
+    files = request.FILES.getlist("files")
+    queued = media_uploads.enqueue_uploads(product, files)
+    logger.debug("Subida de media: producto=%s archivos=%s tareas=%s", product.pk, len(files), [job.pk for job in queued])
+    return JsonResponse({"jobs": [job.pk for job in queued]}, status=202)
 
-        media = ProductMedia(
-            product=product,
-            media_type=media_type,
-            order=order_start + index
-        )
 
-        if media_type == ProductMedia.IMAGE:
-            media.image = file
-        else:
-            media.video = file
-
-        # media.full_clean()
-        media.save()
-        created_ids.append(media.id)
-        print(
-            "SAVED MEDIA:",
-            media.id,
-            media.product_id,
-            media.image.name if media.image else None,
-            file=sys.stderr
+@login_required
+@owner_required
+def product_media_chunked_init_view(request, product_id):
+    """
+    POST JSON {"file_name", "size", "content_type"}: inicia una subida por partes.
+    Responde {"upload_id", "offset", "chunk_size", ...}; las partes van a product_media_chunk_view.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    product = get_object_or_404(Product, pk=product_id, store=request.store)
+    try:
+        data = json.loads(request.body) if request.body else {}
+    except (ValueError, TypeError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    try:
+        upload = media_uploads.init_chunked(
+            product, data.get("file_name"), data.get("size"), data.get("content_type")
         )
+    except media_uploads.UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=exc.status)
+    return JsonResponse(upload.as_dict(), status=201)
+
+
+@login_required
+@owner_required
+def product_media_chunk_view(request, product_id, upload_id):
+    """
+    GET: estado de la subida ({"offset", "size"}) para retomarla.
+    PUT (cuerpo binario, header Upload-Offset): agrega una parte. 409 con el offset correcto
+    si no coincide con lo ya recibido.
+    DELETE: descarta la subida.
+    """
+    if request.method not in ("GET", "PUT", "DELETE"):
+        return HttpResponseNotAllowed(["GET", "PUT", "DELETE"])
+    product = get_object_or_404(Product, pk=product_id, store=request.store)
+    upload = media_uploads.get_chunked(product, upload_id)
+    if upload is None:
+        raise Http404("Subida inexistente")
+
+    if request.method == "GET":
+        return JsonResponse(upload.as_dict())
+    if request.method == "DELETE":
+        upload.discard()
+        return HttpResponse(status=204)
+    try:
+        offset = media_uploads.write_chunk(upload, request.headers.get("Upload-Offset"), request)
+    except media_uploads.ChunkOffsetMismatch as exc:
+        return JsonResponse({"error": str(exc), "offset": exc.offset}, status=exc.status)
+    except media_uploads.UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=exc.status)
+    return JsonResponse({"offset": offset, "size": upload.size})
 
-    return JsonResponse({"ids": created_ids})
+
+@login_required
+@owner_required
+def product_media_chunked_finalize_view(request, product_id, upload_id):
+    """POST: con todas las partes recibidas, encola la subida. Responde {"job": id}."""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    product = get_object_or_404(Product, pk=product_id, store=request.store)
+    upload = media_uploads.get_chunked(product, upload_id)
+    if upload is None:
+        raise Http404("Subida inexistente")
+    try:
+        job = media_uploads.finalize_chunked(product, upload)
+    except media_uploads.ChunkOffsetMismatch as exc:
+        return JsonResponse({"error": str(exc), "offset": exc.offset}, status=exc.status)
+    except media_uploads.UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=exc.status)
+    return JsonResponse({"job": job.pk}, status=202)
+
+
+@login_required
+@owner_required
+def product_media_jobs_view(request, product_id):
+    """GET ?ids=1,2,3: estado de las subidas en cola del producto (para media_drop.js)."""
+    product = get_object_or_404(Product, pk=product_id, store=request.store)
+    try:
+        ids = [int(value) for value in request.GET.get("ids", "").split(",") if value.strip()]
+    except ValueError:
+        return JsonResponse({"error": "Invalid ids"}, status=400)
+    queued = Job.objects.filter(
+        pk__in=ids[:50],
+        kind=media_uploads.UPLOAD_JOB,
+        store=request.store,
+        payload__product_id=product.pk,
+    ).order_by("id")
+    return JsonResponse({"jobs": [media_uploads.job_status(job) for job in queued]})
 
 
 @login_required
 @owner_required
 def product_media_reorder_view(request, product_id):
-    """POST JSON {"order": [id1, id2, ...]} para reordenar media del producto."""
+    """
+    POST JSON para reordenar la media activa del producto (reorder.apply):
+    {"order": [id1, id2, ...]} con el orden completo o {"move": id, "before": id | null}.
+    """
     if request.method != "POST":
         return HttpResponseNotAllowed(["POST"])
     product = get_object_or_404(Product, pk=product_id, store=request.store)
     try:
         data = json.loads(request.body) if request.body else {}
-        order_ids = data.get("order") or []
     except (ValueError, TypeError):
         return JsonResponse({"error": "Invalid JSON"}, status=400)
-    if not isinstance(order_ids, list):
-        return JsonResponse({"error": "order must be a list"}, status=400)
-    valid_ids = set(
-        product.media.filter(is_active=True).values_list("id", flat=True)
-    )
-    for id_ in order_ids:
-        if id_ not in valid_ids:
-            return JsonResponse({"error": "Invalid media id"}, status=400)
-    for position, id_ in enumerate(order_ids):
-        ProductMedia.objects.filter(pk=id_, product=product).update(order=position)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    try:
+        reorder.apply(product.media.filter(is_active=True), data)
+    except reorder.ReorderError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    # update() no dispara señales: tocar el producto renueva su ETag e invalida el cache de páginas
+    product.save(update_fields=["updated_at"])
     return HttpResponse(status=204)
 
 
@@ -849,7 +1055,7 @@ def faq_owner_view(request):
 @login_required
 @owner_required
 def faq_create_view(request):
-    """Crear nueva pregunta frecuente. Orden se asigna al final (máx + 1)."""
+    """Crear nueva pregunta frecuente. Orden se asigna al final (reorder.next_key)."""
     if request.method == "POST":
         form = FAQForm(request.POST)
         if form.is_valid():
@@ -857,7 +1063,7 @@ def faq_create_view(request):
             faq.store = request.store
             faq.is_active = True
             agg = FAQ.objects.filter(store=request.store).aggregate(m=Max("order"))
-            faq.order = (agg["m"] or 0) + 1
+            faq.order = reorder.next_key(agg["m"])
             faq.save()
             messages.success(request, "Pregunta frecuente creada.")
             return redirect("catalog:faq_owner")
@@ -897,22 +1103,21 @@ def faq_delete_view(request, pk):
 @login_required
 @owner_required
 def faq_reorder_view(request):
-    """POST JSON {"order": [id1, id2, ...]} para reordenar FAQs de la tienda."""
+    """POST JSON {"order": [id1, id2, ...]} o {"move": id, "before": id | null} (reorder.apply)."""
     if request.method != "POST":
         return HttpResponseNotAllowed(["POST"])
     try:
         data = json.loads(request.body) if request.body else {}
-        order_ids = data.get("order") or []
     except (ValueError, TypeError):
         return JsonResponse({"error": "Invalid JSON"}, status=400)
-    if not isinstance(order_ids, list):
-        return JsonResponse({"error": "order must be a list"}, status=400)
-    valid_ids = set(FAQ.objects.filter(store=request.store).values_list("id", flat=True))
-    for id_ in order_ids:
-        if id_ not in valid_ids:
-            return JsonResponse({"error": "Invalid FAQ id"}, status=400)
-    for position, id_ in enumerate(order_ids):
-        FAQ.objects.filter(pk=id_, store=request.store).update(order=position)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    try:
+        reorder.apply(FAQ.objects.filter(store=request.store), data)
+    except reorder.ReorderError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    # update() no dispara señales: invalidar las páginas de preguntas frecuentes
+    page_cache.purge_tags([faq_tag(request.store.pk)])
     return HttpResponse(status=204)
 
 
@@ -1073,10 +1278,14 @@ def product_cancel_view(request, pk):
     return redirect("catalog:product_list")
 
 
-def branches_public_view(request):
+@cache_storefront_page(tags=lambda request: [])
+async def branches_public_view(request):
     """Vista pública de sucursales para los clientes."""
     store = getattr(request, "store", None)
     if not store:
-        return render(request, "catalog/landing.html", _landing_context(request))
-    branches = Branch.objects.filter(store=store).order_by("id")
-    return render(request, "catalog/branches_public.html", {"branches": branches})
\ No newline at end of file
+        return await sync_to_async(_render_landing)(request)
+    branches, _ = await run_reads(
+        lambda: list(Branch.objects.filter(store=store).order_by("id")),
+        lambda: get_snapshot(store),
+    )
+    return await sync_to_async(render)(request, "catalog/branches_public.html", {"branches": branches})
\ No newline at end of file
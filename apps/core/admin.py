@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import Store, DeveloperConfig
+from .models import Store, DeveloperConfig, Job
 
 
 @admin.register(Store)
@@ -24,3 +24,11 @@ class StoreAdmin(admin.ModelAdmin):
 @admin.register(DeveloperConfig)
 class DeveloperConfigAdmin(admin.ModelAdmin):
     list_display = ("id",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "store", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status", "kind")
+    search_fields = ("kind",)
+    readonly_fields = ("locked_at", "locked_by", "created_at", "updated_at")
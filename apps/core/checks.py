@@ -0,0 +1,28 @@
+"""
+Checks de despliegue (manage.py check --deploy).
+
+Los caches de la tienda (páginas, snapshot, DeveloperConfig) se invalidan desde el proceso
+que guarda el cambio; con un cache en memoria de cada proceso los demás workers seguirían
+sirviendo datos viejos.
+"""
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs=None, **kwargs):
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend in PROCESS_LOCAL_CACHES and settings.STOREFRONT_PAGE_CACHE_TTL > 0:
+        return [
+            checks.Warning(
+                "El cache 'default' es del proceso: las invalidaciones no llegan a los demás workers.",
+                hint="Configurar REDIS_URL (ver CACHES en config/settings/base.py).",
+                id="core.W001",
+            )
+        ]
+    return []
@@ -0,0 +1,143 @@
+"""
+Réplicas de lectura para el tráfico de la tienda.
+
+- ReadReplicaRouter (DATABASE_ROUTERS): las escrituras van siempre a "default" (primaria).
+  Las lecturas van a una réplica de DATABASE_REPLICAS solo si el request actual lo
+  permite; fuera de un request (worker de tareas, comandos) y dentro de una transacción
+  se lee de la primaria. Las sesiones se leen siempre de la primaria.
+- ReplicaRoutingMiddleware decide por request: lee de réplicas un GET/HEAD anónimo. Los
+  dueños logueados, los POST y los navegadores que escribieron hace menos de
+  READ_YOUR_WRITES_SECONDS (cookie) leen de la primaria, así ven sus propios cambios
+  aunque la réplica venga atrasada. La cookie la pone solo un POST que escribió en la BD
+  (el router anota las escrituras): agregar al carrito (sesión) no la pone.
+
+La decisión va en un ContextVar: la heredan los sync_to_async de las vistas async y los
+threads de async_reads.run_reads. Sin réplicas configuradas no cambia nada.
+
+Una réplica puede venir atrasada respecto de una escritura recién confirmada: lo que se
+guarda en caches compartidos (cache de páginas, snapshot de la tienda) se arma dentro de
+primary_reads(), así refleja la primaria aunque el request lea de réplicas.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Set
+
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = "rw_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Apps que se leen siempre de la primaria: la sesión se escribe en casi cualquier request
+PRIMARY_APPS = {"sessions"}
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+# Modelos escritos en el request actual (un set compartido: los threads de sync_to_async
+# trabajan sobre una copia del contexto, pero agregan al mismo set)
+_written: ContextVar[Optional[Set[str]]] = ContextVar("written_models", default=None)
+
+
+def replicas() -> List[str]:
+    return [alias for alias in getattr(settings, "DATABASE_REPLICAS", ()) if alias in settings.DATABASES]
+
+
+def reading_replicas() -> bool:
+    """Las lecturas del request actual pueden ir a una réplica (y venir atrasadas)."""
+    return _replica_reads.get()
+
+
+@contextmanager
+def primary_reads():
+    """Dentro del bloque las lecturas van a la primaria (también en los threads que se abran)."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def sticky_seconds() -> int:
+    return getattr(settings, "READ_YOUR_WRITES_SECONDS", 5)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        written = _written.get()
+        if written is not None and model._meta.app_label not in PRIMARY_APPS:
+            written.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas tienen los mismos datos que la primaria
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replicas() else None
+
+
+class ReplicaRoutingMiddleware:
+    """Va después de AuthenticationMiddleware (necesita request.user)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _replica_allowed(request, user) -> bool:
+        return (
+            request.method in ("GET", "HEAD")
+            and not user.is_authenticated
+            and STICKY_COOKIE not in request.COOKIES
+        )
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        written = set()
+        token = _replica_reads.set(self._replica_allowed(request, request.user))
+        written_token = _written.set(written)
+        try:
+            response = self.get_response(request)
+        finally:
+            _written.reset(written_token)
+            _replica_reads.reset(token)
+        return self._finish(request, response, written)
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        written = set()
+        token = _replica_reads.set(self._replica_allowed(request, await request.auser()))
+        written_token = _written.set(written)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _written.reset(written_token)
+            _replica_reads.reset(token)
+        return self._finish(request, response, written)
+
+    def _finish(self, request, response, written):
+        if request.method not in SAFE_METHODS and written and sticky_seconds() > 0:
+            # Leer de la primaria un rato después de escribir (read-your-writes)
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=sticky_seconds(), httponly=True, samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,217 @@
+"""
+Cola de tareas en la base de datos (modelo Job), sin dependencias externas.
+
+- register("tipo"): registra la función que ejecuta las tareas de ese tipo. Recibe el Job
+  y devuelve un dict (queda en job.result).
+- enqueue("tipo", payload, store_id=...): crea la tarea. Se ve recién al confirmar la
+  transacción, así el worker no toma tareas de datos que todavía no existen.
+- run_jobs (comando): toma tareas con claim() y las ejecuta. En Postgres varios workers
+  no se pisan (SELECT ... FOR UPDATE SKIP LOCKED + update condicional).
+- Una tarea en curso con el lock vencido (JOBS_LOCK_TIMEOUT) es de un worker caído y se
+  vuelve a tomar, salvo que ya haya agotado max_attempts: entonces queda fallida. Las
+  tareas largas llaman a heartbeat() para renovar el lock; el resultado se guarda solo si
+  el worker sigue teniendo el lock (si otro la retomó, gana el otro).
+
+Con JOBS_RUN_INLINE (desarrollo, tests) las tareas se ejecutan en el mismo proceso al
+confirmar la transacción, sin worker; los reintentos se hacen en el momento.
+"""
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+import logging
+import os
+import socket
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers: Dict[str, Callable[[Job], Optional[dict]]] = {}
+
+
+class LockLost(Exception):
+    """El lock de la tarea venció y otro worker la retomó: este intento se descarta."""
+
+
+def register(kind: str):
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def _run_inline() -> bool:
+    return getattr(settings, "JOBS_RUN_INLINE", False)
+
+
+def _lock_timeout() -> timedelta:
+    # Una tarea "en curso" más vieja que esto es de un worker caído: se vuelve a tomar
+    return timedelta(seconds=getattr(settings, "JOBS_LOCK_TIMEOUT", 600))
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind: str, payload: dict, store_id: Optional[int] = None, max_attempts: int = 3) -> Job:
+    if kind not in _handlers:
+        raise KeyError(f"Tipo de tarea no registrado: {kind}")
+    job = Job.objects.create(
+        kind=kind,
+        payload=payload,
+        store_id=store_id,
+        max_attempts=max_attempts,
+    )
+    if _run_inline():
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def _fail_abandoned(now) -> int:
+    """Marca fallidas las tareas de workers caídos que ya no tienen intentos."""
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=now - _lock_timeout(),
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=Job.Status.FAILED,
+        error="El worker no terminó la tarea a tiempo (lock vencido) y no quedan intentos.",
+        locked_at=None,
+        updated_at=now,
+    )
+
+
+def claim(worker: str) -> Optional[Job]:
+    """Toma la próxima tarea lista (pendiente, o en curso con el lock vencido e intentos)."""
+    now = timezone.now()
+    _fail_abandoned(now)
+    ready = Q(status=Job.Status.PENDING, run_after__lte=now) | Q(
+        status=Job.Status.RUNNING, locked_at__lt=now - _lock_timeout(), attempts__lt=F("max_attempts")
+    )
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(ready)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        # Update condicional: sin FOR UPDATE (SQLite) dos workers no toman la misma tarea
+        taken = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=Job.Status.RUNNING,
+            locked_at=now,
+            locked_by=worker,
+            attempts=job.attempts + 1,
+            updated_at=now,
+        )
+    if not taken:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def heartbeat(job: Job) -> None:
+    """
+    Renueva el lock de una tarea en curso (las tareas largas lo llaman entre pasos, antes
+    de que venza JOBS_LOCK_TIMEOUT). LockLost si otro worker ya la retomó.
+    """
+    now = timezone.now()
+    renewed = Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by).update(
+        locked_at=now, updated_at=now
+    )
+    if not renewed:
+        raise LockLost(f"{job} la retomó otro worker")
+    job.locked_at = now
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, "JOBS_RETRY_DELAY", 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def execute(job: Job) -> Job:
+    """Ejecuta una tarea ya tomada y guarda el resultado (o el error y el próximo intento)."""
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise KeyError(f"Tipo de tarea no registrado: {job.kind}")
+        result = handler(job) or {}
+    except LockLost:
+        logger.warning("Tarea %s: el lock venció y la retomó otro worker", job)
+        return job
+    except Exception:
+        job.error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            job.status = Job.Status.FAILED
+            logger.exception("Tarea %s falló definitivamente", job)
+        else:
+            job.status = Job.Status.PENDING
+            job.run_after = timezone.now() + _retry_delay(job.attempts)
+            logger.warning("Tarea %s falló (intento %s de %s)", job, job.attempts, job.max_attempts, exc_info=True)
+    else:
+        job.status = Job.Status.DONE
+        job.result = result
+        job.error = ""
+    job.locked_at = None
+    # Solo si este worker sigue teniendo el lock: si venció y otro la retomó, no se pisa
+    saved = Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by).update(
+        status=job.status,
+        result=job.result,
+        error=job.error,
+        run_after=job.run_after,
+        locked_at=None,
+        updated_at=timezone.now(),
+    )
+    if not saved:
+        logger.warning("Tarea %s: el lock venció y la retomó otro worker; no se guarda el resultado", job)
+    return job
+
+
+def run_job(job_id: int) -> Optional[Job]:
+    """
+    Ejecuta una tarea puntual (modo inline) si sigue pendiente. Sin worker que tome los
+    reintentos, un intento fallido se repite en el momento hasta max_attempts; la tarea
+    termina hecha o fallida, nunca pendiente (media_drop.js consulta hasta que termine).
+    """
+    job = None
+    while True:
+        now = timezone.now()
+        taken = Job.objects.filter(pk=job_id, status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING,
+            locked_at=now,
+            locked_by=worker_id(),
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+        if not taken:
+            return job
+        job = execute(Job.objects.get(pk=job_id))
+        if job.status != Job.Status.PENDING:
+            return job
+
+
+def run_next(worker: Optional[str] = None) -> Optional[Job]:
+    job = claim(worker or worker_id())
+    if job is None:
+        return None
+    try:
+        return execute(job)
+    finally:
+        close_old_connections()
+
+
+def purge_finished(older_than: timedelta) -> int:
+    """Borra tareas terminadas hace más de `older_than`."""
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.Status.DONE, Job.Status.FAILED],
+        updated_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
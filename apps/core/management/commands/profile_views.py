@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+import json
+
+from apps.core import profiling
+from apps.core.models import Store
+
+
+STOREFRONT_URLS = ["catalog:catalog", "catalog:faq_public", "catalog:branches_public", "catalog:cart_detail"]
+OWNER_URLS = [
+    "catalog:product_list",
+    "catalog:category_list",
+    "catalog:store_config",
+    "catalog:branch_list",
+    "catalog:faq_owner",
+]
+
+
+class Command(BaseCommand):
+    help = "Perfila las vistas de una tienda (tiempos, consultas SQL, render y cache) con requests internos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("store", help="Slug de la tienda")
+        parser.add_argument("--repeat", type=int, default=5, help="Requests por URL (default: 5)")
+        parser.add_argument("--owner", action="store_true", help="Loguearse como el dueño e incluir el panel")
+        parser.add_argument("--path", action="append", default=[], help="Path extra a perfilar (repetible)")
+        parser.add_argument("--json", action="store_true", help="Salida JSON en lugar de tabla")
+
+    def _paths(self, store, owner):
+        names = STOREFRONT_URLS + (OWNER_URLS if owner else [])
+        paths = [reverse(name) for name in names]
+        product = store.products.filter(status="published").order_by("-updated_at").first()
+        if product and product.slug:
+            paths.insert(1, reverse("catalog:product_detail", args=[product.slug]))
+        return paths
+
+    def handle(self, *args, **options):
+        if not profiling.enabled():
+            raise CommandError("PROFILING_ENABLED está desactivado")
+        try:
+            store = Store.objects.select_related("owner").get(slug=options["store"])
+        except Store.DoesNotExist:
+            raise CommandError(f"No existe la tienda '{options['store']}'")
+
+        root = getattr(settings, "ROOT_DOMAIN", "catalogico.shop")
+        client = Client(HTTP_HOST=f"{store.slug}.{root}")
+        if options["owner"]:
+            client.force_login(store.owner)
+        # Primer request: renueva la sesión (SessionRefreshMiddleware), no cuenta para ninguna vista
+        client.get(reverse("catalog:privacy"))
+
+        rows = []
+        for path in self._paths(store, options["owner"]) + options["path"]:
+            profiles = []
+            for _ in range(max(1, options["repeat"])):
+                response = client.get(path)
+                profile = getattr(response.wsgi_request, "profile", None)
+                if profile is not None:
+                    profiles.append(profile)
+            if not profiles:
+                continue
+            count = len(profiles)
+            hits = [p.cache_hit for p in profiles if p.cache_hit is not None]
+            rows.append({
+                "path": path,
+                "view": profiles[0].view_name,
+                "status": profiles[-1].status_code,
+                "avg_ms": round(sum(p.duration for p in profiles) / count * 1000, 2),
+                "max_ms": round(max(p.duration for p in profiles) * 1000, 2),
+                "sql_count": max(p.sql_count for p in profiles),
+                "sql_ms": round(sum(p.sql_time for p in profiles) / count * 1000, 2),
+                "template_ms": round(sum(p.template_time for p in profiles) / count * 1000, 2),
+                "cache_hit_ratio": round(sum(hits) / len(hits), 3) if hits else None,
+                "budget": profiling.query_budget(profiles[0].view_name),
+            })
+
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        header = f"{'vista':<32} {'status':>6} {'ms':>9} {'max ms':>9} {'sql':>5} {'sql ms':>8} {'tpl ms':>8} {'cache':>6} {'budget':>6}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows:
+            ratio = "-" if row["cache_hit_ratio"] is None else f"{row['cache_hit_ratio']:.0%}"
+            budget = "-" if row["budget"] is None else str(row["budget"])
+            line = (
+                f"{row['view']:<32} {row['status']:>6} {row['avg_ms']:>9} {row['max_ms']:>9} "
+                f"{row['sql_count']:>5} {row['sql_ms']:>8} {row['template_ms']:>8} {ratio:>6} {budget:>6}"
+            )
+            if row["budget"] is not None and row["sql_count"] > row["budget"]:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
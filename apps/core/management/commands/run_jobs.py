@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import jobs
+
+
+class Command(BaseCommand):
+    help = "Worker de la cola de tareas (subidas de media, derivados de imágenes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Vaciar la cola y salir")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Segundos de espera con la cola vacía (default: 2)")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Salir después de N tareas (0: sin límite)")
+        parser.add_argument(
+            "--purge-days", type=int, default=7, help="Borrar tareas terminadas hace más de N días (0: no borrar)"
+        )
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_id()
+        if options["purge_days"]:
+            purged = jobs.purge_finished(timedelta(days=options["purge_days"]))
+            if purged:
+                self.stdout.write(f"Tareas viejas borradas: {purged}")
+
+        self.stdout.write(f"Worker {worker} esperando tareas")
+        processed = 0
+        while not options["max_jobs"] or processed < options["max_jobs"]:
+            job = jobs.run_next(worker)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+            processed += 1
+            self.stdout.write(f"{job.kind} #{job.pk}: {job.get_status_display()} (intento {job.attempts})")
+
+        self.stdout.write(f"Tareas procesadas: {processed}")
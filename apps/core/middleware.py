@@ -1,19 +1,23 @@
+import time
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.http import HttpResponseNotFound
 from django.utils.deprecation import MiddlewareMixin
 
-from .models import Store
+from . import store_cache
 
 
 class TenantMiddleware(MiddlewareMixin):
     """
     Extrae el subdominio del host y resuelve la tienda (Store).
     Estructura: {slug}.catalogico.shop → slug
-    """
 
-    def process_request(self, request):
-        request.store = None
+    En ASGI no salta a un thread si la tienda ya está en el LRU del proceso; solo la
+    resolución con cache compartido / BD va por sync_to_async.
+    """
 
+    def _subdomain(self, request):
         host = request.get_host().split(":")[0].lower()
         root_domain = getattr(settings, "ROOT_DOMAIN", "catalogico.shop").lower()
 
@@ -26,10 +30,50 @@ class TenantMiddleware(MiddlewareMixin):
         if host.endswith(suffix):
             subdomain = host[: -len(suffix)]
             if subdomain and subdomain != "www":
-                try:
-                    store = Store.objects.get(slug=subdomain, is_active=True)
-                    request.store = store
-                except Store.DoesNotExist:
-                    return HttpResponseNotFound("Tienda no encontrada")
+                return subdomain
+        return None
 
+    def _apply(self, request, store):
+        if store is None:
+            return HttpResponseNotFound("Tienda no encontrada")
+        request.store = store
         return None
+
+    def process_request(self, request):
+        request.store = None
+        subdomain = self._subdomain(request)
+        if subdomain is None:
+            return None
+        # Cache LRU + TTL (ver store_cache); los inexistentes también se cachean
+        return self._apply(request, store_cache.get_store(subdomain))
+
+    async def __acall__(self, request):
+        request.store = None
+        response = None
+        subdomain = self._subdomain(request)
+        if subdomain is not None:
+            found, store = store_cache.get_local_store(subdomain)
+            if not found:
+                store = await sync_to_async(store_cache.get_store)(subdomain)
+            response = self._apply(request, store)
+        return response or await self.get_response(request)
+
+
+class SessionRefreshMiddleware(MiddlewareMixin):
+    """
+    Con SESSION_SAVE_EVERY_REQUEST = False la sesión solo se guarda si cambió. Para mantener
+    el vencimiento por inactividad (SESSION_COOKIE_AGE), una sesión con datos se vuelve a
+    guardar cuando pasó la mitad de su vida desde el último guardado. Va después de
+    SessionMiddleware.
+    """
+
+    refreshed_key = "_refreshed_at"
+
+    def process_response(self, request, response):
+        session = getattr(request, "session", None)
+        if session is None or not session.accessed or not session.keys():
+            return response
+        now = int(time.time())
+        if session.modified or now - session.get(self.refreshed_key, 0) > settings.SESSION_COOKIE_AGE / 2:
+            session[self.refreshed_key] = now
+        return response
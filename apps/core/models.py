@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.utils.functional import cached_property
+from django.utils import timezone
+
+import urllib.parse
 
 
 class Store(models.Model):
@@ -26,6 +32,10 @@ class Store(models.Model):
         return self.name
 
 
+DEVELOPER_CONFIG_CACHE_KEY = "developer_config"
+_NOT_CACHED = object()
+
+
 class DeveloperConfig(models.Model):
     instagram_message_template = models.TextField(
         blank=True,
@@ -39,3 +49,79 @@ class DeveloperConfig(models.Model):
 
     def __str__(self):
         return "Configuración developer"
+
+    @classmethod
+    def get_cached(cls):
+        """
+        Primera fila (o None si no hay), en el cache de Django compartido entre workers.
+        Se invalida al guardar/borrar (apps/core/signals.py) y expira tras
+        DEVELOPER_CONFIG_CACHE_TTL.
+        """
+        value = cache.get(DEVELOPER_CONFIG_CACHE_KEY, _NOT_CACHED)
+        if value is _NOT_CACHED:
+            value = cls.objects.first()
+            cache.set(DEVELOPER_CONFIG_CACHE_KEY, value, getattr(settings, "DEVELOPER_CONFIG_CACHE_TTL", 300))
+        return value
+
+    @classmethod
+    def clear_cache(cls):
+        cache.delete(DEVELOPER_CONFIG_CACHE_KEY)
+
+    @cached_property
+    def instagram_dm_url(self):
+        """Link al DM de Instagram del developer con el mensaje precargado (o DEVELOPER_URL)."""
+        dev_url = getattr(settings, "DEVELOPER_URL", "")
+        if not dev_url:
+            return dev_url
+        username = dev_url.rstrip("/").rsplit("/", 1)[-1]
+        if username and self.instagram_message_template:
+            encoded = urllib.parse.quote(self.instagram_message_template)
+            return f"https://ig.me/m/{username}?text={encoded}"
+        return dev_url
+
+
+class Job(models.Model):
+    """Tarea en segundo plano (cola en la BD). La ejecuta el comando run_jobs, ver apps/core/jobs.py."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pendiente"
+        RUNNING = "running", "En curso"
+        DONE = "done", "Terminada"
+        FAILED = "failed", "Fallida"
+
+    kind = models.CharField(max_length=100, verbose_name="Tipo")
+    payload = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="jobs",
+        verbose_name="Tienda",
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Ejecutar desde")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["run_after", "id"]
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        indexes = [
+            # Worker: próximas pendientes (y en curso vencidas) por fecha
+            models.Index(fields=["status", "run_after"], name="core_job_status_run_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
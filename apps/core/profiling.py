@@ -0,0 +1,326 @@
+"""
+Perfilado de requests: tiempo total, cantidad y tiempo de SQL, tiempo de render de
+templates y aciertos del cache de páginas, por vista (nombre de URL) y tienda.
+
+- ProfilingMiddleware (primero en MIDDLEWARE) abre un RequestProfile por request y
+  ViewProfilingMiddleware (último) separa las consultas de la vista (view_sql_count) de
+  las de los middlewares. Antes de medir carga la sesión y el usuario, que son del
+  request y no de la vista.
+- Las consultas se cuentan con un execute_wrapper instalado en cada conexión; el perfil
+  actual va en un ContextVar, así también se cuentan las lecturas en paralelo de las
+  vistas async (otros threads, otras conexiones).
+- El render de templates lo mide el backend ProfiledDjangoTemplates (TEMPLATES en settings).
+- Los resultados se acumulan en un histograma en memoria del proceso (ver
+  profiling_stats_view, solo staff) y opcionalmente se loguean como JSON (PROFILING_LOG).
+- QUERY_BUDGETS: máximo de consultas de la vista por nombre de URL en GET/HEAD. Si se
+  excede se loguea un warning; con PROFILING_STRICT_BUDGETS (tests) se lanza QueryBudgetExceeded.
+"""
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger("apps.profiling")
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class RequestProfile:
+    started: float = field(default_factory=time.perf_counter)
+    sql_count: int = 0
+    view_sql_count: int = 0  # solo la vista (ver ViewProfilingMiddleware)
+    sql_time: float = 0.0
+    template_time: float = 0.0
+    duration: float = 0.0
+    cache_hit: Optional[bool] = None  # None = la vista no usa cache de páginas
+    view_name: str = ""
+    store_slug: str = ""
+    status_code: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "view": self.view_name,
+            "store": self.store_slug,
+            "status": self.status_code,
+            "ms": round(self.duration * 1000, 2),
+            "sql_count": self.sql_count,
+            "view_sql_count": self.view_sql_count,
+            "sql_ms": round(self.sql_time * 1000, 2),
+            "template_ms": round(self.template_time * 1000, 2),
+            "cache_hit": self.cache_hit,
+        }
+
+
+def enabled() -> bool:
+    return getattr(settings, "PROFILING_ENABLED", False)
+
+
+# ---------- INSTRUMENTACIÓN ----------
+
+def _record_query(execute, sql, params, many, context):
+    # Sin perfil abierto (PROFILING_ENABLED apagado, fuera de un request) no mide nada
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_count += 1
+        profile.sql_time += time.perf_counter() - started
+
+
+def _install_query_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+_installed = False
+
+
+def install() -> None:
+    """
+    Conecta la instrumentación (llamado desde CoreConfig.ready, siempre: PROFILING_ENABLED
+    se consulta por request en ProfilingMiddleware y puede cambiar con override_settings).
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_install_query_wrapper, dispatch_uid="apps.core.profiling")
+    for connection in connections.all(initialized_only=True):
+        _install_query_wrapper(None, connection)
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates que suma el tiempo de render al perfil del request (si hay uno)."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+# ---------- HISTOGRAMA ----------
+
+class ViewStats:
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.total_time = 0.0
+        self.sql_count_total = 0
+        self.sql_count_max = 0
+        self.sql_time_total = 0.0
+        self.template_time_total = 0.0
+        self.cache_lookups = 0
+        self.cache_hits = 0
+        self.durations = deque(maxlen=sample_size)
+
+    def add(self, profile: RequestProfile) -> None:
+        self.count += 1
+        self.total_time += profile.duration
+        self.sql_count_total += profile.sql_count
+        self.sql_count_max = max(self.sql_count_max, profile.sql_count)
+        self.sql_time_total += profile.sql_time
+        self.template_time_total += profile.template_time
+        if profile.cache_hit is not None:
+            self.cache_lookups += 1
+            self.cache_hits += int(profile.cache_hit)
+        self.durations.append(profile.duration)
+
+    def _percentile(self, ordered, pct):
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.durations)
+        n = self.count or 1
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_time / n * 1000, 2),
+            "p50_ms": round(self._percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(self._percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(self._percentile(ordered, 99) * 1000, 2),
+            "sql_count_avg": round(self.sql_count_total / n, 2),
+            "sql_count_max": self.sql_count_max,
+            "sql_ms_avg": round(self.sql_time_total / n * 1000, 2),
+            "template_ms_avg": round(self.template_time_total / n * 1000, 2),
+            "cache_hit_ratio": round(self.cache_hits / self.cache_lookups, 3) if self.cache_lookups else None,
+        }
+
+
+_stats: Dict[Tuple[str, str], ViewStats] = {}
+_lock = threading.Lock()
+OTHER_STORES = "*"
+
+
+def record(profile: RequestProfile) -> None:
+    sample_size = getattr(settings, "PROFILING_SAMPLE_SIZE", 500)
+    max_keys = getattr(settings, "PROFILING_MAX_KEYS", 2000)
+    key = (profile.view_name, profile.store_slug)
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            if len(_stats) >= max_keys:
+                # Demasiadas combinaciones vista/tienda: agrupar el resto
+                key = (profile.view_name, OTHER_STORES)
+                stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = ViewStats(sample_size)
+        stats.add(profile)
+
+
+def snapshot() -> list:
+    with _lock:
+        rows = [{"view": view, "store": store, **stats.as_dict()} for (view, store), stats in _stats.items()]
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+# ---------- PRESUPUESTOS ----------
+
+def query_budgets() -> Dict[str, int]:
+    return dict(getattr(settings, "QUERY_BUDGETS", {}))
+
+
+def query_budget(view_name: str) -> Optional[int]:
+    return query_budgets().get(view_name)
+
+
+def check_budget(profile: RequestProfile) -> None:
+    budget = query_budget(profile.view_name)
+    if budget is None or profile.view_sql_count <= budget:
+        return
+    message = f"{profile.view_name} hizo {profile.view_sql_count} consultas (presupuesto: {budget})"
+    if getattr(settings, "PROFILING_STRICT_BUDGETS", False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message, extra={"profile": profile.as_dict()})
+
+
+# ---------- MIDDLEWARE ----------
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not enabled():
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, profile)
+        return response
+
+    def _finish(self, request, response, profile: RequestProfile) -> None:
+        profile.duration = time.perf_counter() - profile.started
+        match = getattr(request, "resolver_match", None)
+        profile.view_name = match.view_name if match else "<unresolved>"
+        store = getattr(request, "store", None)
+        profile.store_slug = store.slug if store else ""
+        profile.status_code = response.status_code
+        page_cache = response.get("X-Page-Cache")
+        if page_cache:
+            profile.cache_hit = page_cache == "hit"
+        request.profile = profile
+
+        record(profile)
+        if getattr(settings, "PROFILING_LOG", False):
+            logger.info(json.dumps(profile.as_dict()))
+        if request.method in ("GET", "HEAD"):
+            # Los presupuestos son de lectura; un POST escribe según lo que se envió
+            check_budget(profile)
+
+
+class ViewProfilingMiddleware:
+    """Último en MIDDLEWARE: get_response es la vista. Cuenta solo sus consultas."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = _current.get()
+        if profile is None:
+            return self.get_response(request)
+        request.user.is_authenticated  # noqa: B018 (sesión y usuario, fuera de la medición)
+        before = profile.sql_count
+        try:
+            return self.get_response(request)
+        finally:
+            profile.view_sql_count = profile.sql_count - before
+
+    async def __acall__(self, request):
+        profile = _current.get()
+        if profile is None:
+            return await self.get_response(request)
+        await request.auser()
+        before = profile.sql_count
+        try:
+            return await self.get_response(request)
+        finally:
+            profile.view_sql_count = profile.sql_count - before
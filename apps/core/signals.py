@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import store_cache
+from .models import DeveloperConfig, Store
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_store_cache(sender, instance, **kwargs):
+    store_cache.invalidate_store(instance)
+
+
+@receiver(post_save, sender=DeveloperConfig)
+@receiver(post_delete, sender=DeveloperConfig)
+def invalidate_developer_config(sender, **kwargs):
+    DeveloperConfig.clear_cache()
@@ -0,0 +1,147 @@
+"""
+Cache de resolución de tiendas por subdominio (usado por TenantMiddleware).
+
+- Sin TENANT_CACHE_ALIAS: LRU en memoria del proceso con TTL (TENANT_CACHE_MAX_SIZE,
+  TENANT_CACHE_TTL). Sirve con un solo proceso: la invalidación no llega a los demás.
+- Con TENANT_CACHE_ALIAS: solo el cache de Django, compartido entre workers. No se usa el
+  LRU local, porque invalidate_store corre en un único proceso y los demás seguirían
+  sirviendo la tienda vieja hasta el TTL.
+
+También se cachean los subdominios inexistentes, así los escaneos de subdominios
+desconocidos no llegan a la BD. Se invalida con post_save / post_delete de Store
+(ver apps/core/signals.py). Se guardan solo los valores de los campos ({attname: valor}) y cada
+request recibe una instancia nueva, para no compartir estado (p. ej. store.config
+cacheado en la instancia) entre requests.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Store
+
+MISSING = "__missing__"
+KEY_PREFIX = "tenant:store:"
+PK_KEY_PREFIX = "tenant:store-pk:"
+
+_local = OrderedDict()  # slug -> (expires_at, {attname: valor} | MISSING)
+_lock = threading.Lock()
+
+
+def _field_names():
+    return [f.attname for f in Store._meta.concrete_fields]
+
+
+def _ttl() -> int:
+    return getattr(settings, "TENANT_CACHE_TTL", 300)
+
+
+def _shared_cache():
+    alias = getattr(settings, "TENANT_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _local_get(slug: str):
+    now = time.monotonic()
+    with _lock:
+        entry = _local.get(slug)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at <= now:
+            del _local[slug]
+            return None
+        _local.move_to_end(slug)
+        return values
+
+
+def _local_set(slug: str, values) -> None:
+    max_size = getattr(settings, "TENANT_CACHE_MAX_SIZE", 1024)
+    with _lock:
+        _local[slug] = (time.monotonic() + _ttl(), values)
+        _local.move_to_end(slug)
+        while len(_local) > max_size:
+            _local.popitem(last=False)
+
+
+def _load(slug: str):
+    """Consulta la BD; devuelve {attname: valor} o MISSING."""
+    row = (
+        Store.objects
+        .filter(slug=slug, is_active=True)
+        .values(*_field_names())
+        .first()
+    )
+    return row or MISSING
+
+
+def _pk(values):
+    return values[Store._meta.pk.attname]
+
+
+def get_store(slug: str) -> Optional[Store]:
+    """Devuelve la Store activa para el subdominio, o None si no existe."""
+    shared = _shared_cache()
+    if shared is None:
+        values = _local_get(slug)
+        if values is None:
+            values = _load(slug)
+            _local_set(slug, values)
+        return _instance(values)
+
+    values = shared.get(KEY_PREFIX + slug)
+    if values is None:
+        values = _load(slug)
+        shared.set(KEY_PREFIX + slug, values, _ttl())
+        if values != MISSING:
+            shared.set(PK_KEY_PREFIX + str(_pk(values)), slug, _ttl())
+    return _instance(values)
+
+
+def get_local_store(slug: str):
+    """
+    Solo el LRU del proceso, sin BD ni cache compartido (se puede llamar desde el event loop).
+    Devuelve (encontrado, store); si no está (o hay cache compartido), usar get_store
+    desde un thread.
+    """
+    if _shared_cache() is not None:
+        return False, None
+    values = _local_get(slug)
+    if values is None:
+        return False, None
+    return True, _instance(values)
+
+
+def _instance(values) -> Optional[Store]:
+    if values == MISSING:
+        return None
+    names = _field_names()
+    return Store.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def invalidate_store(store: Store) -> None:
+    """Quita la tienda (slug actual y anterior, si cambió) del cache."""
+    slugs = {store.slug}
+    with _lock:
+        for slug, (_, values) in list(_local.items()):
+            if values != MISSING and _pk(values) == store.pk:
+                slugs.add(slug)
+        for slug in slugs:
+            _local.pop(slug, None)
+
+    shared = _shared_cache()
+    if shared is not None:
+        old_slug = shared.get(PK_KEY_PREFIX + str(store.pk))
+        if old_slug:
+            slugs.add(old_slug)
+        shared.delete_many([KEY_PREFIX + slug for slug in slugs] + [PK_KEY_PREFIX + str(store.pk)])
+
+
+def clear() -> None:
+    """Vacía el LRU del proceso (el nivel compartido expira por TTL)."""
+    with _lock:
+        _local.clear()
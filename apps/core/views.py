@@ -1,4 +1,19 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponseNotAllowed, JsonResponse
 
-# Create your views here.
+from . import profiling
 
+
+@staff_member_required
+def profiling_stats_view(request):
+    """Histograma de perfilado del proceso (GET) o reinicio (POST). Solo staff."""
+    if request.method == "POST":
+        profiling.reset()
+        return JsonResponse({"reset": True})
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET", "POST"])
+    return JsonResponse({
+        "enabled": profiling.enabled(),
+        "budgets": profiling.query_budgets(),
+        "views": profiling.snapshot(),
+    })
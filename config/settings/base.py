@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Secret VAR management
 from decouple import config
@@ -29,6 +30,107 @@ DEVELOPER_URL = "https://instagram.com/catalogico_"
 # ALLOWED_HOSTS debe incluir: .catalogico.shop,catalogico.shop,www.catalogico.shop
 ROOT_DOMAIN = config("ROOT_DOMAIN", default="catalogico.shop")
 
+# Cache de Django: cache de páginas, snapshot de tienda, DeveloperConfig, links de compra.
+# Tiene que ser compartido entre los workers web y run_jobs: las invalidaciones (guardar un
+# producto, importar un CSV) corren en un proceso y los demás tienen que enterarse.
+# Tiene que ser un store en memoria: con el cache de páginas activo una página servida del
+# cache no debería tocar la base (ni la primaria ni las réplicas).
+# - REDIS_URL=redis://...: RedisCache. production.py lo exige.
+# - Sin REDIS_URL: memoria del proceso, solo para desarrollo y tests (un solo proceso).
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cache de resolución subdominio → Store en TenantMiddleware (segundos / entradas)
+TENANT_CACHE_TTL = config("TENANT_CACHE_TTL", default=300, cast=int)
+TENANT_CACHE_MAX_SIZE = 1024
+# Alias de CACHES para compartir la resolución entre workers (con Redis, "default").
+# None = LRU del proceso: un cambio en la tienda tarda hasta TENANT_CACHE_TTL en llegar
+# a los demás workers.
+TENANT_CACHE_ALIAS = config("TENANT_CACHE_ALIAS", default=None)
+
+# Snapshot por tienda del context processor site_settings (config + sucursales)
+SITE_SETTINGS_CACHE_TTL = 300
+# Singleton DeveloperConfig en el cache de Django
+DEVELOPER_CONFIG_CACHE_TTL = 300
+
+# Búsqueda de productos (parámetro q): full-text de Postgres
+CATALOG_SEARCH_ENGINE = "apps.catalog.search.PostgresSearchEngine"
+
+# Paginación por cursor en el catálogo (sin COUNT ni OFFSET; solo anterior/siguiente)
+CATALOG_CURSOR_PAGINATION = config("CATALOG_CURSOR_PAGINATION", default=False, cast=bool)
+
+# Listado de productos del panel: filas por página (por cursor) y hasta cuántos productos
+# se cuentan exacto; por encima se muestra una estimación
+OWNER_PRODUCTS_PER_PAGE = config("OWNER_PRODUCTS_PER_PAGE", default=50, cast=int)
+OWNER_PRODUCTS_EXACT_COUNT_LIMIT = config("OWNER_PRODUCTS_EXACT_COUNT_LIMIT", default=1000, cast=int)
+
+# Cache de páginas públicas para visitantes anónimos con carrito vacío (segundos; 0 = desactivado)
+STOREFRONT_PAGE_CACHE_TTL = config("STOREFRONT_PAGE_CACHE_TTL", default=300, cast=int)
+# Links de compra ya resueltos por versión de producto (segundos; 0 = sin cache)
+PRODUCT_LINKS_CACHE_TTL = 300
+
+# Vistas async de la tienda: lecturas independientes en paralelo, cada una con su conexión
+# (conviene un pooler tipo PgBouncer delante de Postgres)
+STOREFRONT_CONCURRENT_READS = config("STOREFRONT_CONCURRENT_READS", default=True, cast=bool)
+
+# Carrito y "volver al catálogo" fuera de la sesión de BD (cookie firmada o cache)
+CATALOG_BROWSE_STATE_BACKEND = config(
+    "CATALOG_BROWSE_STATE_BACKEND",
+    default="apps.catalog.browse_state.SignedCookieBrowseStateBackend",
+)
+
+# Derivados de las imágenes de productos (apps/catalog/images.py): anchos en px y calidad
+PRODUCT_IMAGE_DERIVATIVES = config("PRODUCT_IMAGE_DERIVATIVES", default=True, cast=bool)
+PRODUCT_IMAGE_WIDTHS = (320, 800)
+PRODUCT_IMAGE_QUALITY = 80
+
+# Cola de tareas en la base (apps.core.jobs, worker: manage.py run_jobs).
+# JOBS_RUN_INLINE ejecuta cada tarea en el mismo proceso al confirmar la transacción (sin worker).
+JOBS_RUN_INLINE = config("JOBS_RUN_INLINE", default=False, cast=bool)
+# Segundos: una tarea "en curso" más vieja que esto se vuelve a tomar (worker caído)
+JOBS_LOCK_TIMEOUT = 600
+# Segundos antes del primer reintento (se duplica en cada intento)
+JOBS_RETRY_DELAY = 30
+
+# Perfilado por vista y tienda (apps.core.profiling): tiempos, consultas SQL, render y cache.
+# Histograma en /_profiling/ (solo staff); PROFILING_LOG agrega una línea JSON por request.
+# Apagado por defecto (local.py lo prende con DEBUG).
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILING_LOG = config("PROFILING_LOG", default=False, cast=bool)
+# Duraciones que se guardan por vista/tienda para los percentiles
+PROFILING_SAMPLE_SIZE = 500
+
+# Máximo de consultas SQL de la vista por nombre de URL en GET (anónimo o dueño, lo que sea
+# mayor, con el cache frío), sin las de los middlewares ni la carga de sesión y usuario.
+# Excederlo loguea un warning; en tests (PROFILING_STRICT_BUDGETS) falla el request.
+QUERY_BUDGETS = {
+    "catalog:catalog": 7,
+    "catalog:product_detail": 6,
+    "catalog:faq_public": 3,
+    "catalog:branches_public": 3,
+    "catalog:cart_detail": 5,
+    "catalog:product_list": 6,
+    "catalog:product_update": 8,
+    "catalog:category_list": 4,
+    "catalog:store_config": 3,
+    "catalog:store_config_appearance": 8,
+    "catalog:branch_list": 5,
+    "catalog:faq_owner": 5,
+}
+PROFILING_STRICT_BUDGETS = False
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -74,15 +176,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'apps.core.middleware.TenantMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.core.middleware.SessionRefreshMiddleware',
+    'apps.catalog.middleware.BrowseStateMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.db_routing.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.profiling.ViewProfilingMiddleware',
 ]
 
 FORM_RENDERER = "django.forms.renderers.TemplatesSetting"
@@ -91,7 +198,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el render para apps.core.profiling
+        'BACKEND': 'apps.core.profiling.ProfiledDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -131,6 +239,19 @@ DATABASES = {
     }
 }
 
+# Réplicas de lectura (apps.core.db_routing): hosts separados por coma, mismas credenciales
+# que la primaria. Vacío = todo a "default".
+_replica_hosts_raw = config("POSTGRES_REPLICA_HOSTS", default="")
+DATABASE_REPLICAS = []
+for _index, _host in enumerate((h.strip() for h in _replica_hosts_raw.split(",") if h.strip()), start=1):
+    DATABASES[f"replica_{_index}"] = {**DATABASES["default"], "HOST": _host, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica_{_index}")
+
+DATABASE_ROUTERS = ["apps.core.db_routing.ReadReplicaRouter"]
+
+# Segundos que un navegador sigue leyendo de la primaria después de un POST (ver sus cambios)
+READ_YOUR_WRITES_SECONDS = config("READ_YOUR_WRITES_SECONDS", default=5, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -177,6 +298,18 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Subidas de media en cola (apps/catalog/media_uploads.py): el worker tiene que ver este directorio.
+# El temporal del sistema sirve solo en desarrollo; production.py lo exige.
+MEDIA_UPLOAD_STAGING_DIR = config(
+    "MEDIA_UPLOAD_STAGING_DIR", default=str(Path(tempfile.gettempdir()) / "catalogico_uploads")
+)
+# Subidas por partes (media_drop.js): tamaño máximo de cada parte, de cada archivo,
+# y segundos tras los que una subida sin terminar se descarta
+MEDIA_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+MEDIA_UPLOAD_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+MEDIA_UPLOAD_MAX_VIDEO_BYTES = 500 * 1024 * 1024
+MEDIA_UPLOAD_CHUNK_TTL = 24 * 3600
+
 # Cloudinary (Comment for local)
 
 STORAGES = {
@@ -207,8 +340,8 @@ LOGOUT_REDIRECT_URL = "/"
 # Tiempo de vida de la sesión (en segundos)
 SESSION_COOKIE_AGE = 1800  # 30 minutos
 
-# Renueva el tiempo en cada request
-SESSION_SAVE_EVERY_REQUEST = True
+# Guardar solo si cambió; SessionRefreshMiddleware renueva el vencimiento cada media vida
+SESSION_SAVE_EVERY_REQUEST = False
 
 # Al cerrar el navegador → logout
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
\ No newline at end of file
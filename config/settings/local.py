@@ -11,4 +11,23 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
-}
\ No newline at end of file
+}
+
+# Cache en memoria del proceso (un solo proceso con runserver)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# SQLite no tiene full-text de Postgres: índice invertido en memoria
+CATALOG_SEARCH_ENGINE = "apps.catalog.search.InMemorySearchEngine"
+
+# SQLite: las lecturas de las vistas async van en serie (una sola conexión)
+STOREFRONT_CONCURRENT_READS = False
+
+# Desarrollo: las tareas en cola (subidas de media, derivados) corren sin worker
+JOBS_RUN_INLINE = True
+
+# Perfilado por vista y presupuestos de consultas (apps.core.profiling) en desarrollo
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=DEBUG, cast=bool)
@@ -48,4 +48,18 @@ STORAGES = {
         },
 }
 
-CLOUDINARY_URL = config('CLOUDINARY_URL')
\ No newline at end of file
+CLOUDINARY_URL = config('CLOUDINARY_URL')
+
+# Cache compartido entre los workers web y run_jobs (ver CACHES en base.py).
+# Obligatorio: sin Redis cada proceso tendría su propio cache y no vería las invalidaciones.
+REDIS_URL = config("REDIS_URL")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
+# Subidas de media en cola: directorio compartido con el worker (mismo host o volumen).
+# Obligatorio: el temporal del sistema no lo ve otro contenedor y se limpia solo.
+MEDIA_UPLOAD_STAGING_DIR = config("MEDIA_UPLOAD_STAGING_DIR")
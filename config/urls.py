@@ -19,8 +19,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 
+from apps.core.views import profiling_stats_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path("_profiling/", profiling_stats_view, name="profiling_stats"),
     path("", include("apps.catalog.urls")),
     path("", include("apps.accounts.urls")),
 ]
@@ -0,0 +1,13 @@
+"""
+Configuración de gunicorn para producción (la lee sola al arrancar desde la raíz del repo).
+
+Comando de inicio: `gunicorn` (sin módulo: la app sale de wsgi_app). Las vistas de la
+tienda son async, así que se sirven por ASGI (config/asgi.py) con el worker de uvicorn;
+con un worker WSGI cada vista async pagaría un async_to_sync por request.
+"""
+from decouple import config
+
+wsgi_app = "config.asgi:application"
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{config('PORT', default='8000')}"
+workers = config("WEB_CONCURRENCY", default=2, cast=int)
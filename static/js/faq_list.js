@@ -11,15 +11,16 @@
       .filter((n) => !Number.isNaN(n));
   }
 
-  async function callReorder(orderIds) {
-    if (!reorderUrl || !orderIds.length) return;
+  // body: {order: [ids]} con el orden completo o {move: id, before: id|null} para un solo ítem
+  async function callReorder(body) {
+    if (!reorderUrl) return;
     const response = await fetch(reorderUrl, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
         "X-CSRFToken": csrfToken || "",
       },
-      body: JSON.stringify({ order: orderIds }),
+      body: JSON.stringify(body),
       credentials: "same-origin",
     });
     if (!response.ok) throw new Error("Reorder failed");
@@ -70,8 +71,12 @@
     } else {
       target.parentNode.insertBefore(draggedEl, target);
     }
+    // Solo se mueve el arrastrado: el servidor le da una clave entre sus nuevos vecinos
+    const ids = getOrderedIds();
+    const movedId = parseInt(draggedEl.dataset.faqId, 10);
+    const next = ids[ids.indexOf(movedId) + 1];
     try {
-      await callReorder(getOrderedIds());
+      await callReorder({ move: movedId, before: next === undefined ? null : next });
     } catch (err) {
       console.error("[faq_list] Reorder failed:", err);
       alert("Error al reordenar. Recargá la página.");
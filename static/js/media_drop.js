@@ -2,7 +2,8 @@
   const manager = document.getElementById("media-manager");
   if (!manager) return;
 
-  const uploadUrl = manager.dataset.uploadUrl;
+  const jobsUrl = manager.dataset.jobsUrl;
+  const chunkedUrl = manager.dataset.chunkedUrl;
   const reorderUrl = manager.dataset.reorderUrl;
   const deleteUrlTemplate = manager.dataset.deleteUrl;
   const csrfToken = manager.dataset.csrfToken;
@@ -26,8 +27,24 @@
     renderPreview(media, "Existente", "ok");
   });
 
-  if (!uploadUrl) {
-    console.error("[media_drop] Missing data-upload-url on #media-manager");
+  // Subidas que siguen en cola (se recargó la página antes de que terminaran)
+  const pendingUploadsScript = document.getElementById("pendingUploadsJson");
+  if (pendingUploadsScript) {
+    try {
+      const pendingUploads = JSON.parse(pendingUploadsScript.textContent) || [];
+      const pendingNodes = new Map();
+      pendingUploads.forEach(job => {
+        const node = renderPreview({ file_name: job.file_name, media_type: "" }, "Procesando...", "uploading");
+        pendingNodes.set(job.id, node);
+      });
+      if (pendingNodes.size) pollJobs(pendingNodes, new Set());
+    } catch (e) {
+      console.error("[media_drop] Failed to parse pending uploads JSON:", e);
+    }
+  }
+
+  if (!chunkedUrl) {
+    console.error("[media_drop] Missing data-chunked-url on #media-manager");
     return;
   }
 
@@ -47,83 +64,235 @@
   });
 
   async function uploadFiles(files) {
-    const formData = new FormData();
-    const previewNodes = [];
-    const cancelledIndices = new Set();
-
-    for (let i = 0; i < files.length; i++) {
-      const file = files[i];
-      formData.append("files", file);
-      const node = renderPreview(file, "Subiendo...", "uploading", i);
+    const entries = Array.from(files).map((file, i) => {
+      const node = renderPreview(file, "En espera...", "uploading", i);
+      const entry = { file, node, cancelled: false };
       node._cancelUpload = function () {
-        cancelledIndices.add(i);
+        entry.cancelled = true;
         node.remove();
       };
-      previewNodes.push(node);
-    }
+      return entry;
+    });
 
     setUploading(true);
 
+    // Un archivo por vez, por partes: un corte de red solo repite la parte en curso
+    const jobNodes = new Map();
+    const cancelledJobs = new Set();
+    const errors = [];
     try {
-      const response = await fetch(uploadUrl, {
+      for (const entry of entries) {
+        if (entry.cancelled) continue;
+        try {
+          const jobId = await uploadInChunks(entry);
+          if (jobId == null) continue;
+          if (entry.cancelled) {
+            cancelledJobs.add(jobId);
+          } else {
+            setPreviewStatus(entry.node, "Procesando...", "uploading");
+            entry.node._cancelUpload = function () {
+              cancelledJobs.add(jobId);
+              entry.node.remove();
+            };
+          }
+          jobNodes.set(jobId, entry.node);
+        } catch (err) {
+          console.error("[media_drop] Upload failed:", err);
+          errors.push(`${entry.file.name}: ${err.message}`);
+          if (entry.node.isConnected) setPreviewStatus(entry.node, "Error", "error");
+        }
+      }
+    } finally {
+      setUploading(false);
+    }
+
+    if (jobNodes.size) pollJobs(jobNodes, cancelledJobs);
+    if (errors.length) {
+      alert(
+        "Error subiendo archivos.\n\n" + errors.join("\n") + "\n\n" +
+          "Tip: si es 403 suele ser CSRF_TRUSTED_ORIGINS/CSRF.\n" +
+          "Si se cortó la conexión, volvé a elegir el archivo: continúa desde donde quedó."
+      );
+    }
+  }
+
+  // ---- Subida por partes (init, PUT de cada parte con su offset, finalizar) ----
+  const MAX_CHUNK_RETRIES = 5;
+
+  function resumeKey(file) {
+    return `media_drop:${chunkedUrl}:${file.name}:${file.size}:${file.lastModified}`;
+  }
+
+  function storageGet(key) {
+    try { return window.localStorage.getItem(key); } catch (e) { return null; }
+  }
+
+  function storageSet(key, value) {
+    try { window.localStorage.setItem(key, value); } catch (e) { /* sin localStorage no se retoma */ }
+  }
+
+  function storageRemove(key) {
+    try { window.localStorage.removeItem(key); } catch (e) { /* idem */ }
+  }
+
+  async function requestJson(url, options) {
+    const response = await fetch(url, {
+      credentials: "same-origin",
+      ...options,
+      headers: { "X-CSRFToken": csrfToken || "", ...(options && options.headers) },
+    });
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok) {
+      const error = new Error(data.error || `HTTP ${response.status} ${response.statusText}`);
+      error.status = response.status;
+      throw error;
+    }
+    return data;
+  }
+
+  async function resumeUpload(uploadId) {
+    if (!uploadId) return null;
+    try {
+      return await requestJson(chunkedUrl + uploadId + "/", { method: "GET" });
+    } catch (e) {
+      return null;
+    }
+  }
+
+  async function uploadInChunks(entry) {
+    const { file, node } = entry;
+    const key = resumeKey(file);
+
+    let upload = await resumeUpload(storageGet(key));
+    if (!upload) {
+      upload = await requestJson(chunkedUrl, {
         method: "POST",
-        headers: csrfToken ? { "X-CSRFToken": csrfToken } : undefined,
-        body: formData,
-        credentials: "same-origin",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ file_name: file.name, size: file.size, content_type: file.type }),
       });
+      storageSet(key, upload.upload_id);
+    }
 
-      if (!response.ok) {
-        const text = await response.text().catch(() => "");
-        const snippet = text ? `\n\n${text.slice(0, 400)}` : "";
-        throw new Error(`HTTP ${response.status} ${response.statusText}${snippet}`);
-      }
+    const partUrl = chunkedUrl + upload.upload_id + "/";
+    let offset = upload.offset;
+    let retries = 0;
+    try {
+      while (offset < file.size) {
+        if (entry.cancelled) {
+          await fetch(partUrl, {
+            method: "DELETE",
+            headers: { "X-CSRFToken": csrfToken || "" },
+            credentials: "same-origin",
+          }).catch(() => {});
+          storageRemove(key);
+          return null;
+        }
+        setPreviewStatus(node, `Subiendo... ${Math.floor((offset * 100) / file.size)}%`, "uploading");
+
+        let response = null;
+        try {
+          response = await fetch(partUrl, {
+            method: "PUT",
+            headers: {
+              "X-CSRFToken": csrfToken || "",
+              "Content-Type": "application/octet-stream",
+              "Upload-Offset": String(offset),
+            },
+            body: file.slice(offset, offset + upload.chunk_size),
+            credentials: "same-origin",
+          });
+        } catch (e) {
+          console.warn("[media_drop] Chunk failed:", e);
+        }
 
-      const data = await response.json().catch(() => ({}));
-      const ids = data.ids || [];
-
-      for (const i of cancelledIndices) {
-        if (ids[i] != null) {
-          try {
-            await fetch(getDeleteUrl(ids[i]), {
-              method: "POST",
-              headers: { "X-CSRFToken": csrfToken || "" },
-              credentials: "same-origin",
-            });
-          } catch (e) {
-            console.warn("[media_drop] Delete cancelled media failed:", e);
-          }
+        if (response && (response.ok || response.status === 409)) {
+          // 409: el servidor tiene otro offset (parte repetida o perdida); seguimos desde el suyo
+          const data = await response.json();
+          offset = data.offset;
+          retries = 0;
+          continue;
         }
+        if (response && response.status < 500) {
+          const data = await response.json().catch(() => ({}));
+          const error = new Error(data.error || `HTTP ${response.status}`);
+          error.status = response.status;
+          throw error;
+        }
+        // Corte de red o error del servidor: se reintenta la misma parte con espera creciente
+        if (++retries > MAX_CHUNK_RETRIES) {
+          throw new Error("Se cortó la conexión");
+        }
+        setPreviewStatus(node, "Reintentando...", "uploading");
+        await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** retries));
       }
 
-      previewNodes.forEach((node) => setPreviewStatus(node, "Subido", "ok"));
-
-      for (let i = 0; i < previewNodes.length; i++) {
-        const node = previewNodes[i];
-        if (!node.isConnected || cancelledIndices.has(i)) continue;
-        const id = ids[i];
-        if (id != null) {
-          node.dataset.mediaId = String(id);
-          node.draggable = true;
-          node.classList.add("media-preview--draggable");
-          const deleteBtn = node.querySelector(".media-preview-delete");
-          if (deleteBtn) {
-            deleteBtn._boundMediaId = id;
-            deleteBtn.onclick = makeDeleteHandler(node, id);
-          }
+      const data = await requestJson(partUrl + "finalizar/", { method: "POST" });
+      storageRemove(key);
+      return data.job;
+    } catch (err) {
+      // Rechazada por el servidor (tipo, tamaño, subida vencida): no tiene sentido retomarla
+      if (err.status) storageRemove(key);
+      throw err;
+    }
+  }
+
+  // ---- Estado de las subidas en cola ----
+  const POLL_INTERVAL_MS = 1500;
+
+  async function pollJobs(jobNodes, cancelledJobs) {
+    if (!jobsUrl) return;
+    const pending = new Set(jobNodes.keys());
+    while (pending.size) {
+      await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+      let data;
+      try {
+        const response = await fetch(jobsUrl + "?ids=" + Array.from(pending).join(","), {
+          credentials: "same-origin",
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        data = await response.json();
+      } catch (e) {
+        console.warn("[media_drop] Job status failed, retrying:", e);
+        continue;
+      }
+      for (const job of data.jobs || []) {
+        if (job.status !== "done" && job.status !== "failed") continue;
+        pending.delete(job.id);
+        const node = jobNodes.get(job.id);
+        if (job.status === "failed") {
+          if (node && node.isConnected) setPreviewStatus(node, job.error || "Error", "error");
+          continue;
+        }
+        if (cancelledJobs.has(job.id)) {
+          if (job.media_id != null) await deleteMedia(job.media_id);
+          continue;
         }
+        if (node && node.isConnected && job.media_id != null) attachMedia(node, job.media_id);
       }
-    } catch (err) {
-      console.error("[media_drop] Upload failed:", err);
-      previewNodes.forEach((node) => {
-        if (node.isConnected) setPreviewStatus(node, "Error", "error");
+    }
+  }
+
+  function attachMedia(node, id) {
+    setPreviewStatus(node, "Subido", "ok");
+    node.dataset.mediaId = String(id);
+    node.draggable = true;
+    node.classList.add("media-preview--draggable");
+    const deleteBtn = node.querySelector(".media-preview-delete");
+    if (deleteBtn) {
+      deleteBtn._boundMediaId = id;
+      deleteBtn.onclick = makeDeleteHandler(node, id);
+    }
+  }
+
+  async function deleteMedia(mediaId) {
+    try {
+      await fetch(getDeleteUrl(mediaId), {
+        method: "POST",
+        headers: { "X-CSRFToken": csrfToken || "" },
+        credentials: "same-origin",
       });
-      alert(
-        "Error subiendo archivos.\n\n" +
-          "Tip: si es 403 suele ser CSRF_TRUSTED_ORIGINS/CSRF.\n" +
-          "Si es 404, revisá que el producto exista y que la URL sea correcta."
-      );
-    } finally {
-      setUploading(false);
+    } catch (e) {
+      console.warn("[media_drop] Delete cancelled media failed:", e);
     }
   }
 
@@ -172,15 +341,16 @@
     return Array.from(items).map(el => parseInt(el.dataset.mediaId, 10));
   }
 
-  async function callReorder(orderIds) {
-    if (!reorderUrl || !orderIds.length) return;
+  // body: {order: [ids]} con el orden completo o {move: id, before: id|null} para un solo ítem
+  async function callReorder(body) {
+    if (!reorderUrl) return;
     const response = await fetch(reorderUrl, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
         "X-CSRFToken": csrfToken || "",
       },
-      body: JSON.stringify({ order: orderIds }),
+      body: JSON.stringify(body),
       credentials: "same-origin",
     });
     if (!response.ok) {
@@ -345,9 +515,12 @@
     } else {
       target.parentNode.insertBefore(draggedEl, target);
     }
-    const orderIds = getOrderedIds();
+    // Solo se mueve el arrastrado: el servidor le da una clave entre sus nuevos vecinos
+    const ids = getOrderedIds();
+    const movedId = parseInt(draggedEl.dataset.mediaId, 10);
+    const next = ids[ids.indexOf(movedId) + 1];
     try {
-      await callReorder(orderIds);
+      await callReorder({ move: movedId, before: next === undefined ? null : next });
     } catch (err) {
       console.error("[media_drop] Reorder failed:", err);
       alert("Error al reordenar. Recargá la página.");